@@ -4,6 +4,14 @@
 Chạy file này để bắt đầu ứng dụng cờ vua với menu lựa chọn chế độ chơi.
 Có thể chạy với tham số -p hoặc --performance để thực hiện phân tích hiệu suất.
 Sử dụng tham số -s hoặc --specific để chỉ định phân tích hiệu suất trên một vị trí cụ thể.
+Sử dụng tham số -e hoặc --engine để chọn kiểu biểu diễn bàn cờ (có thể truyền nhiều giá trị để so sánh).
+Sử dụng tham số -t hoặc --threads để so sánh tốc độ tìm kiếm song song với nhiều số tiến trình,
+và --parallel để chọn cách chia việc (lazy_smp hoặc root_split). Khi chơi, giá trị đầu tiên của --threads
+là số tiến trình tìm kiếm của AI (mặc định 1).
+Sử dụng tham số -m hoặc --move-footprint để đo bộ nhớ và thời gian khởi tạo của đối tượng Move.
+Sử dụng tham số --perft DEPTH [--fen FEN] để đếm số nút (perft divide) của bộ sinh nước đi,
+hoặc --perft-suite [MAX_DEPTH] để kiểm tra trên các thế cờ chuẩn và đo số nút mỗi giây.
+Sử dụng tham số --build-tablebases [PATH] để sinh bảng tàn cuộc KQK, KRK, KPK cho AI.
 """
 
 import os
@@ -12,8 +20,7 @@ import traceback
 import argparse
 
 
-from src.ChessMenu import Menu
-from src.PerformanceAnalyzer import run_performance_test
+from src.ChessEngine import ENGINE_LIST, ENGINE_BITBOARD, DEFAULT_ENGINE, START_FEN
 
 if __name__ == "__main__":
     # Tạo parser để xử lý tham số dòng lệnh
@@ -22,15 +29,55 @@ if __name__ == "__main__":
                         help='Chạy phân tích hiệu suất các thuật toán AI')
     parser.add_argument('-s', '--specific', action='store_true',
                         help='Đánh giá hiệu suất dựa trên một vị trí cụ thể thay vì nhiều vị trí')
+    parser.add_argument('-e', '--engine', nargs='+', choices=[ENGINE_LIST, ENGINE_BITBOARD], default=[DEFAULT_ENGINE],
+                        help='Kiểu biểu diễn bàn cờ dùng khi phân tích hiệu suất (truyền cả hai để so sánh)')
+    parser.add_argument('-t', '--threads', nargs='+', type=int, default=[1], metavar='N',
+                        help='Số tiến trình tìm kiếm khi phân tích hiệu suất (truyền nhiều giá trị để so sánh); '
+                             'khi chơi với máy dùng giá trị đầu tiên')
+    parser.add_argument('--parallel', choices=['lazy_smp', 'root_split'], default='lazy_smp',
+                        help='Cách tìm kiếm song song khi số tiến trình > 1: bảng chuyển vị chung hoặc chia nước ở gốc')
+    parser.add_argument('-m', '--move-footprint', action='store_true',
+                        help='Đo bộ nhớ và thời gian khởi tạo của mỗi đối tượng Move')
+    parser.add_argument('--perft', type=int, metavar='DEPTH',
+                        help='Đếm số nút của cây nước đi tới độ sâu DEPTH và in số nút của từng nước (divide)')
+    parser.add_argument('--fen', default=START_FEN,
+                        help='Thế cờ dạng FEN dùng cho --perft (mặc định là thế cờ ban đầu)')
+    parser.add_argument('--perft-suite', type=int, nargs='?', const=3, metavar='MAX_DEPTH',
+                        help='Chạy perft trên các thế cờ chuẩn tới độ sâu MAX_DEPTH (mặc định 3)')
+    parser.add_argument('--build-tablebases', nargs='?', const='./assets/tablebases/endgames.bin', metavar='PATH',
+                        help='Sinh bảng tàn cuộc KQK, KRK, KPK bằng phân tích ngược và ghi vào PATH')
     
     args = parser.parse_args()
     
+    if args.perft is not None:
+        from src.Perft import runPerft
+        for engine in args.engine:
+            runPerft(args.perft, args.fen, engine)
+        sys.exit()
+    
+    if args.perft_suite is not None:
+        from src.Perft import runPerftSuite
+        passed = all([runPerftSuite(args.perft_suite, engine) for engine in args.engine])
+        sys.exit(0 if passed else 1)
+    
+    if args.build_tablebases is not None:
+        from src.Tablebase import buildTablebases
+        buildTablebases(args.build_tablebases, args.engine[0])
+        sys.exit()
+    
+    if args.move_footprint:
+        from src.PerformanceAnalyzer import run_move_footprint_test
+        run_move_footprint_test()
+        sys.exit()
+    
     # Nếu có tham số --performance, chạy phân tích hiệu suất0
     if args.performance:
+        from src.PerformanceAnalyzer import run_performance_test
         print("Bắt đầu phân tích hiệu suất các thuật toán AI...")
         
         # Kiểm tra xem có sử dụng vị trí cụ thể hay không
-        file_path = run_performance_test(specific_position=args.specific)
+        file_path = run_performance_test(specific_position=args.specific, engines=args.engine,
+                                         thread_counts=args.threads, parallel=args.parallel)
         
         if args.specific:
             print("Đã phân tích hiệu suất trên một vị trí cụ thể.")
@@ -42,7 +89,8 @@ if __name__ == "__main__":
     
     # Nếu không, chạy game bình thường
     # Khởi tạo và chạy menu
-    menu = Menu()
+    from src.ChessMenu import Menu
+    menu = Menu(threads=args.threads[0])
     menu.run()
     # Thoát game sau khi menu đóng (khi người chơi đã chọn và chơi xong một chế độ)
     sys.exit()
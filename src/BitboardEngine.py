@@ -0,0 +1,498 @@
+"""
+Trạng thái ván cờ dùng bitboard
+-------------------------------
+Mỗi loại quân của mỗi bên được lưu trong một số nguyên Python (bit thứ row * 8 + col ứng với ô [row][col]),
+kèm theo mặt nạ chiếm chỗ của từng bên. Nước đi được sinh bằng phép dịch bit và mặt nạ thay vì duyệt
+từng ô của bàn cờ dạng danh sách.
+
+BitboardGameState giữ nguyên API công khai của GameState (makeMove, undoMove, getValidMoves, inCheck,...)
+và vẫn trả về đối tượng Move, nên ChessAI, PGNExporter và giao diện dùng được mà không cần sửa.
+Bàn cờ dạng danh sách (board) vẫn được cập nhật song song để hiển thị và để tạo Move.
+"""
+from src.ChessEngine import GameState, Move, mvvLvaScore
+
+PIECE_NAMES = ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")
+FULL_BOARD = (1 << 64) - 1
+FILE_A = sum(1 << (row * 8) for row in range(8))
+FILE_H = FILE_A << 7
+SQUARE_COORDS = tuple(divmod(square, 8) for square in range(64))
+
+ROOK_DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, 1), (1, -1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _buildStepTable(offsets):
+    """Bảng tấn công của quân đi một bước (mã, vua, tốt) cho từng ô"""
+    table = []
+    for row, col in SQUARE_COORDS:
+        mask = 0
+        for d_row, d_col in offsets:
+            end_row, end_col = row + d_row, col + d_col
+            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
+                mask |= 1 << (end_row * 8 + end_col)
+        table.append(mask)
+    return table
+
+
+def _buildRayTable(d_row, d_col):
+    """Tia từ mỗi ô theo một hướng cho tới mép bàn cờ (không gồm ô xuất phát)"""
+    table = []
+    for row, col in SQUARE_COORDS:
+        mask = 0
+        end_row, end_col = row + d_row, col + d_col
+        while 0 <= end_row <= 7 and 0 <= end_col <= 7:
+            mask |= 1 << (end_row * 8 + end_col)
+            end_row, end_col = end_row + d_row, end_col + d_col
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _buildStepTable(KNIGHT_OFFSETS)
+KING_ATTACKS = _buildStepTable(KING_OFFSETS)
+# PAWN_ATTACKS[color][sq]: các ô mà tốt màu color đứng ở sq tấn công
+PAWN_ATTACKS = {"w": _buildStepTable(((-1, -1), (-1, 1))), "b": _buildStepTable(((1, -1), (1, 1)))}
+
+RAYS = {direction: _buildRayTable(*direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+# Với hướng làm tăng chỉ số ô, quân chắn gần nhất là bit thấp nhất; ngược lại là bit cao nhất
+ROOK_RAYS = tuple((RAYS[d], d[0] * 8 + d[1] > 0) for d in ROOK_DIRECTIONS)
+BISHOP_RAYS = tuple((RAYS[d], d[0] * 8 + d[1] > 0) for d in BISHOP_DIRECTIONS)
+ROOK_MASKS = [sum(RAYS[d][sq] for d in ROOK_DIRECTIONS) for sq in range(64)]
+BISHOP_MASKS = [sum(RAYS[d][sq] for d in BISHOP_DIRECTIONS) for sq in range(64)]
+
+
+def _buildLineTables():
+    """BETWEEN[a][b]: các ô nằm giữa a và b; LINE[a][b]: cả đường thẳng đi qua a và b (0 nếu không thẳng hàng)"""
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = SQUARE_COORDS[sq]
+        for d_row, d_col in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            full_line = RAYS[(d_row, d_col)][sq] | RAYS[(-d_row, -d_col)][sq] | (1 << sq)
+            path = 0
+            end_row, end_col = row + d_row, col + d_col
+            while 0 <= end_row <= 7 and 0 <= end_col <= 7:
+                target = end_row * 8 + end_col
+                between[sq][target] = path
+                line[sq][target] = full_line
+                path |= 1 << target
+                end_row, end_col = end_row + d_row, end_col + d_col
+    return between, line
+
+
+BETWEEN, LINE = _buildLineTables()
+
+
+def lsb(bitboard):
+    """Chỉ số của bit thấp nhất đang bật"""
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def slidingAttacks(square, occupied, rays):
+    """Các ô bị quân trượt (xe/tượng) ở square tấn công, dừng lại ở quân chắn đầu tiên mỗi hướng"""
+    attacks = 0
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+class BitboardGameState(GameState):
+    """
+    GameState với bàn cờ biểu diễn bằng 12 bitboard quân cờ và 2 mặt nạ chiếm chỗ.
+    Phần ghi nhật ký nước đi, quyền nhập thành, luật hòa... dùng lại của GameState.
+    """
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        # gán cả bàn cờ mới (ví dụ khi dựng thế cờ thử nghiệm) thì dựng lại bitboard từ đầu
+        self._board = board
+        self.syncBitboards()
+
+    def syncBitboards(self):
+        """Dựng lại toàn bộ bitboard từ bàn cờ dạng danh sách"""
+        self.bitboards = dict.fromkeys(PIECE_NAMES, 0)
+        self.occupancy = {"w": 0, "b": 0}
+        for row in range(8):
+            for col in range(8):
+                piece = self._board[row][col]
+                if piece != "--":
+                    bit = 1 << (row * 8 + col)
+                    self.bitboards[piece] |= bit
+                    self.occupancy[piece[0]] |= bit
+        if self.bitboards["wK"]:
+            self.white_king_location = SQUARE_COORDS[lsb(self.bitboards["wK"])]
+        if self.bitboards["bK"]:
+            self.black_king_location = SQUARE_COORDS[lsb(self.bitboards["bK"])]
+
+    def toggleMoveBits(self, move, placed_piece):
+        """
+        Đảo các bit bị nước đi thay đổi. Phép XOR tự nghịch đảo nên dùng chung cho makeMove và undoMove.
+        placed_piece là quân đứng ở ô đích sau nước đi (khác piece_moved khi phong cấp).
+        """
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        color = move.piece_moved[0]
+        start_bit = 1 << (move.start_row * 8 + move.start_col)
+        end_bit = 1 << (move.end_row * 8 + move.end_col)
+        bitboards[move.piece_moved] ^= start_bit
+        bitboards[placed_piece] ^= end_bit
+        occupancy[color] ^= start_bit | end_bit
+        if move.piece_captured != "--":
+            if move.is_enpassant_move:
+                captured_bit = 1 << (move.start_row * 8 + move.end_col)
+            else:
+                captured_bit = end_bit
+            bitboards[move.piece_captured] ^= captured_bit
+            occupancy[move.piece_captured[0]] ^= captured_bit
+        if move.is_castle_move:
+            row_offset = move.end_row * 8
+            if move.end_col - move.start_col == 2:  # nhập thành cánh vua
+                rook_bits = (1 << (row_offset + move.end_col + 1)) | (1 << (row_offset + move.end_col - 1))
+            else:  # nhập thành cánh hậu
+                rook_bits = (1 << (row_offset + move.end_col - 2)) | (1 << (row_offset + move.end_col + 1))
+            bitboards[color + "R"] ^= rook_bits
+            occupancy[color] ^= rook_bits
+
+    def makeMove(self, move, piecePromotion="Q"):
+        placed_piece = move.piece_moved[0] + piecePromotion if move.is_pawn_promotion else move.piece_moved
+        self.toggleMoveBits(move, placed_piece)
+        GameState.makeMove(self, move, piecePromotion)
+
+    def undoMove(self):
+        if len(self.move_log) != 0:
+            move = self.move_log[-1]
+            self.toggleMoveBits(move, self._board[move.end_row][move.end_col])
+            GameState.undoMove(self)
+
+    def checkInsufficientMaterial(self):
+        """Cùng quy tắc với GameState nhưng đếm trên bitboard thay vì duyệt 64 ô"""
+        bitboards = self.bitboards
+        remaining = [piece for piece in PIECE_NAMES if piece[1] != "K" and bitboards[piece]]
+        if len(remaining) == 0:
+            self.insufficient_material = True
+        elif len(remaining) == 1 and remaining[0][1] in ("B", "N"):
+            self.insufficient_material = True
+
+    def attackersTo(self, square, by_color, occupied, excluded=0):
+        """Bitboard các quân của by_color đang tấn công square với mặt nạ chiếm chỗ occupied"""
+        bitboards = self.bitboards
+        target_color = "b" if by_color == "w" else "w"
+        attackers = (KNIGHT_ATTACKS[square] & bitboards[by_color + "N"]) | \
+                    (PAWN_ATTACKS[target_color][square] & bitboards[by_color + "p"]) | \
+                    (KING_ATTACKS[square] & bitboards[by_color + "K"])
+        queens = bitboards[by_color + "Q"]
+        rooks = bitboards[by_color + "R"] | queens
+        if rooks & ROOK_MASKS[square]:
+            attackers |= slidingAttacks(square, occupied, ROOK_RAYS) & rooks
+        bishops = bitboards[by_color + "B"] | queens
+        if bishops & BISHOP_MASKS[square]:
+            attackers |= slidingAttacks(square, occupied, BISHOP_RAYS) & bishops
+        return attackers & ~excluded
+
+    def attackedSquares(self, by_color, occupied):
+        """Tất cả các ô bị by_color tấn công"""
+        bitboards = self.bitboards
+        pawns = bitboards[by_color + "p"]
+        if by_color == "w":
+            attacks = ((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)
+        else:
+            attacks = ((pawns & ~FILE_H) << 9 | (pawns & ~FILE_A) << 7) & FULL_BOARD
+        knights = bitboards[by_color + "N"]
+        while knights:
+            bit = knights & -knights
+            attacks |= KNIGHT_ATTACKS[bit.bit_length() - 1]
+            knights ^= bit
+        queens = bitboards[by_color + "Q"]
+        rooks = bitboards[by_color + "R"] | queens
+        while rooks:
+            bit = rooks & -rooks
+            attacks |= slidingAttacks(bit.bit_length() - 1, occupied, ROOK_RAYS)
+            rooks ^= bit
+        bishops = bitboards[by_color + "B"] | queens
+        while bishops:
+            bit = bishops & -bishops
+            attacks |= slidingAttacks(bit.bit_length() - 1, occupied, BISHOP_RAYS)
+            bishops ^= bit
+        king = bitboards[by_color + "K"]
+        if king:
+            attacks |= KING_ATTACKS[lsb(king)]
+        return attacks
+
+    def computeAttackMap(self, color):
+        return self.attackedSquares(color, self.occupancy["w"] | self.occupancy["b"])
+
+    def pinnedPieces(self, king_square, ally_color, enemy_color, occupied):
+        """Bitboard các quân của ally_color bị ghim vào vua"""
+        bitboards = self.bitboards
+        queens = bitboards[enemy_color + "Q"]
+        snipers = (ROOK_MASKS[king_square] & (bitboards[enemy_color + "R"] | queens)) | \
+                  (BISHOP_MASKS[king_square] & (bitboards[enemy_color + "B"] | queens))
+        own = self.occupancy[ally_color]
+        between_row = BETWEEN[king_square]
+        pinned = 0
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = between_row[bit.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+
+    def generateMoves(self, moves, from_mask=FULL_BOARD, to_mask=FULL_BOARD):
+        """
+        Sinh các nước đi hợp lệ của bên đang đi và thêm vào moves.
+        from_mask/to_mask giới hạn ô xuất phát và ô đích (mặc định là cả bàn cờ).
+        """
+        bitboards = self.bitboards
+        board = self._board
+        if self.white_to_move:
+            ally_color, enemy_color = "w", "b"
+        else:
+            ally_color, enemy_color = "b", "w"
+        own = self.occupancy[ally_color]
+        enemy = self.occupancy[enemy_color]
+        occupied = own | enemy
+        king_bit = bitboards[ally_color + "K"]
+        king_square = king_bit.bit_length() - 1
+        checkers = self.attackersTo(king_square, enemy_color, occupied)
+        self.in_check = checkers != 0
+
+        # vua: không được đi vào ô bị tấn công (tính khi đã nhấc vua ra khỏi bàn để thấy tia xuyên qua vua)
+        if king_bit & from_mask:
+            danger = self.attackedSquares(enemy_color, occupied ^ king_bit)
+            targets = KING_ATTACKS[king_square] & ~own & ~danger & to_mask
+            king_coords = SQUARE_COORDS[king_square]
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                moves.append(Move(king_coords, SQUARE_COORDS[bit.bit_length() - 1], board))
+            if not checkers:
+                self.addCastleMoves(moves, king_square, ally_color, occupied, danger, to_mask)
+
+        if checkers & (checkers - 1):
+            return  # chiếu đôi, chỉ vua được di chuyển
+        target_mask = ~own & to_mask & FULL_BOARD
+        if checkers:
+            # phải ăn quân chiếu hoặc chặn giữa quân chiếu và vua
+            target_mask &= checkers | BETWEEN[king_square][checkers.bit_length() - 1]
+        pinned = self.pinnedPieces(king_square, ally_color, enemy_color, occupied)
+        line_row = LINE[king_square]
+
+        knights = bitboards[ally_color + "N"] & from_mask & ~pinned
+        while knights:
+            bit = knights & -knights
+            knights ^= bit
+            square = bit.bit_length() - 1
+            self.addTargetMoves(moves, square, KNIGHT_ATTACKS[square] & target_mask)
+
+        queens = bitboards[ally_color + "Q"]
+        for pieces, rays in ((bitboards[ally_color + "R"] | queens, ROOK_RAYS),
+                             (bitboards[ally_color + "B"] | queens, BISHOP_RAYS)):
+            pieces &= from_mask
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                square = bit.bit_length() - 1
+                targets = slidingAttacks(square, occupied, rays) & target_mask
+                if bit & pinned:
+                    targets &= line_row[square]
+                self.addTargetMoves(moves, square, targets)
+
+        self.addPawnMoves(moves, ally_color, enemy_color, from_mask, to_mask, target_mask,
+                          enemy, occupied, pinned, king_square)
+
+    def addTargetMoves(self, moves, square, targets):
+        start = SQUARE_COORDS[square]
+        board = self._board
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            moves.append(Move(start, SQUARE_COORDS[bit.bit_length() - 1], board))
+
+    def addPawnMoves(self, moves, ally_color, enemy_color, from_mask, to_mask, target_mask,
+                     enemy, occupied, pinned, king_square):
+        board = self._board
+        pawns = self.bitboards[ally_color + "p"] & from_mask
+        if not pawns:
+            return
+        empty = ~occupied & FULL_BOARD
+        line_row = LINE[king_square]
+        if ally_color == "w":
+            single = (pawns >> 8) & empty
+            double = ((single & (0xFF << 40)) >> 8) & empty
+            shifted = ((single, 8), (double, 16),
+                       (((pawns & ~FILE_A) >> 9) & enemy, 9), (((pawns & ~FILE_H) >> 7) & enemy, 7))
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & (0xFF << 16)) << 8) & empty
+            shifted = ((single, -8), (double, -16),
+                       (((pawns & ~FILE_H) << 9) & enemy, -9), (((pawns & ~FILE_A) << 7) & enemy, -7))
+        for targets, offset in shifted:
+            targets &= target_mask
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                start = end + offset
+                if (1 << start) & pinned and not line_row[start] & bit:
+                    continue
+                moves.append(Move(SQUARE_COORDS[start], SQUARE_COORDS[end], board))
+
+        # bắt tốt qua đường: thử nhấc cả hai quân tốt ra để kiểm tra vua có bị lộ không
+        if self.enpassant_possible:
+            ep_row, ep_col = self.enpassant_possible
+            ep_square = ep_row * 8 + ep_col
+            ep_bit = 1 << ep_square
+            if not ep_bit & to_mask:
+                return
+            captured_bit = 1 << (ep_square + (8 if ally_color == "w" else -8))
+            candidates = PAWN_ATTACKS[enemy_color][ep_square] & pawns
+            while candidates:
+                bit = candidates & -candidates
+                candidates ^= bit
+                after = (occupied ^ bit ^ captured_bit) | ep_bit
+                if not self.attackersTo(king_square, enemy_color, after, captured_bit):
+                    moves.append(Move(SQUARE_COORDS[bit.bit_length() - 1], (ep_row, ep_col), board,
+                                      is_enpassant_move=True))
+
+    def addCastleMoves(self, moves, king_square, ally_color, occupied, danger, to_mask):
+        rights = self.current_castling_rights
+        home = 56 if ally_color == "w" else 0
+        if king_square != home + 4:
+            return
+        rooks = self.bitboards[ally_color + "R"]
+        king_coords = SQUARE_COORDS[king_square]
+        if rights.wks if ally_color == "w" else rights.bks:
+            path = (1 << (home + 5)) | (1 << (home + 6))
+            if rooks & (1 << (home + 7)) and not occupied & path and not danger & path and to_mask & (1 << (home + 6)):
+                moves.append(Move(king_coords, SQUARE_COORDS[home + 6], self._board, is_castle_move=True))
+        if rights.wqs if ally_color == "w" else rights.bqs:
+            path = (1 << (home + 3)) | (1 << (home + 2))
+            if rooks & (1 << home) and not occupied & (path | (1 << (home + 1))) and not danger & path \
+                    and to_mask & (1 << (home + 2)):
+                moves.append(Move(king_coords, SQUARE_COORDS[home + 2], self._board, is_castle_move=True))
+
+    def getValidMoves(self):
+        moves = []
+        self.generateMoves(moves)
+        self.pins = []
+        self.checks = []
+        self.checkEndConditions(moves)
+        return moves
+
+    def getAllPossibleMoves(self):
+        moves = []
+        self.generateMoves(moves)
+        return moves
+
+    def findLegalMove(self, move_id):
+        """Trả về nước đi hợp lệ trong thế cờ hiện tại có moveID bằng move_id, hoặc None"""
+        start_row, start_col = divmod(move_id // 100, 10)
+        end_row, end_col = divmod(move_id % 100, 10)
+        if max(start_row, start_col, end_row, end_col) > 7:
+            return None
+        moves = []
+        self.generateMoves(moves, from_mask=1 << (start_row * 8 + start_col), to_mask=1 << (end_row * 8 + end_col))
+        return moves[0] if moves else None
+
+    def getTacticalMoves(self):
+        """
+        Chỉ sinh nước ăn quân (kể cả bắt tốt qua đường) và phong cấp, sắp theo MVV-LVA.
+        Ô đích bị giới hạn bằng mặt nạ nên nước đi yên lặng không bao giờ được tạo ra.
+        """
+        if self.white_to_move:
+            ally_color, enemy_color, promotion_rank = "w", "b", 0xFF
+            promotion_pawns = self.bitboards["wp"] & (0xFF << 8)  # tốt ở hàng sát phong cấp
+        else:
+            ally_color, enemy_color, promotion_rank = "b", "w", 0xFF << 56
+            promotion_pawns = self.bitboards["bp"] & (0xFF << 48)
+        occupied = self.occupancy["w"] | self.occupancy["b"]
+        ep_bit = 0
+        if self.enpassant_possible:
+            ep_bit = 1 << (self.enpassant_possible[0] * 8 + self.enpassant_possible[1])
+        moves = []
+        self.generateMoves(moves, to_mask=self.occupancy[enemy_color] | ep_bit)
+        if promotion_pawns:
+            self.generateMoves(moves, from_mask=promotion_pawns, to_mask=promotion_rank & ~occupied)
+        if ep_bit:
+            # quân khác đi vào ô bắt tốt qua đường là nước yên lặng
+            moves = [move for move in moves if move.is_capture or move.is_pawn_promotion]
+        moves.sort(key=mvvLvaScore, reverse=True)
+        return moves
+
+    def getStagedMoves(self, hash_move_id=0, killers=(), quiet_key=None):
+        """
+        Như GameState.getStagedMoves nhưng mỗi giai đoạn chỉ được sinh khi tìm kiếm cần tới:
+        nước ăn quân/phong cấp được sinh bằng mặt nạ ô đích, nước yên lặng chỉ sinh khi chưa bị cắt tỉa.
+        """
+        yielded = set()
+        if hash_move_id:
+            move = self.findLegalMove(hash_move_id)
+            if move is not None:
+                yielded.add(move.moveID)
+                yield move
+
+        for move in self.getTacticalMoves():
+            if move.moveID not in yielded:
+                yielded.add(move.moveID)
+                yield move
+
+        for killer in killers:
+            if killer is None or killer.moveID in yielded:
+                continue
+            move = self.findLegalMove(killer.moveID)
+            if move is not None:
+                yielded.add(move.moveID)
+                yield move
+
+        # nước phong cấp đã được sinh ở giai đoạn trước; bắt tốt qua đường trùng moveID nên bị bỏ qua
+        promotion_pawns = self.bitboards["wp"] & (0xFF << 8) if self.white_to_move else self.bitboards["bp"] & (0xFF << 48)
+        quiet = []
+        self.generateMoves(quiet, from_mask=FULL_BOARD & ~promotion_pawns,
+                           to_mask=FULL_BOARD & ~(self.occupancy["w"] | self.occupancy["b"]))
+        if quiet_key is not None:
+            quiet.sort(key=quiet_key, reverse=True)
+        for move in quiet:
+            if move.moveID not in yielded:
+                yield move
+
+    def inCheck(self):
+        if self.white_to_move:
+            return self.attackersTo(lsb(self.bitboards["wK"]), "b", self.occupancy["w"] | self.occupancy["b"]) != 0
+        return self.attackersTo(lsb(self.bitboards["bK"]), "w", self.occupancy["w"] | self.occupancy["b"]) != 0
+
+    def squareUnderAttack(self, row, col):
+        enemy_color = "b" if self.white_to_move else "w"
+        return self.attackersTo(row * 8 + col, enemy_color, self.occupancy["w"] | self.occupancy["b"]) != 0
+
+    # Các hàm sinh nước đi theo từng quân (PGNExporter vẫn gọi trực tiếp) dùng chung bộ sinh bitboard
+    def getPawnMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
+
+    def getRookMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
+
+    def getKnightMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
+
+    def getBishopMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
+
+    def getQueenMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
+
+    def getKingMoves(self, row, col, moves):
+        self.generateMoves(moves, from_mask=1 << (row * 8 + col))
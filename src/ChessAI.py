@@ -2,223 +2,1235 @@
 Handling the AI moves.
 Có sử dụng thuật toán Minimax và cắt tỉa Alpha-beta
 """
+import atexit
+import pickle
+import queue
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import Process, Queue, Event, Value, shared_memory
 
-piece_score = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "p": 1}
-#Đánh giá mức độ quan trọng của từng quân cờ (VD: 0 là không thể để mất,Q là quan trọng nhất và chỉ mang tính tương đối)
-
-knight_scores = [[0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0],
-                 [0.1, 0.3, 0.5, 0.5, 0.5, 0.5, 0.3, 0.1],
-                 [0.2, 0.5, 0.6, 0.65, 0.65, 0.6, 0.5, 0.2],
-                 [0.2, 0.55, 0.65, 0.7, 0.7, 0.65, 0.55, 0.2],
-                 [0.2, 0.5, 0.65, 0.7, 0.7, 0.65, 0.5, 0.2],
-                 [0.2, 0.55, 0.6, 0.65, 0.65, 0.6, 0.55, 0.2],
-                 [0.1, 0.3, 0.5, 0.55, 0.55, 0.5, 0.3, 0.1],
-                 [0.0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.0]]
-
-bishop_scores = [[0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0],
-                 [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
-                 [0.2, 0.4, 0.5, 0.6, 0.6, 0.5, 0.4, 0.2],
-                 [0.2, 0.5, 0.5, 0.6, 0.6, 0.5, 0.5, 0.2],
-                 [0.2, 0.4, 0.6, 0.6, 0.6, 0.6, 0.4, 0.2],
-                 [0.2, 0.6, 0.6, 0.6, 0.6, 0.6, 0.6, 0.2],
-                 [0.2, 0.5, 0.4, 0.4, 0.4, 0.4, 0.5, 0.2],
-                 [0.0, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.0]]
-
-rook_scores = [[0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25],
-               [0.5, 0.75, 0.75, 0.75, 0.75, 0.75, 0.75, 0.5],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.0, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25, 0.0],
-               [0.25, 0.25, 0.25, 0.5, 0.5, 0.25, 0.25, 0.25]]
-
-queen_scores = [[0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0],
-                [0.2, 0.4, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2],
-                [0.2, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
-                [0.3, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
-                [0.4, 0.4, 0.5, 0.5, 0.5, 0.5, 0.4, 0.3],
-                [0.2, 0.5, 0.5, 0.5, 0.5, 0.5, 0.4, 0.2],
-                [0.2, 0.4, 0.5, 0.4, 0.4, 0.4, 0.4, 0.2],
-                [0.0, 0.2, 0.2, 0.3, 0.3, 0.2, 0.2, 0.0]]
-
-pawn_scores = [[0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8],
-               [0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7, 0.7],
-               [0.3, 0.3, 0.4, 0.5, 0.5, 0.4, 0.3, 0.3],
-               [0.25, 0.25, 0.3, 0.45, 0.45, 0.3, 0.25, 0.25],
-               [0.2, 0.2, 0.2, 0.4, 0.4, 0.2, 0.2, 0.2],
-               [0.25, 0.15, 0.1, 0.2, 0.2, 0.1, 0.15, 0.25],
-               [0.25, 0.3, 0.3, 0.0, 0.0, 0.3, 0.3, 0.25],
-               [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2]]
-
-piece_position_scores = {"wN": knight_scores,
-                         "bN": knight_scores[::-1],
-                         "wB": bishop_scores,
-                         "bB": bishop_scores[::-1],
-                         "wQ": queen_scores,
-                         "bQ": queen_scores[::-1],
-                         "wR": rook_scores,
-                         "bR": rook_scores[::-1],
-                         "wp": pawn_scores,
-                         "bp": pawn_scores[::-1]}
-
-CHECKMATE = 1000
+from src.TranspositionTable import TranspositionTable, TT_EXACT, TT_LOWER, TT_UPPER, tableBytes
+from src.Tablebase import findTablebaseMove, TB_DRAW
+import src.Evaluation as Evaluation
+from src.Evaluation import piece_score, MOP_UP_PHASE, MOP_UP_MARGIN, computeMaterialScore, computePhase, \
+    taperedScore, mopUpScore, pawnShieldScore
+from src.PawnHashTable import PawnHashTable
+from src.EvalCache import EvalCache, DEFAULT_EVAL_CACHE_ENTRIES
+
+# Điểm tính bằng centipawn (số nguyên). Chiếu hết ở ply nước tính từ gốc có điểm CHECKMATE - ply
+# để tìm kiếm ưu tiên chiếu hết nhanh nhất (và kéo dài khi bị chiếu hết)
+CHECKMATE = 100000
 STALEMATE = 0
+MAX_MATE_PLY = 1000
+MATE_THRESHOLD = CHECKMATE - MAX_MATE_PLY  # điểm có trị tuyệt đối từ đây trở lên là điểm chiếu hết
 
 # Định nghĩa các thuật toán cho AI
 ALGORITHM_WITH_PRUNING = "with_pruning"      # Sử dụng cắt tỉa alpha-beta
 ALGORITHM_WITHOUT_PRUNING = "without_pruning" # Không sử dụng cắt tỉa
+ALGORITHM_STAGED = "staged"                   # Cắt tỉa alpha-beta + sinh nước đi theo giai đoạn
+
+# Bảng chuyển vị dùng chung cho các lần tìm kiếm trong cùng tiến trình (None nếu tắt)
+DEFAULT_TT_SIZE_MB = 16
+transposition_table = None
+
+# Bảng băm cấu trúc tốt của tiến trình (mỗi tiến trình tìm kiếm có bảng riêng)
+PAWN_TABLE_ENTRIES = 1 << 14
+pawn_hash_table = PawnHashTable(PAWN_TABLE_ENTRIES)
+
+# Bộ đệm điểm tĩnh của tiến trình, tách khỏi bảng chuyển vị (None nếu tắt, đổi kích thước bằng setupEvalCache)
+eval_cache = EvalCache(DEFAULT_EVAL_CACHE_ENTRIES)
+
+# Cửa sổ rỗng của PVS: điểm là số nguyên centipawn nên hai điểm khác nhau chênh ít nhất 1
+NULL_WINDOW = 1
+
+# Mức độ khó trong menu -> (thời gian suy nghĩ mỗi nước tính bằng giây, độ sâu tối đa)
+DIFFICULTY_LEVELS = {1: (0.5, 2), 2: (1.5, 4), 3: (4.0, 8)}
+
+# Tìm kiếm song song: số tiến trình (1 = chỉ tìm trong tiến trình hiện tại) và cách chia việc
+PARALLEL_LAZY_SMP = "lazy_smp"      # mọi tiến trình cùng tìm cả cây, dùng chung bảng chuyển vị
+PARALLEL_ROOT_SPLIT = "root_split"  # chia các nước ở gốc cho một process pool dùng lại giữa các nước đi
+DEFAULT_THREADS = 1               # cũng là mặc định khi chơi trong giao diện (đổi bằng main.py --threads)
+AI_PONDER = True                  # tìm trước nước trả lời của máy trong lúc người chơi suy nghĩ
+AI_OPENING_BOOK = True            # đi ngay nước trong sách khai cuộc (src/OpeningBook.py) nếu có
+STOP_CHECK_NODES = 256            # số nút giữa hai lần kiểm tra tín hiệu dừng giữa các tiến trình
+STOP_POLL_INTERVAL = 0.01         # giây giữa hai lần kiểm tra tín hiệu dừng khi chờ các tiến trình của pool
+HELPER_JOIN_TIMEOUT = 2.0         # giây chờ tiến trình phụ dừng trước khi buộc kết thúc
+
+# Quản lý thời gian
+MOVES_TO_GO = 30           # số nước giả định còn phải đi khi chia thời gian còn lại trên đồng hồ
+TIME_SAFETY_MARGIN = 0.05  # giây để dành cho việc gửi nước đi về giao diện
+
+
+# Tìm kiếm tĩnh (quiescence): ở nút lá chỉ xét tiếp nước ăn quân / phong cấp cho tới khi thế cờ yên tĩnh
+QUIESCENCE_CHECK_EVASIONS = True  # khi bị chiếu ở nút tĩnh thì xét mọi nước thoát chiếu thay vì đứng yên
+QUIESCENCE_MAX_PLY = 8            # giới hạn độ sâu của tìm kiếm tĩnh
+DELTA_MARGIN = 200                # bỏ nước ăn quân nếu kể cả cộng thêm biên này vẫn không vượt được alpha
+
+# Điểm sắp xếp nước đi: nước trong bảng chuyển vị > ăn quân/phong cấp > nước sát thủ > nước đáp trả > lịch sử
+HASH_MOVE_ORDER = 1000000
+CAPTURE_ORDER = 100000
+KILLER_ORDER = 90000
+COUNTERMOVE_ORDER = 80000
+HISTORY_MAX = 50000  # điểm lịch sử luôn nhỏ hơn điểm của nước đáp trả
+
+# Chế độ chọn nước đi ở mỗi nút
+SEARCH_FULL_WIDTH = "full_width"  # xét mọi nước hợp lệ (mặc định)
+SEARCH_SELECTIVE = "selective"    # chỉ xét phần nước tốt nhất cộng một phần ngẫu nhiên của số còn lại
+
 
-def findBestMove(game_state, valid_moves, return_queue, depth=3, algorithm=ALGORITHM_WITH_PRUNING):
+class SearchConfig:
     """
-    Tìm nước đi tốt nhất cho AI dựa trên thuật toán được chọn
+    Cấu hình chọn nước đi của tìm kiếm
+
+    Mặc định tìm kiếm đầy đủ (full width) nên cùng thế cờ, cùng độ sâu luôn cho cùng cây tìm kiếm và cùng số nút.
+    Chế độ chọn lọc (SEARCH_SELECTIVE) phải được bật rõ ràng; phần ngẫu nhiên dùng bộ sinh số ngẫu nhiên riêng
+    khởi tạo từ seed, nên hai lần chạy cùng seed vẫn cho cùng kết quả.
+    """
+
+    def __init__(self, mode=SEARCH_FULL_WIDTH, exploit_ratio=0.4, explore_ratio=0.2, seed=0):
+        """
+        Tham số:
+        - mode: SEARCH_FULL_WIDTH hoặc SEARCH_SELECTIVE
+        - exploit_ratio: Tỷ lệ nước đi tốt nhất (theo thứ tự sắp xếp) luôn được xét ở chế độ chọn lọc
+        - explore_ratio: Tỷ lệ nước đi được chọn ngẫu nhiên trong phần còn lại ở chế độ chọn lọc
+        - seed: Hạt giống của bộ sinh số ngẫu nhiên (None để lấy ngẫu nhiên theo hệ thống)
+        """
+        if mode not in (SEARCH_FULL_WIDTH, SEARCH_SELECTIVE):
+            raise ValueError(f"Chế độ tìm kiếm không hợp lệ: {mode}")
+        self.mode = mode
+        self.exploit_ratio = exploit_ratio
+        self.explore_ratio = explore_ratio
+        self.seed = seed
+
+    @property
+    def selective(self):
+        return self.mode == SEARCH_SELECTIVE
+
+    def createRng(self, offset=0):
+        """Bộ sinh số ngẫu nhiên mới cho một lần tìm kiếm (offset khác nhau cho các tiến trình Lazy SMP)"""
+        return random.Random(None if self.seed is None else self.seed + offset)
+
+    def __str__(self):
+        if self.selective:
+            return f"{self.mode} ({self.exploit_ratio:.0%} + {self.explore_ratio:.0%}, seed={self.seed})"
+        return self.mode
+
+
+class SearchTimeout(Exception):
+    """Hết thời gian trong lúc đang tìm kiếm; lần lặp đang dở bị bỏ"""
+
+
+class SearchResult:
+    """
+    Kết quả của một lần tìm kiếm
+
+    - best_move: Nước đi tốt nhất (None nếu không có nước đi)
+    - score: Điểm (centipawn) của thế cờ gốc theo góc nhìn bên đang đi (dương là có lợi cho bên đi),
+      CHECKMATE - n khi chiếu hết sau n nước đơn (xem formatScore)
+    - depth: Độ sâu của lần lặp cuối cùng đã hoàn thành
+    - seldepth: Số nước sâu nhất đã đi tới tính từ gốc, kể cả tìm kiếm tĩnh
+    - pv: Biến chính (principal variation), danh sách nước đi bắt đầu bằng best_move
+    - nodes, quiescence_nodes: Số nút của tìm kiếm chính và của tìm kiếm tĩnh
+    - researches: Số lần PVS phải tìm lại với cửa sổ đầy đủ
+    - cutoffs, first_move_cutoffs: Số lần cắt tỉa beta và số lần cắt ngay ở nước đầu tiên
+    - first_move_cutoff_rate: Tỷ lệ cắt tỉa beta xảy ra ngay ở nước đầu tiên (đo chất lượng sắp xếp nước đi)
+    - tt_probes, tt_hits: Số lần tra bảng chuyển vị và số lần trúng
+    - tt_hit_rate: Tỷ lệ tra cứu bảng chuyển vị trúng (0.0 - 1.0)
+    - pawn_probes, pawn_hits, pawn_hit_rate: Số lần tra bảng băm cấu trúc tốt, số lần trúng và tỷ lệ trúng
+    - eval_cache_probes, eval_cache_hits, eval_cache_hit_rate: Tương tự cho bộ đệm điểm tĩnh
+    - branching_factor: Hệ số phân nhánh hiệu dụng (số nút của lần lặp cuối / lần lặp trước,
+      hoặc căn bậc depth của số nút khi tìm một lần với độ sâu cố định)
+    - movegen_time, eval_time: Số giây dành cho sinh nước đi và cho hàm đánh giá
+    - elapsed: Thời gian tìm kiếm (giây)
+    - threads: Số tiến trình đã tìm kiếm (Lazy SMP)
+    - helper_nodes: Tổng số nút (kể cả nút tĩnh) của các tiến trình phụ
+    """
+
+    def __init__(self, best_move=None, score=0, depth=0, pv=None, nodes=0, quiescence_nodes=0,
+                 researches=0, first_move_cutoff_rate=0.0, tt_hit_rate=0.0, elapsed=0.0, threads=1, helper_nodes=0):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.seldepth = 0
+        self.pv = pv if pv is not None else []
+        self.nodes = nodes
+        self.quiescence_nodes = quiescence_nodes
+        self.researches = researches
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.first_move_cutoff_rate = first_move_cutoff_rate
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_hit_rate = tt_hit_rate
+        self.pawn_probes = 0
+        self.pawn_hits = 0
+        self.pawn_hit_rate = 0.0
+        self.eval_cache_probes = 0
+        self.eval_cache_hits = 0
+        self.eval_cache_hit_rate = 0.0
+        self.branching_factor = 0.0
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.elapsed = elapsed
+        self.threads = threads
+        self.helper_nodes = helper_nodes
+
+    def addStats(self, other):
+        """Cộng dồn bộ đếm của một lần tìm kiếm khác (ví dụ phần việc của một tiến trình trong tìm kiếm chia gốc)"""
+        self.seldepth = max(self.seldepth, other.seldepth)
+        self.nodes += other.nodes
+        self.quiescence_nodes += other.quiescence_nodes
+        self.researches += other.researches
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.pawn_probes += other.pawn_probes
+        self.pawn_hits += other.pawn_hits
+        self.eval_cache_probes += other.eval_cache_probes
+        self.eval_cache_hits += other.eval_cache_hits
+        self.movegen_time += other.movegen_time
+        self.eval_time += other.eval_time
+        self.first_move_cutoff_rate = self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+        self.tt_hit_rate = self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+        self.pawn_hit_rate = self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+        self.eval_cache_hit_rate = self.eval_cache_hits / self.eval_cache_probes if self.eval_cache_probes else 0.0
+
+    def totalNodes(self):
+        """Tổng số nút của mọi tiến trình, kể cả tìm kiếm tĩnh"""
+        return self.nodes + self.quiescence_nodes + self.helper_nodes
+
+    def nodesPerSecond(self):
+        return self.totalNodes() / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        pv = " ".join(move.getUciNotation() for move in self.pv)
+        return (f"depth {self.depth} seldepth {self.seldepth} score {formatScore(self.score)} nodes {self.nodes} "
+                f"qnodes {self.quiescence_nodes} threads {self.threads} nps {self.nodesPerSecond():.0f} "
+                f"tthits {self.tt_hit_rate * 100:.1f}% pawnhits {self.pawn_hit_rate * 100:.1f}% "
+                f"evalhits {self.eval_cache_hit_rate * 100:.1f}% fmc {self.first_move_cutoff_rate * 100:.1f}% "
+                f"ebf {self.branching_factor:.2f} movegen {self.movegen_time:.3f}s eval {self.eval_time:.3f}s "
+                f"time {self.elapsed:.3f}s pv {pv}")
+
+
+def formatScore(score):
+    """Điểm dạng UCI: "cp N" hoặc "mate N" (N là số nước đi tới chiếu hết, âm nếu bên đi bị chiếu hết)"""
+    if abs(score) >= MATE_THRESHOLD:
+        moves = (CHECKMATE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def scoreToTable(score, ply):
+    """Điểm chiếu hết lưu vào bảng chuyển vị tính từ nút hiện tại thay vì từ gốc (để dùng lại ở ply khác)"""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    """Ngược lại của scoreToTable: điểm chiếu hết lấy từ bảng chuyển vị được tính lại theo khoảng cách tới gốc"""
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def findBestMove(game_state, valid_moves, return_queue, depth=3, algorithm=ALGORITHM_WITH_PRUNING,
+                 tt_size_mb=DEFAULT_TT_SIZE_MB, movetime=None, wtime=None, btime=None, inc=0, config=None,
+                 threads=DEFAULT_THREADS, parallel=PARALLEL_LAZY_SMP, stop_event=None, on_iteration=None):
+    """
+    Tìm nước đi tốt nhất cho AI dựa trên thuật toán được chọn và đưa nước đi vào return_queue
+    Nếu có giới hạn thời gian (movetime hoặc wtime/btime/inc) thì tìm kiếm sâu dần 1, 2, ... tới depth
+    và trả về nước tốt nhất của lần lặp cuối cùng đã hoàn thành.
     
     Tham số:
     - game_state: Trạng thái hiện tại của trò chơi
     - valid_moves: Danh sách các nước đi hợp lệ
     - return_queue: Hàng đợi để trả về nước đi tốt nhất
-    - depth: Độ sâu tìm kiếm
+    - depth: Độ sâu tìm kiếm (độ sâu tối đa khi có giới hạn thời gian)
     - algorithm: Thuật toán sử dụng (with_pruning hoặc without_pruning)
+    - tt_size_mb: Dung lượng bảng chuyển vị tính theo MB (0 để tắt)
+    - movetime: Thời gian suy nghĩ cố định cho nước này (giây)
+    - wtime, btime: Thời gian còn lại trên đồng hồ của trắng/đen (giây), dùng khi không có movetime
+    - inc: Thời gian cộng thêm sau mỗi nước (giây)
+    - config: SearchConfig (mặc định tìm kiếm đầy đủ)
+    - threads: Số tiến trình tìm kiếm (lớn hơn 1 để tìm song song)
+    - parallel: PARALLEL_LAZY_SMP (bảng chuyển vị trong bộ nhớ chia sẻ) hoặc PARALLEL_ROOT_SPLIT (chia nước ở gốc)
+    - stop_event: multiprocessing.Event để bên ngoài yêu cầu dừng; khi đó tìm kiếm sâu dần và trả về ngay
+      nước tốt nhất của lần lặp sâu nhất đã xong (hoặc nước tốt nhất đến lúc dừng nếu chưa xong lần lặp nào)
+    - on_iteration: Hàm nhận SearchResult sau mỗi lần lặp sâu dần đã xong (hoặc sau lần tìm duy nhất
+      khi tìm với độ sâu cố định), dùng để theo dõi thống kê trong lúc tìm
+
+    Trả về SearchResult của lần tìm kiếm (nước đi kèm thống kê: số nút, nút/giây, độ sâu, seldepth,
+    tra cứu bảng chuyển vị, cắt tỉa, hệ số phân nhánh, thời gian sinh nước đi và đánh giá)
     """
-    global DEPTH
-    DEPTH = depth
-    global next_move
-    next_move = None
-    #random.shuffle(valid_moves)
-    valid_moves = orderMoves(game_state, valid_moves)  
-    
-    is_white = game_state.white_to_move
-    
-    if algorithm == ALGORITHM_WITH_PRUNING:
-        # Sử dụng Minimax với cắt tỉa alpha-beta
-        findMoveMiniMaxAlphaBeta(game_state, valid_moves, depth, is_white, -CHECKMATE, CHECKMATE)
-    else:  # ALGORITHM_WITHOUT_PRUNING
-        # Sử dụng Minimax không cắt tỉa
-        findMoveMiniMax(game_state, valid_moves, depth, is_white)
-    
-    return_queue.put(next_move)
+    result = searchPosition(game_state, valid_moves, depth, algorithm, tt_size_mb, movetime, wtime, btime, inc, config,
+                            threads, parallel, stop_event, on_iteration)
+    return_queue.put(result.best_move)
+    return result
 
 
-def findMoveMiniMax(game_state, valid_moves, depth, is_maximizing):
+def searchPosition(game_state, valid_moves, depth=3, algorithm=ALGORITHM_WITH_PRUNING,
+                   tt_size_mb=DEFAULT_TT_SIZE_MB, movetime=None, wtime=None, btime=None, inc=0, config=None,
+                   threads=DEFAULT_THREADS, parallel=PARALLEL_LAZY_SMP, stop_event=None, on_iteration=None):
     """
-    Thuật toán Minimax không cắt tỉa
-    
+    Như findBestMove nhưng chỉ trả về SearchResult, không dùng hàng đợi.
+    Thế cờ thuộc bảng tàn cuộc (src/Tablebase.py) được trả lời ngay theo bảng, không tìm kiếm.
+    """
+    tablebase_move = findTablebaseMove(game_state, valid_moves)
+    if tablebase_move is not None:
+        return tablebaseResult(*tablebase_move)
+    if threads > 1 and parallel == PARALLEL_ROOT_SPLIT:
+        return searchRootSplit(game_state, valid_moves, depth, algorithm, tt_size_mb, movetime, wtime, btime, inc,
+                               config, threads, stop_event, on_iteration)
+    if threads > 1:
+        return searchLazySmp(game_state, valid_moves, depth, algorithm, tt_size_mb, movetime, wtime, btime, inc,
+                             config, threads, stop_event, on_iteration)
+    table = setupTranspositionTable(tt_size_mb)
+    start_time = time.perf_counter()
+    soft_limit, hard_limit = allocateMoveTime(game_state.white_to_move, movetime, wtime, btime, inc)
+    deadline = start_time + hard_limit if hard_limit is not None else None
+    search = Search(game_state, algorithm, table, deadline=deadline, config=config, stop_event=stop_event)
+    return runSearch(search, valid_moves, depth, start_time, soft_limit, on_iteration)
+
+
+def firstRootMove(moves, previous_best=None):
+    """Nước tốt nhất tạm thời ở gốc trước khi tìm xong nước nào: nước tốt nhất của lần lặp trước, nếu không có thì nước đầu tiên"""
+    if previous_best is not None:
+        return previous_best
+    return moves[0] if moves else None
+
+
+def tablebaseResult(move, probe):
+    """SearchResult của nước đi lấy từ bảng tàn cuộc; điểm chiếu hết trừ đi số nước đơn tới chiếu hết"""
+    outcome, dtm = probe
+    score = 0 if outcome == TB_DRAW else outcome * (CHECKMATE - dtm)
+    return SearchResult(move, score, 0, [move])
+
+
+def runSearch(search, valid_moves, depth, start_time, soft_limit, on_iteration=None):
+    """
+    Tìm một lần với độ sâu cố định nếu không có giới hạn thời gian lẫn tín hiệu dừng,
+    ngược lại tìm sâu dần để luôn có kết quả khi bị dừng giữa chừng
+    """
+    if soft_limit is None and search.stop_event is None:
+        result = search.searchRoot(valid_moves, depth)
+        result.elapsed = time.perf_counter() - start_time
+        if depth > 0 and result.nodes:
+            result.branching_factor = result.nodes ** (1 / depth)
+        if on_iteration is not None:
+            on_iteration(result)
+        return result
+    return iterativeDeepening(search, valid_moves, depth, start_time, soft_limit, on_iteration)
+
+
+def iterativeDeepening(search, valid_moves, depth, start_time, soft_limit=None, on_iteration=None):
+    """
+    Tìm kiếm sâu dần 1, 2, ... tới depth và trả về SearchResult của lần lặp cuối cùng đã hoàn thành
+
     Tham số:
-    - game_state: Trạng thái hiện tại của trò chơi
-    - valid_moves: Danh sách các nước đi hợp lệ
-    - depth: Độ sâu hiện tại của tìm kiếm
-    - is_maximizing: True nếu đang tối đa hóa (lượt trắng), False nếu đang tối thiểu hóa (lượt đen)
+    - search: Đối tượng Search (giữ thời hạn cứng và tín hiệu dừng)
+    - valid_moves: Danh sách nước đi hợp lệ ở gốc
+    - depth: Độ sâu tối đa
+    - start_time: Thời điểm time.perf_counter() bắt đầu suy nghĩ
+    - soft_limit: Không bắt đầu lần lặp mới nếu dự đoán sẽ vượt quá số giây này (None nếu không giới hạn)
+    - on_iteration: Hàm nhận SearchResult của mỗi lần lặp vừa xong (None nếu không cần)
     """
-    global next_move
-    
-    if depth == 0:
-        return scoreBoard(game_state)
-    
-    valid_moves = orderMoves(game_state, valid_moves)
-    
-    if is_maximizing:
-        max_eval = -CHECKMATE
-        for move in valid_moves:
-            game_state.makeMove(move)
-            next_moves = game_state.getValidMoves()
-            eval = findMoveMiniMax(game_state, next_moves, depth - 1, False)
-            game_state.undoMove()
-            if eval > max_eval:
-                max_eval = eval
-                if depth == DEPTH:
-                    next_move = move
-        return max_eval
+    game_state = search.game_state
+    log_length = len(game_state.move_log)
+    result = SearchResult()
+    previous_duration = None
+    previous_nodes = 0
+    branching_factor = 0.0
+    for current_depth in range(1, depth + 1):
+        iteration_start = time.perf_counter()
+        nodes_before = search.nodes
+        try:
+            result = search.searchRoot(valid_moves, current_depth, result.best_move)
+        except SearchTimeout:
+            # trả bàn cờ về vị trí gốc và giữ kết quả của lần lặp trước
+            while len(game_state.move_log) > log_length:
+                game_state.undoMove()
+            if result.best_move is None:
+                result.best_move = search.root_best_move  # chưa xong lần lặp nào: dùng nước tốt nhất đến lúc dừng
+            break
+        # hệ số phân nhánh hiệu dụng: số nút của lần lặp này so với lần lặp trước
+        iteration_nodes = search.nodes - nodes_before
+        if previous_nodes:
+            branching_factor = iteration_nodes / previous_nodes
+        previous_nodes = iteration_nodes
+        now = time.perf_counter()
+        if on_iteration is not None:
+            result.branching_factor = branching_factor
+            result.elapsed = now - start_time
+            on_iteration(result)
+        if soft_limit is None:
+            continue
+        duration = now - iteration_start
+        # ước lượng lần lặp sau bằng hệ số phân nhánh của hai lần lặp gần nhất
+        if previous_duration and previous_duration > 0.001:
+            branching = max(2.0, duration / previous_duration)
+        else:
+            branching = 4.0
+        previous_duration = duration
+        if now - start_time + duration * branching > soft_limit:
+            break
+    search.fillStats(result)
+    result.branching_factor = branching_factor
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+def searchLazySmp(game_state, valid_moves, depth, algorithm, tt_size_mb, movetime, wtime, btime, inc, config, threads,
+                  stop_event=None, on_iteration=None):
+    """
+    Tìm kiếm song song kiểu Lazy SMP: threads - 1 tiến trình phụ cùng tìm từ thế cờ gốc với độ sâu lệch nhau
+    và thứ tự nước đi ở gốc khác nhau, mọi tiến trình dùng chung một bảng chuyển vị đặt trong bộ nhớ chia sẻ.
+    Tiến trình phụ không trả nước đi; chúng chỉ lấp đầy bảng chuyển vị để tiến trình chính (tiến trình hiện tại)
+    cắt tỉa sớm hơn. Khi tiến trình chính xong, các tiến trình phụ được báo dừng và kết quả của tiến trình chính
+    được trả về như tìm kiếm một tiến trình.
+    Bảng chia sẻ và các tiến trình phụ được giữ giữa các lần tìm (xem getLazySmpPool): bảng chỉ được làm cũ
+    bằng newSearch và tiến trình phụ chỉ nhận phần thay đổi của bàn cờ (xem lazySmpTask).
+    """
+    start_time = time.perf_counter()
+    soft_limit, hard_limit = allocateMoveTime(game_state.white_to_move, movetime, wtime, btime, inc)
+    deadline = start_time + hard_limit if hard_limit is not None else None
+    table = getLazySmpPool(threads - 1, tt_size_mb or DEFAULT_TT_SIZE_MB)
+    table.newSearch()
+    task = lazySmpTask(game_state, algorithm, depth, deadline, config, table.generation)
+    lazy_smp_stop.clear()  # các tiến trình phụ đều đang rảnh nên tín hiệu dừng chỉ thuộc về lần tìm này
+    for tasks in lazy_smp_tasks:
+        tasks.put(task)
+    helper_nodes = 0
+    try:
+        search = Search(game_state, algorithm, table, deadline=deadline, config=config, stop_event=stop_event)
+        result = runSearch(search, valid_moves, depth, start_time, soft_limit, on_iteration)
+    finally:
+        lazy_smp_stop.set()
+        for _ in lazy_smp_helpers:
+            try:
+                nodes, synced = lazy_smp_stats.get(timeout=HELPER_JOIN_TIMEOUT)
+            except queue.Empty:
+                # tiến trình phụ không trả lời: tạo lại pool ở lần tìm sau thay vì trộn số liệu của hai lần tìm
+                shutdownLazySmpPool()
+                break
+            helper_nodes += nodes
+            if not synced:
+                resetLazySmpPosition()
+    result.threads = threads
+    result.helper_nodes = helper_nodes
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+# Bảng chuyển vị chia sẻ và các tiến trình phụ của Lazy SMP: tạo một lần, dùng lại cho các nước đi sau
+# (tạo lại nếu đổi số tiến trình hoặc kích thước bảng)
+lazy_smp_memory = None
+lazy_smp_table = None
+lazy_smp_helpers = []
+lazy_smp_tasks = []         # mỗi tiến trình phụ một hàng đợi việc
+lazy_smp_stop = None        # Event báo các tiến trình phụ dừng lần tìm hiện tại
+lazy_smp_stats = None       # hàng đợi (số nút, bàn cờ đúng) của các tiến trình phụ sau mỗi lần tìm
+lazy_smp_root = None        # (kiểu GameState, khóa Zobrist ban đầu) của bàn cờ các tiến trình phụ đang giữ
+lazy_smp_moves = []         # (moveID, quân phong cấp) các tiến trình phụ đã đi từ thế cờ ban đầu đó
+
+
+def getLazySmpPool(helpers, size_mb):
+    """
+    Trả về bảng chuyển vị chia sẻ của Lazy SMP, tạo bảng và helpers tiến trình phụ khi chưa có
+    hoặc khác số tiến trình / kích thước bảng
+    """
+    global lazy_smp_memory, lazy_smp_table, lazy_smp_stop, lazy_smp_stats
+    if lazy_smp_table is not None and len(lazy_smp_helpers) == helpers and lazy_smp_table.size_mb == size_mb:
+        return lazy_smp_table
+    shutdownLazySmpPool()
+    memory = shared_memory.SharedMemory(create=True, size=tableBytes(size_mb))
+    lazy_smp_stop = Event()
+    lazy_smp_stats = Queue()
+    for helper_id in range(1, helpers + 1):
+        tasks = Queue()
+        helper = Process(target=lazySmpHelper,
+                         args=(memory.name, size_mb, helper_id, tasks, lazy_smp_stop, lazy_smp_stats),
+                         daemon=True)
+        helper.start()
+        lazy_smp_helpers.append(helper)
+        lazy_smp_tasks.append(tasks)
+    # gán bảng sau khi tạo tiến trình phụ để chúng không thừa hưởng lazy_smp_table qua fork
+    lazy_smp_memory = memory
+    lazy_smp_table = TranspositionTable(size_mb, memory.buf)
+    atexit.register(shutdownLazySmpPool)
+    return lazy_smp_table
+
+
+def shutdownLazySmpPool():
+    """Dừng các tiến trình phụ của Lazy SMP và xóa bảng chuyển vị chia sẻ (nếu có)"""
+    global lazy_smp_memory, lazy_smp_table
+    atexit.unregister(shutdownLazySmpPool)
+    for tasks in lazy_smp_tasks:
+        tasks.put(None)
+    for helper in lazy_smp_helpers:
+        helper.join(HELPER_JOIN_TIMEOUT)
+        if helper.is_alive():
+            helper.terminate()
+    lazy_smp_helpers.clear()
+    lazy_smp_tasks.clear()
+    resetLazySmpPosition()
+    if lazy_smp_table is not None:
+        lazy_smp_table.release()
+        lazy_smp_table = None
+    if lazy_smp_memory is not None:
+        lazy_smp_memory.close()
+        lazy_smp_memory.unlink()
+        lazy_smp_memory = None
+
+
+def resetLazySmpPosition():
+    """Quên bàn cờ các tiến trình phụ đang giữ: lần tìm sau gửi lại toàn bộ GameState"""
+    global lazy_smp_root
+    lazy_smp_root = None
+    lazy_smp_moves.clear()
+
+
+def lazySmpTask(game_state, algorithm, depth, deadline, config, generation):
+    """
+    Việc gửi cho các tiến trình phụ của Lazy SMP. Như EngineWorker.syncPosition, nếu bàn cờ các tiến trình phụ
+    đang giữ bắt đầu từ cùng thế cờ ban đầu thì chỉ gửi số nước cần hoàn tác và các nước mới;
+    chỉ khi đổi thế cờ ban đầu (ván mới từ FEN khác, bàn cờ khác kiểu) mới gửi cả GameState (đã tuần tự hóa).
+    """
+    global lazy_smp_root
+    root = (type(game_state), game_state.zobrist_log[0])
+    moves = [(move.moveID, move.promotion_choice) for move in game_state.move_log]
+    if root != lazy_smp_root:
+        # Queue.put tuần tự hóa trong luồng nền khi tìm kiếm đã bắt đầu đi thử nước: chụp bàn cờ ngay bây giờ
+        new_state, undo_count, new_moves = pickle.dumps(game_state), 0, []
     else:
-        min_eval = CHECKMATE
-        for move in valid_moves:
+        common = 0
+        limit = min(len(moves), len(lazy_smp_moves))
+        while common < limit and moves[common] == lazy_smp_moves[common]:
+            common += 1
+        new_state, undo_count, new_moves = None, len(lazy_smp_moves) - common, moves[common:]
+    lazy_smp_root = root
+    lazy_smp_moves[:] = moves
+    return new_state, undo_count, new_moves, algorithm, depth, deadline, config, generation, table_epoch
+
+
+def lazySmpHelper(memory_name, size_mb, helper_id, tasks, stop_event, stats_queue):
+    """
+    Tiến trình phụ của Lazy SMP: với mỗi việc nhận từ hàng đợi tasks, cập nhật bàn cờ riêng rồi tìm sâu dần
+    trên bảng chuyển vị chia sẻ tới khi tiến trình chính báo dừng, sau đó gửi (số nút đã duyệt, bàn cờ đúng)
+    qua stats_queue. Tiến trình phụ lẻ bắt đầu từ độ sâu 2 và tìm sâu hơn tiến trình chính một nước để
+    các tiến trình không cùng lúc tìm cùng một độ sâu. Việc None kết thúc tiến trình.
+    """
+    global table_epoch
+    memory = shared_memory.SharedMemory(name=memory_name)  # tiến trình chính sở hữu và xóa vùng nhớ
+    table = TranspositionTable(size_mb, memory.buf)
+    game_state = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            new_state, undo_count, new_moves, algorithm, depth, deadline, config, generation, epoch = task
+            if new_state is not None:
+                game_state = pickle.loads(new_state)
+            for _ in range(undo_count):
+                game_state.undoMove()
+            synced = True
+            for move_id, promotion in new_moves:
+                move = next((move for move in game_state.getValidMoves() if move.moveID == move_id), None)
+                if move is None:
+                    synced = False  # lệch bàn cờ với tiến trình chính: chờ lần tìm sau gửi lại cả GameState
+                    break
+                move.promotion_choice = promotion
+                game_state.makeMove(move, promotion)
+            if epoch != table_epoch:
+                # bảng chia sẻ do tiến trình chính xóa; ở đây chỉ xóa các bảng riêng của tiến trình
+                pawn_hash_table.clear()
+                if eval_cache is not None:
+                    eval_cache.clear()
+                table_epoch = epoch
+            table.generation = generation
+            search = Search(game_state, algorithm, table, deadline=deadline, config=config,
+                            stop_event=stop_event, helper_id=helper_id)
+            log_length = len(game_state.move_log)
+            try:
+                if synced:
+                    for current_depth in range(1 + helper_id % 2, depth + 2):
+                        search.searchRoot(game_state.getValidMoves(), current_depth)
+                else:
+                    stop_event.wait()
+            except SearchTimeout:
+                while len(game_state.move_log) > log_length:
+                    game_state.undoMove()
+            stats_queue.put((search.nodes + search.quiescence_nodes, synced))
+    finally:
+        table.release()
+        memory.close()
+
+
+def searchRootSplit(game_state, valid_moves, depth, algorithm, tt_size_mb, movetime, wtime, btime, inc, config, threads,
+                    stop_event=None, on_iteration=None):
+    """
+    Tìm kiếm song song bằng cách chia các nước ở gốc cho threads tiến trình của process pool dùng chung
+    (xem RootSplitSearch); có giới hạn thời gian thì vẫn tìm sâu dần như tìm kiếm một tiến trình
+    """
+    start_time = time.perf_counter()
+    soft_limit, hard_limit = allocateMoveTime(game_state.white_to_move, movetime, wtime, btime, inc)
+    deadline = start_time + hard_limit if hard_limit is not None else None
+    search = RootSplitSearch(game_state, algorithm, threads, tt_size_mb, config, deadline, stop_event)
+    return runSearch(search, valid_moves, depth, start_time, soft_limit, on_iteration)
+
+
+# Process pool của tìm kiếm chia gốc: tạo một lần, dùng lại cho các nước đi sau (tạo lại nếu đổi số tiến trình)
+root_split_pool = None
+root_split_workers = 0
+root_split_alpha = None  # alpha tốt nhất ở gốc, chia sẻ giữa các tiến trình của pool
+root_split_stop = None   # Event báo các tiến trình của pool bỏ phần việc đang tìm
+table_epoch = 0          # tăng mỗi lần clearTranspositionTable để các tiến trình của pool cũng xóa bảng của mình
+
+
+def getRootSplitPool(workers):
+    """Trả về process pool với workers tiến trình, chỉ tạo mới khi chưa có hoặc khác số tiến trình"""
+    global root_split_pool, root_split_workers, root_split_alpha, root_split_stop
+    if root_split_pool is None or root_split_workers != workers:
+        shutdownRootSplitPool()
+        root_split_alpha = Value("i", -CHECKMATE)
+        root_split_stop = Event()
+        root_split_pool = ProcessPoolExecutor(workers, initializer=initRootSplitWorker,
+                                              initargs=(root_split_alpha, root_split_stop))
+        root_split_workers = workers
+    return root_split_pool
+
+
+def shutdownRootSplitPool():
+    """Dừng process pool của tìm kiếm chia gốc (nếu có)"""
+    global root_split_pool, root_split_workers
+    if root_split_pool is not None:
+        root_split_pool.shutdown(cancel_futures=True)
+        root_split_pool = None
+        root_split_workers = 0
+
+
+def initRootSplitWorker(shared_alpha, stop_event):
+    """Chạy một lần khi tiến trình của pool khởi động: nhận alpha và tín hiệu dừng dùng chung"""
+    global root_split_alpha, root_split_stop, lazy_smp_table
+    root_split_alpha = shared_alpha
+    root_split_stop = stop_event
+    lazy_smp_table = None  # bảng Lazy SMP thừa hưởng qua fork thuộc tiến trình chính, không được xóa ở đây
+
+
+class RootSplitSearch:
+    """
+    Tìm kiếm chia gốc: các nước ở gốc (đã sắp xếp) được chia xen kẽ cho các tiến trình của pool, mỗi tiến trình
+    tìm alpha-beta trên phần của mình với bảng chuyển vị riêng. Điểm tốt nhất ở gốc được chia sẻ qua
+    multiprocessing.Value để các tiến trình thu hẹp cửa sổ của nhau. Có cùng giao diện với Search
+    (searchRoot, fillStats, root_best_move) để dùng được với iterativeDeepening.
+    """
+
+    def __init__(self, game_state, algorithm, workers, tt_size_mb=DEFAULT_TT_SIZE_MB, config=None, deadline=None,
+                 stop_event=None):
+        self.game_state = game_state
+        self.algorithm = algorithm
+        self.workers = workers
+        self.tt_size_mb = tt_size_mb
+        self.config = config if config is not None else SearchConfig()
+        self.rng = self.config.createRng()
+        self.deadline = deadline
+        self.stop_event = stop_event
+        self.pool = getRootSplitPool(workers)
+        self.stats = SearchResult()  # bộ đếm cộng dồn từ mọi phần việc của các tiến trình
+        self.root_best_move = None
+
+    @property
+    def nodes(self):
+        return self.stats.nodes
+
+    def fillStats(self, result):
+        result.addStats(self.stats)
+        result.threads = self.workers
+
+    def searchRoot(self, valid_moves, depth, previous_best=None):
+        """
+        Tìm kiếm với độ sâu cố định, chia nước ở gốc cho các tiến trình của pool
+
+        Trả về SearchResult; ném SearchTimeout nếu có tiến trình chưa tìm xong phần của mình khi hết giờ
+        """
+        root_moves = orderMoves(self.game_state, valid_moves, previous_best.moveID if previous_best is not None else 0,
+                                config=self.config, rng=self.rng)
+        self.root_best_move = firstRootMove(root_moves, previous_best)
+        chunks = [root_moves[index::self.workers] for index in range(self.workers)]
+        time_left = self.deadline - time.perf_counter() if self.deadline is not None else None
+        root_split_alpha.value = -CHECKMATE - 1
+        root_split_stop.clear()
+        futures = [self.pool.submit(searchRootMoves, self.game_state, [move.moveID for move in chunk], depth,
+                                    self.algorithm, self.tt_size_mb, self.config, time_left, table_epoch)
+                   for chunk in chunks if chunk]
+        if self.stop_event is not None:
+            # chờ các tiến trình và chuyển tín hiệu dừng từ bên ngoài sang tín hiệu dừng của pool
+            while wait(futures, timeout=STOP_POLL_INTERVAL).not_done:
+                if self.stop_event.is_set():
+                    root_split_stop.set()
+        best = None
+        completed = True
+        for future in futures:
+            chunk_best, chunk_stats, chunk_completed = future.result()
+            self.stats.addStats(chunk_stats)
+            completed = completed and chunk_completed
+            # (điểm, là điểm chính xác): điểm chính xác thắng cận trên bằng điểm của phần bị cắt tỉa
+            if chunk_best is not None and (best is None or chunk_best[:2] > best[:2]):
+                best = chunk_best
+        if best is not None:
+            self.root_best_move = best[2][0]
+        if not completed:
+            raise SearchTimeout()
+        if best is None:
+            return SearchResult(depth=depth)
+        result = SearchResult(best[2][0], best[0], depth, best[2])
+        self.fillStats(result)
+        return result
+
+
+def searchRootMoves(game_state, move_ids, depth, algorithm, tt_size_mb, config, time_left, epoch):
+    """
+    Việc của một tiến trình trong tìm kiếm chia gốc: tìm các nước move_ids ở gốc tới độ sâu depth.
+    Bảng chuyển vị của tiến trình được giữ giữa các lần gọi và chỉ bị xóa khi epoch khác lần trước.
+
+    Trả về ((điểm, là điểm chính xác, biến chính) của nước tốt nhất hoặc None,
+    SearchResult chỉ chứa thống kê của phần việc, đã tìm xong hay chưa)
+    """
+    global table_epoch
+    if epoch != table_epoch:
+        clearTranspositionTable()
+        table_epoch = epoch
+    table = setupTranspositionTable(tt_size_mb)
+    deadline = time.perf_counter() + time_left if time_left is not None else None
+    search = Search(game_state, algorithm, table, deadline=deadline, config=config, stop_event=root_split_stop)
+    moves = {move.moveID: move for move in game_state.getValidMoves()}
+    log_length = len(game_state.move_log)
+    best = None
+    completed = True
+    try:
+        for move_id in move_ids:
+            move = moves[move_id]
+            alpha = max(best[0] if best is not None else -CHECKMATE - 1, root_split_alpha.value)
             game_state.makeMove(move)
-            next_moves = game_state.getValidMoves()
-            eval = findMoveMiniMax(game_state, next_moves, depth - 1, True)
+            next_moves = None if search.staged else search.generateMoves()
+            if algorithm == ALGORITHM_WITHOUT_PRUNING:
+                score = -search.negamax(next_moves, depth - 1, 1)
+            else:
+                score = -search.principalVariationSearch(next_moves, depth - 1, -CHECKMATE - 1, -alpha, 1)
             game_state.undoMove()
-            if eval < min_eval:
-                min_eval = eval
-                if depth == DEPTH:
-                    next_move = move
-        return min_eval
+            exact = score > alpha or algorithm == ALGORITHM_WITHOUT_PRUNING
+            if best is None or (score, exact) > best[:2]:
+                best = (score, exact, [move] + search.pv_table.get(1, []))
+            with root_split_alpha.get_lock():
+                if exact and score > root_split_alpha.value:
+                    root_split_alpha.value = score
+    except SearchTimeout:
+        while len(game_state.move_log) > log_length:
+            game_state.undoMove()
+        completed = False
+    stats = SearchResult()
+    search.fillStats(stats)
+    return best, stats, completed
 
 
-def findMoveMiniMaxAlphaBeta(game_state, valid_moves, depth, is_maximizing, alpha, beta):
+def allocateMoveTime(white_to_move, movetime=None, wtime=None, btime=None, inc=0):
     """
-    Thuật toán Minimax với cắt tỉa Alpha-Beta
-    
-    Tham số:
-    - game_state: Trạng thái hiện tại của trò chơi
-    - valid_moves: Danh sách các nước đi hợp lệ
-    - depth: Độ sâu hiện tại của tìm kiếm
-    - is_maximizing: True nếu đang tối đa hóa (lượt trắng), False nếu đang tối thiểu hóa (lượt đen)
-    - alpha, beta: Giá trị giới hạn cho cắt tỉa Alpha-Beta
+    Chia thời gian cho nước đi hiện tại
+
+    Trả về (giới hạn mềm, giới hạn cứng) tính bằng giây, hoặc (None, None) nếu không giới hạn thời gian.
+    Không bắt đầu lần lặp mới khi dự đoán sẽ vượt giới hạn mềm; dừng ngay khi chạm giới hạn cứng.
     """
-    global next_move
-    
-    if depth == 0:
-        return scoreBoard(game_state)
-    
-    valid_moves = orderMoves(game_state, valid_moves)
-    
-    if is_maximizing:
-        max_eval = -CHECKMATE
-        for move in valid_moves:
+    if movetime is not None:
+        limit = max(0.01, movetime - TIME_SAFETY_MARGIN)
+        return limit, limit
+    remaining = wtime if white_to_move else btime
+    if remaining is None:
+        return None, None
+    usable = max(0.01, remaining - TIME_SAFETY_MARGIN)
+    soft_limit = min(usable, usable / MOVES_TO_GO + inc * 0.75)
+    hard_limit = min(usable, soft_limit * 3)
+    return soft_limit, hard_limit
+
+
+def setupTranspositionTable(size_mb):
+    """
+    Tạo (hoặc đổi kích thước) bảng chuyển vị và bắt đầu một lần tìm kiếm mới; size_mb = 0 để tắt
+    Trả về bảng chuyển vị (None nếu tắt)
+    """
+    global transposition_table
+    if not size_mb:
+        transposition_table = None
+        return None
+    if transposition_table is None or transposition_table.size_mb != size_mb:
+        transposition_table = TranspositionTable(size_mb)
+    transposition_table.newSearch()
+    return transposition_table
+
+
+def setupEvalCache(entries):
+    """
+    Tạo (hoặc đổi kích thước) bộ đệm điểm tĩnh của tiến trình; entries = 0 để tắt
+    Trả về bộ đệm (None nếu tắt)
+    """
+    global eval_cache
+    if not entries:
+        eval_cache = None
+    elif eval_cache is None or eval_cache.entries != entries:
+        eval_cache = EvalCache(entries)
+    return eval_cache
+
+
+def clearTranspositionTable():
+    """
+    Xóa bảng chuyển vị (cùng bảng băm cấu trúc tốt và bộ đệm điểm tĩnh) để lần tìm kiếm sau
+    không dùng lại kết quả cũ (ví dụ khi đo hiệu suất)
+    """
+    global table_epoch
+    table_epoch += 1
+    if transposition_table is not None:
+        transposition_table.clear()
+    if lazy_smp_table is not None:
+        lazy_smp_table.clear()
+    pawn_hash_table.clear()
+    if eval_cache is not None:
+        eval_cache.clear()
+
+
+class Search:
+    """
+    Một lần tìm kiếm negamax trên một game_state. Mọi trạng thái của lần tìm kiếm (nước sát thủ, biến chính,
+    bộ đếm nút, thời hạn) nằm trong đối tượng nên nhiều tìm kiếm có thể chạy song song trong các worker.
+
+    Điểm trong negamax luôn tính theo góc nhìn bên đang đi: điểm của một nút bằng trừ điểm tốt nhất của nút con.
+    """
+
+    def __init__(self, game_state, algorithm=ALGORITHM_WITH_PRUNING, transposition_table=None, deadline=None,
+                 config=None, stop_event=None, helper_id=0):
+        """
+        Tham số:
+        - game_state: Trạng thái trò chơi cần tìm kiếm (được trả về nguyên vẹn sau mỗi lần tìm)
+        - algorithm: ALGORITHM_WITH_PRUNING, ALGORITHM_WITHOUT_PRUNING hoặc ALGORITHM_STAGED
+        - transposition_table: Bảng chuyển vị dùng chung (None để tắt)
+        - deadline: Thời điểm time.perf_counter() phải dừng (None nếu không giới hạn)
+        - config: SearchConfig (mặc định tìm kiếm đầy đủ); sinh nước đi theo giai đoạn luôn xét đầy đủ
+        - stop_event: multiprocessing.Event báo dừng tìm kiếm từ tiến trình khác (None nếu không dùng)
+        - helper_id: Số thứ tự tiến trình phụ của Lazy SMP (0 là tiến trình chính); tiến trình phụ
+          xáo trộn thứ tự các nước ở gốc sau nước tốt nhất để không lặp lại đúng cây của tiến trình chính
+        """
+        self.game_state = game_state
+        self.algorithm = algorithm
+        self.staged = algorithm == ALGORITHM_STAGED
+        self.tt = transposition_table
+        self.deadline = deadline
+        self.config = config if config is not None else SearchConfig()
+        self.stop_event = stop_event
+        self.next_stop_check = 0
+        self.helper_id = helper_id
+        self.rng = self.config.createRng(helper_id)
+        self.killer_moves = {}  # ply -> tối đa 2 nước yên lặng gây cắt tỉa beta
+        self.countermoves = [None] * 4096               # nước đáp trả gây cắt tỉa, theo (ô đi, ô đến) của nước trước
+        self.history = ([0] * 4096, [0] * 4096)         # bảng lịch sử (butterfly) của trắng/đen theo (ô đi, ô đến)
+        self.pv_table = {}      # ply -> biến chính tính từ ply đó
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.seldepth = 0
+        self.researches = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.root_best_move = None
+        pawn_hash_table.resetStats()
+        self.eval_cache = eval_cache
+        if eval_cache is not None:
+            eval_cache.resetStats()
+
+    def fillStats(self, result):
+        result.seldepth = self.seldepth
+        result.nodes = self.nodes
+        result.quiescence_nodes = self.quiescence_nodes
+        result.researches = self.researches
+        result.cutoffs = self.cutoffs
+        result.first_move_cutoffs = self.first_move_cutoffs
+        result.first_move_cutoff_rate = self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+        if self.tt is not None:
+            result.tt_probes = self.tt.probes
+            result.tt_hits = self.tt.hits
+            result.tt_hit_rate = self.tt.hitRate()
+        result.pawn_probes = pawn_hash_table.probes
+        result.pawn_hits = pawn_hash_table.hits
+        result.pawn_hit_rate = pawn_hash_table.hitRate()
+        if self.eval_cache is not None:
+            result.eval_cache_probes = self.eval_cache.probes
+            result.eval_cache_hits = self.eval_cache.hits
+            result.eval_cache_hit_rate = self.eval_cache.hitRate()
+        result.movegen_time = self.movegen_time
+        result.eval_time = self.eval_time
+
+    def generateMoves(self, tactical=False):
+        """Sinh nước đi hợp lệ (chỉ nước ăn quân / phong cấp nếu tactical) và cộng thời gian vào movegen_time"""
+        start = time.perf_counter()
+        moves = self.game_state.getTacticalMoves() if tactical else self.game_state.getValidMoves()
+        self.movegen_time += time.perf_counter() - start
+        return moves
+
+    def timedMoves(self, moves):
+        """Duyệt bộ sinh nước đi lười (getStagedMoves), cộng thời gian sinh từng nước vào movegen_time"""
+        iterator = iter(moves)
+        while True:
+            start = time.perf_counter()
+            move = next(iterator, None)
+            self.movegen_time += time.perf_counter() - start
+            if move is None:
+                return
+            yield move
+
+    def evaluate(self):
+        """
+        Điểm tĩnh (evaluateBoard) theo góc nhìn bên đang đi, cộng thời gian vào eval_time.
+        Tra bộ đệm điểm tĩnh trước khi đánh giá (dùng cho nút lá và điểm đứng yên của tìm kiếm tĩnh)
+        """
+        start = time.perf_counter()
+        cache = self.eval_cache
+        score = cache.probe(self.game_state.zobrist) if cache is not None else None
+        if score is None:
+            score = evaluateBoard(self.game_state)
+            if cache is not None:
+                cache.store(self.game_state.zobrist, score)
+        self.eval_time += time.perf_counter() - start
+        return score if self.game_state.white_to_move else -score
+
+    def checkDeadline(self):
+        """Ném SearchTimeout khi đã quá giới hạn thời gian cứng hoặc có tín hiệu dừng"""
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.nodes + self.quiescence_nodes >= self.next_stop_check:
+            self.next_stop_check = self.nodes + self.quiescence_nodes + STOP_CHECK_NODES
+            if self.stop_event.is_set():
+                raise SearchTimeout()
+
+    def searchRoot(self, valid_moves, depth, previous_best=None):
+        """
+        Tìm kiếm với độ sâu cố định từ thế cờ gốc
+
+        Tham số:
+        - valid_moves: Danh sách nước đi hợp lệ ở gốc (bỏ qua với ALGORITHM_STAGED)
+        - depth: Độ sâu tìm kiếm
+        - previous_best: Nước tốt nhất của lần lặp trước (luôn được xét đầu tiên ở gốc)
+
+        Trả về SearchResult
+        """
+        root_moves = None
+        if not self.staged:
+            #random.shuffle(valid_moves)
+            root_moves = self.orderMoves(valid_moves, previous_best.moveID if previous_best is not None else 0, 0)
+            if self.helper_id:
+                rest = root_moves[1:]
+                self.rng.shuffle(rest)
+                root_moves = root_moves[:1] + rest
+        # bị dừng trước khi xét xong nước đầu tiên thì vẫn trả về một nước hợp lệ: nước được xét đầu tiên
+        self.root_best_move = firstRootMove(root_moves or valid_moves, previous_best)
+        if self.algorithm == ALGORITHM_WITHOUT_PRUNING:
+            score = self.negamax(root_moves, depth, 0)
+        else:
+            score = self.principalVariationSearch(root_moves, depth, -CHECKMATE, CHECKMATE, 0)
+        pv = self.pv_table.get(0, [])
+        result = SearchResult(pv[0] if pv else self.root_best_move, score, depth, list(pv))
+        self.fillStats(result)
+        return result
+
+    def updatePV(self, ply, move):
+        self.pv_table[ply] = [move] + self.pv_table.get(ply + 1, [])
+
+    def terminalScore(self, ply):
+        """Điểm theo góc nhìn bên đi khi không còn nước đi (chiếu hết sau ply nước tính từ gốc hoặc hòa pat)"""
+        setEndFlags(self.game_state, False)
+        return self.endScore(ply)
+
+    def endScore(self, ply):
+        """Điểm theo góc nhìn bên đi của thế cờ đã được đánh dấu chiếu hết / hòa pat"""
+        if self.game_state.checkmate:
+            return ply - CHECKMATE
+        return STALEMATE
+
+    def negamax(self, valid_moves, depth, ply):
+        """
+        Negamax không cắt tỉa (thuật toán without_pruning)
+        Chỉ dùng các mục điểm chính xác của bảng chuyển vị vì không có cửa sổ alpha-beta
+        """
+        game_state = self.game_state
+        self.nodes += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        self.pv_table[ply] = []
+        if depth == 0:
+            if game_state.checkmate or game_state.stalemate:
+                return self.endScore(ply)
+            return self.evaluate()
+        self.checkDeadline()
+
+        tt = self.tt
+        hash_move_id = 0
+        if tt is not None:
+            entry = tt.probe(game_state.zobrist)
+            if entry is not None:
+                tt_depth, tt_score, tt_bound, hash_move_id = entry
+                if ply > 0 and tt_depth >= depth and tt_bound == TT_EXACT:
+                    return scoreFromTable(tt_score, ply)
+
+        best_score = None
+        best_move = None
+        for move in self.orderMoves(valid_moves, hash_move_id, ply):
+            game_state.makeMove(move)
+            score = -self.negamax(self.generateMoves(), depth - 1, ply + 1)
+            game_state.undoMove()
+            if best_score is None or score > best_score:
+                best_score = score
+                best_move = move
+                self.updatePV(ply, move)
+                if ply == 0:
+                    self.root_best_move = move
+        if best_move is None:
+            return self.terminalScore(ply)
+        if tt is not None:
+            tt.store(game_state.zobrist, depth, scoreToTable(best_score, ply), TT_EXACT, best_move.moveID)
+        return best_score
+
+    def principalVariationSearch(self, valid_moves, depth, alpha, beta, ply):
+        """
+        Negamax với cắt tỉa alpha-beta theo kiểu PVS: nước đầu tiên (thường là tốt nhất nhờ bảng chuyển vị
+        và sắp xếp nước đi) được tìm với cửa sổ đầy đủ, các nước sau chỉ được thử với cửa sổ rỗng để chứng minh
+        chúng không tốt hơn; nước nào vượt alpha mới được tìm lại với cửa sổ đầy đủ.
+
+        Tham số:
+        - valid_moves: Danh sách nước đi hợp lệ (bỏ qua khi sinh nước đi theo giai đoạn)
+        - depth: Độ sâu còn lại
+        - alpha, beta: Cửa sổ tìm kiếm theo góc nhìn bên đang đi
+        - ply: Số nước tính từ gốc
+        """
+        game_state = self.game_state
+        self.nodes += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        self.pv_table[ply] = []
+
+        if depth == 0:
+            if self.staged:
+                # nút con không gọi getValidMoves nên phải tự xác định chiếu hết / hết nước
+                setEndFlags(game_state, next(self.timedMoves(game_state.getStagedMoves()), None) is not None)
+            if game_state.checkmate or game_state.stalemate:
+                return self.endScore(ply)
+            return self.quiescence(alpha, beta, ply)
+        self.checkDeadline()
+
+        # tra bảng chuyển vị: cắt ngay nếu điểm đã lưu đủ sâu, nếu không thì dùng nước tốt nhất để sắp xếp
+        tt = self.tt
+        hash_move_id = 0
+        if tt is not None:
+            entry = tt.probe(game_state.zobrist)
+            if entry is not None:
+                tt_depth, tt_score, tt_bound, hash_move_id = entry
+                if ply > 0 and tt_depth >= depth:
+                    tt_eval = scoreFromTable(tt_score, ply)
+                    if tt_bound == TT_EXACT:
+                        return tt_eval
+                    if tt_bound == TT_LOWER:
+                        alpha = max(alpha, tt_eval)
+                    else:
+                        beta = min(beta, tt_eval)
+                    if alpha >= beta:
+                        return tt_eval
+        alpha_start = alpha
+
+        if self.staged:
+            history = self.history[0 if game_state.white_to_move else 1]
+            ordered_moves = self.timedMoves(game_state.getStagedMoves(
+                hash_move_id, self.killer_moves.get(ply, ()) + (self.countermove(),),
+                lambda move: history[butterflyIndex(move)]))
+            next_moves = None
+        else:
+            ordered_moves = self.orderMoves(valid_moves, hash_move_id, ply)
+
+        best_score = None
+        best_move = None
+        move_count = 0
+        for move in ordered_moves:
+            move_count += 1
             game_state.makeMove(move)
-            next_moves = game_state.getValidMoves()
-            eval = findMoveMiniMaxAlphaBeta(game_state, next_moves, depth - 1, False, alpha, beta)
+            if not self.staged:
+                next_moves = self.generateMoves()
+            if best_score is None:
+                score = -self.principalVariationSearch(next_moves, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self.principalVariationSearch(next_moves, depth - 1, -alpha - NULL_WINDOW, -alpha, ply + 1)
+                if alpha < score < beta:
+                    self.researches += 1
+                    score = -self.principalVariationSearch(next_moves, depth - 1, -beta, -alpha, ply + 1)
             game_state.undoMove()
-            if eval > max_eval:
-                max_eval = eval
-                if depth == DEPTH:
-                    next_move = move
-            alpha = max(alpha, eval)
-            if beta <= alpha:
+            if best_score is None or score > best_score:
+                best_score = score
+                best_move = move
+                self.updatePV(ply, move)
+                if ply == 0:
+                    self.root_best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.cutoffs += 1
+                if move_count == 1:
+                    self.first_move_cutoffs += 1
+                if not move.is_capture and not move.is_pawn_promotion:
+                    self.updateQuietHistory(move, depth, ply)
                 break
-        return max_eval
-    else:
-        min_eval = CHECKMATE
-        for move in valid_moves:
+
+        if best_move is None:
+            return self.terminalScore(ply)
+        if tt is not None:
+            if best_score <= alpha_start:
+                bound = TT_UPPER
+            elif best_score >= beta:
+                bound = TT_LOWER
+            else:
+                bound = TT_EXACT
+            # khi không nước nào vượt alpha thì không có nước tốt nhất đáng tin, giữ nước đã lưu trước đó
+            tt.store(game_state.zobrist, depth, scoreToTable(best_score, ply), bound,
+                     best_move.moveID if bound != TT_UPPER else 0)
+        return best_score
+
+    def quiescence(self, alpha, beta, ply, quiescence_ply=0):
+        """
+        Tìm kiếm tĩnh ở nút lá: chỉ xét nước ăn quân và phong cấp để không đánh giá
+        thế cờ giữa chừng một chuỗi đổi quân.
+        - đứng yên (stand pat): bên đi có thể không ăn gì, nên điểm tĩnh là cận dưới và có thể cắt tỉa ngay
+        - cắt tỉa delta: bỏ nước ăn quân mà giá trị quân bị ăn cộng DELTA_MARGIN vẫn không vượt được alpha
+        - thoát chiếu (QUIESCENCE_CHECK_EVASIONS): khi bị chiếu thì không được đứng yên, xét mọi nước hợp lệ
+
+        Tham số:
+        - alpha, beta: Cửa sổ tìm kiếm theo góc nhìn bên đang đi
+        - ply: Số nước tính từ gốc
+        - quiescence_ply: Số nước đã đi trong tìm kiếm tĩnh
+        """
+        game_state = self.game_state
+        self.quiescence_nodes += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if quiescence_ply >= QUIESCENCE_MAX_PLY:
+            return self.evaluate()
+        self.checkDeadline()
+        in_check = QUIESCENCE_CHECK_EVASIONS and game_state.inCheck()
+        if in_check:
+            moves = self.generateMoves()
+            if not moves:
+                return self.endScore(ply)  # getValidMoves đã đặt cờ chiếu hết
+            stand_pat = None
+            best_score = ply - CHECKMATE
+        else:
+            stand_pat = self.evaluate()
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best_score = stand_pat
+            moves = self.generateMoves(tactical=True)
+
+        for move in moves:
+            if stand_pat is not None and not move.is_pawn_promotion \
+                    and stand_pat + piece_score[move.piece_captured[1]] + DELTA_MARGIN <= alpha:
+                continue
             game_state.makeMove(move)
-            next_moves = game_state.getValidMoves()
-            eval = findMoveMiniMaxAlphaBeta(game_state, next_moves, depth - 1, True, alpha, beta)
+            score = -self.quiescence(-beta, -alpha, ply + 1, quiescence_ply + 1)
             game_state.undoMove()
-            if eval < min_eval:
-                min_eval = eval
-                if depth == DEPTH:
-                    next_move = move
-            beta = min(beta, eval)
-            if beta <= alpha:
+            if score > best_score:
+                best_score = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
                 break
-        return min_eval
+        return best_score
+
+    def orderMoves(self, valid_moves, hash_move_id, ply):
+        """Sắp xếp nước đi của nút ở ply bằng nước trong bảng chuyển vị, nước sát thủ, nước đáp trả và bảng lịch sử"""
+        return orderMoves(self.game_state, valid_moves, hash_move_id,
+                          self.killer_moves.get(ply, ()), self.countermove(),
+                          self.history[0 if self.game_state.white_to_move else 1], self.config, self.rng)
+
+    def countermove(self):
+        """Nước đáp trả đã từng gây cắt tỉa beta sau nước đi cuối cùng của đối phương (None nếu chưa có)"""
+        move_log = self.game_state.move_log
+        return self.countermoves[butterflyIndex(move_log[-1])] if move_log else None
+
+    def updateQuietHistory(self, move, depth, ply):
+        """
+        Ghi nhận nước yên lặng gây cắt tỉa beta: nước sát thủ của ply (giữ 2 nước gần nhất),
+        nước đáp trả cho nước trước của đối phương và điểm lịch sử (tăng theo depth^2)
+        """
+        killers = self.killer_moves.get(ply, ())
+        if not killers or killers[0] != move:
+            self.killer_moves[ply] = (move,) + killers[:1]
+        move_log = self.game_state.move_log
+        if move_log:
+            self.countermoves[butterflyIndex(move_log[-1])] = move
+        history = self.history[0 if self.game_state.white_to_move else 1]
+        index = butterflyIndex(move)
+        history[index] += depth * depth
+        if history[index] > HISTORY_MAX:
+            # giảm một nửa toàn bảng để điểm lịch sử không lấn át nước sát thủ và các nước mới
+            for table in self.history:
+                table[:] = [value // 2 for value in table]
+
+
+def butterflyIndex(move):
+    """Chỉ số (ô đi * 64 + ô đến) của nước đi trong bảng lịch sử và bảng nước đáp trả"""
+    return (move.start_row * 8 + move.start_col) * 64 + move.end_row * 8 + move.end_col
 
 
-def scoreBoard(game_state):
+def setEndFlags(game_state, has_move):
+    """Đặt cờ checkmate/stalemate cho thế cờ khi nước đi được sinh theo giai đoạn"""
+    in_check = not has_move and game_state.inCheck()
+    game_state.checkmate = in_check
+    game_state.stalemate = not has_move and not in_check
+
+
+def scoreBoard(game_state, ply=0):
     """
     Score the board. A positive score is good for white, a negative score is good for black.
+    Lớp bọc mỏng quanh evaluateBoard (điểm tĩnh mà tìm kiếm dùng qua Search.evaluate): thêm điểm chiếu hết / hòa pat,
+    chiếu hết sau ply nước tính từ gốc có điểm CHECKMATE - ply như trong tìm kiếm.
     """
     if game_state.checkmate:
-        if game_state.white_to_move:
-            return -CHECKMATE  # đen thắng
-        else:
-            return CHECKMATE  # trắng thắng
-    elif game_state.stalemate:
+        mate_score = CHECKMATE - ply
+        return -mate_score if game_state.white_to_move else mate_score  # bên đang đi bị chiếu hết
+    if game_state.stalemate:
         return STALEMATE
-    
-    # Tính điểm thông thường
-    score = 0
-    for row in range(len(game_state.board)):
-        for col in range(len(game_state.board[row])):
-            piece = game_state.board[row][col]
-            if piece != "--":
-                piece_position_score = 0
-                if piece[1] != "K":
-                    piece_position_score = piece_position_scores[piece][row][col]
-                if piece[0] == "w":
-                    score += piece_score[piece[1]] + piece_position_score
-                if piece[0] == "b":
-                    score -= piece_score[piece[1]] + piece_position_score
+    return evaluateBoard(game_state)
+
 
+def evaluateBoard(game_state):
+    """
+    Điểm vật chất và vị trí quân, không xét chiếu hết / hòa pat. Điểm dương có lợi cho trắng.
+    Điểm trung cuộc và tàn cuộc được trộn theo giai đoạn ván cờ; GameState cập nhật cả hai cùng giai đoạn
+    tăng dần trong makeMove/undoMove nên không phải duyệt 64 ô ở mỗi nút lá.
+    Điểm cấu trúc tốt lấy từ bảng băm cấu trúc tốt, chỉ phần tốt che vua được tính lại theo ô của vua.
+    """
+    if Evaluation.EVAL_DEBUG:
+        expected = (computeMaterialScore(game_state.board), computePhase(game_state.board),
+                    game_state.computePawnZobrist())
+        if (game_state.material_score, game_state.phase, game_state.pawn_zobrist) != expected:
+            raise AssertionError(f"Điểm tăng dần {(game_state.material_score, game_state.phase, game_state.pawn_zobrist)} "
+                                 f"khác điểm tính lại {expected}")
+    pawn_score, white_pawns, black_pawns = pawn_hash_table.probe(game_state)
+    pawn_score += pawnShieldScore(white_pawns, black_pawns,
+                                  game_state.white_king_location, game_state.black_king_location)
+    score = taperedScore(game_state.material_score + pawn_score, game_state.phase)
+    if game_state.phase <= MOP_UP_PHASE and abs(score) >= MOP_UP_MARGIN:
+        white_king, black_king = game_state.white_king_location, game_state.black_king_location
+        score += mopUpScore(white_king, black_king) if score > 0 else -mopUpScore(black_king, white_king)
     return score
 
 
@@ -267,34 +1279,37 @@ def findRandomMove(valid_moves):
 #     sorted_moves = [move for move, score in sorted(move_scores, key=lambda x: x[1], reverse=True)]
 #     return sorted_moves
 
-def orderMoves(game_state, moves):
+def orderMoves(game_state, moves, hash_move_id=0, killers=(), countermove=None, history=None, config=None, rng=None):
     """
     Sắp xếp và chọn lọc nước đi theo chiến lược:
-    1. Ưu tiên nước ăn quân (không quan tâm giá trị)
-    2. Phong cấp tốt
-    3. Nước chiếu
-    4. Các nước còn lại
+    1. Nước đi tốt nhất lưu trong bảng chuyển vị (hash_move_id)
+    2. Nước ăn quân và phong cấp theo MVV-LVA (quân bị ăn giá trị cao, quân ăn giá trị thấp trước)
+    3. Các nước sát thủ (killers) rồi nước đáp trả (countermove)
+    4. Các nước yên lặng còn lại theo điểm lịch sử (history, chỉ số butterflyIndex)
+    Điểm chỉ dựa vào thông tin có sẵn của nước đi, không cần đi thử nước.
 
-    Sau đó chọn 40% nước đi tốt nhất (khai thác) và 20% ngẫu nhiên trong phần còn lại (khám phá).
+    Mặc định trả về mọi nước đi đã sắp xếp. Nếu config ở chế độ chọn lọc thì chỉ giữ config.exploit_ratio
+    nước tốt nhất (khai thác) và config.explore_ratio chọn ngẫu nhiên bằng rng trong phần còn lại (khám phá).
     """
+    killer_ids = [killer.moveID for killer in killers if killer is not None]
+    countermove_id = countermove.moveID if countermove is not None else 0
     move_scores = []
 
     for move in moves:
-        move_score = 0
-
-        # Ưu tiên 1: Nước ăn quân (không quan tâm giá trị)
-        if move.is_capture:
-            move_score += 10  # điểm cao cho nước ăn
-
-        # Ưu tiên 2: Phong cấp tốt
-        if move.is_pawn_promotion:
-            move_score += 8
-
-        # Ưu tiên 3: Nước chiếu
-        game_state.makeMove(move)
-        if game_state.inCheck():
-            move_score += 5
-        game_state.undoMove()
+        if move.moveID == hash_move_id:
+            move_score = HASH_MOVE_ORDER
+        elif move.is_capture or move.is_pawn_promotion:
+            move_score = CAPTURE_ORDER
+            if move.is_capture:
+                move_score += 10 * piece_score[move.piece_captured[1]] - piece_score[move.piece_moved[1]]
+            if move.is_pawn_promotion:
+                move_score += 10 * piece_score["Q"]
+        elif move.moveID in killer_ids:
+            move_score = KILLER_ORDER - killer_ids.index(move.moveID)
+        elif move.moveID == countermove_id:
+            move_score = COUNTERMOVE_ORDER
+        else:
+            move_score = history[butterflyIndex(move)] if history is not None else 0
 
         move_scores.append((move, move_score))
 
@@ -302,14 +1317,19 @@ def orderMoves(game_state, moves):
     sorted_moves = sorted(move_scores, key=lambda x: x[1], reverse=True)
     sorted_moves_only = [move for move, _ in sorted_moves]
 
-    # Chọn 40% nước đi khai thác (tốt nhất)
-    num_exploit = max(1, int(0.4 * len(sorted_moves_only)))
+    if config is None or not config.selective:
+        return sorted_moves_only
+
+    # Chọn exploit_ratio nước đi khai thác (tốt nhất)
+    num_exploit = max(1, int(config.exploit_ratio * len(sorted_moves_only)))
     exploit_moves = sorted_moves_only[:num_exploit]
 
-    # Chọn 20% nước đi khám phá từ phần còn lại
+    # Chọn explore_ratio nước đi khám phá từ phần còn lại
     remaining_moves = sorted_moves_only[num_exploit:]
-    num_explore = max(1, int(0.2 * len(sorted_moves_only))) if remaining_moves else 0
-    explore_moves = random.sample(remaining_moves, min(num_explore, len(remaining_moves)))
+    num_explore = max(1, int(config.explore_ratio * len(sorted_moves_only))) if remaining_moves else 0
+    if rng is None:
+        rng = config.createRng()
+    explore_moves = rng.sample(remaining_moves, min(num_explore, len(remaining_moves)))
 
     # Kết hợp
     final_moves = exploit_moves + explore_moves
@@ -1,3 +1,103 @@
+import random
+
+from src.Evaluation import PIECE_SQUARE_SCORES, PIECE_PHASE, computeMaterialScore, computePhase
+
+# Các kiểu biểu diễn bàn cờ có thể chọn để so sánh hiệu suất
+ENGINE_LIST = "list"          # bàn cờ 8x8 dạng danh sách chuỗi (GameState)
+ENGINE_BITBOARD = "bitboard"  # 12 bitboard quân cờ (BitboardGameState)
+DEFAULT_ENGINE = ENGINE_BITBOARD
+
+# Thế cờ ban đầu theo ký hiệu FEN (Forsyth-Edwards Notation)
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+# Bảng khóa Zobrist 64 bit. Sinh theo seed cố định để mọi tiến trình (AI, phân tích hiệu suất) có cùng một bộ khóa
+_zobrist_random = random.Random(0x5EED2025)
+ZOBRIST_PIECES = {piece: [_zobrist_random.getrandbits(64) for _ in range(64)]
+                  for piece in ("wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK")}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+ZOBRIST_ENPASSANT = [_zobrist_random.getrandbits(64) for _ in range(8)]  # theo cột của ô bắt tốt qua đường
+_castling_keys = [_zobrist_random.getrandbits(64) for _ in range(4)]  # wks, wqs, bks, bqs
+ZOBRIST_CASTLING = [0] * 16  # theo mặt nạ quyền nhập thành, xem castleRightsMask
+for _mask in range(16):
+    for _bit in range(4):
+        if _mask & (1 << _bit):
+            ZOBRIST_CASTLING[_mask] ^= _castling_keys[_bit]
+
+
+def _buildStepAttacks(offsets):
+    """Mặt nạ các ô bị tấn công bởi quân đi một bước (mã, vua, tốt) đứng ở mỗi ô, bit thứ row * 8 + col"""
+    table = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            for d_row, d_col in offsets:
+                if 0 <= row + d_row <= 7 and 0 <= col + d_col <= 7:
+                    mask |= 1 << ((row + d_row) * 8 + col + d_col)
+            table.append(mask)
+    return table
+
+
+def _buildSliderRays(directions):
+    """Với mỗi ô: danh sách các tia, mỗi tia là dãy (row, col, bit) đi dần ra mép bàn cờ"""
+    table = []
+    for row in range(8):
+        for col in range(8):
+            rays = []
+            for d_row, d_col in directions:
+                ray = []
+                end_row, end_col = row + d_row, col + d_col
+                while 0 <= end_row <= 7 and 0 <= end_col <= 7:
+                    ray.append((end_row, end_col, 1 << (end_row * 8 + end_col)))
+                    end_row, end_col = end_row + d_row, end_col + d_col
+                if ray:
+                    rays.append(tuple(ray))
+            table.append(tuple(rays))
+    return table
+
+
+# Bảng tấn công tính sẵn dùng cho bản đồ ô bị tấn công (getAttackMap)
+KNIGHT_ATTACK_MASKS = _buildStepAttacks(((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2)))
+KING_ATTACK_MASKS = _buildStepAttacks(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+PAWN_ATTACK_MASKS = {"w": _buildStepAttacks(((-1, -1), (-1, 1))), "b": _buildStepAttacks(((1, -1), (1, 1)))}
+_rook_rays = _buildSliderRays(((-1, 0), (0, -1), (1, 0), (0, 1)))
+_bishop_rays = _buildSliderRays(((-1, -1), (-1, 1), (1, 1), (1, -1)))
+SLIDER_RAYS = {"R": _rook_rays, "B": _bishop_rays,
+               "Q": [rook + bishop for rook, bishop in zip(_rook_rays, _bishop_rays)]}
+
+
+# Thứ hạng quân dùng để sắp xếp nước ăn quân theo MVV-LVA (quân bị ăn giá trị cao nhất, quân ăn giá trị thấp nhất)
+PIECE_ORDER_RANKS = {"-": 0, "p": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+
+
+def mvvLvaScore(move):
+    """Điểm sắp xếp nước ăn quân / phong cấp: nạn nhân lớn trước, kẻ tấn công nhỏ trước"""
+    score = PIECE_ORDER_RANKS[move.piece_captured[1]] * 8 - PIECE_ORDER_RANKS[move.piece_moved[1]]
+    if move.is_pawn_promotion:
+        score += 40
+    return score
+
+
+def castleRightsMask(rights):
+    """Mã hóa quyền nhập thành thành số 4 bit (wks=1, wqs=2, bks=4, bqs=8)"""
+    return rights.wks | (rights.wqs << 1) | (rights.bks << 2) | (rights.bqs << 3)
+
+
+def createGameState(engine=DEFAULT_ENGINE, fen=None):
+    """
+    Tạo trạng thái ván cờ mới với kiểu biểu diễn bàn cờ được chọn
+    Nếu có fen thì dựng thế cờ theo chuỗi FEN thay vì thế cờ ban đầu
+    """
+    if engine == ENGINE_BITBOARD:
+        from src.BitboardEngine import BitboardGameState  # import muộn để tránh vòng lặp import
+        game_state = BitboardGameState()
+    else:
+        game_state = GameState()
+    if fen is not None:
+        game_state.loadFen(fen)
+    return game_state
+
+
 class GameState:  # code trang thai tro choi 
     def __init__ (self):
         self.board = [
@@ -31,9 +131,37 @@ class GameState:  # code trang thai tro choi
         self.threefold_repetition = False
         self.fifty_move_rule = False
         self.insufficient_material = False
+        # Khóa Zobrist của vị trí hiện tại, được cập nhật tăng dần trong makeMove/undoMove
+        self.zobrist = self.computeZobrist()
+        self.zobrist_log = [self.zobrist]
+        # Khóa Zobrist chỉ gồm các con tốt, dùng cho bảng băm cấu trúc tốt (src/PawnHashTable.py)
+        self.pawn_zobrist = self.computePawnZobrist()
+        self.pawn_zobrist_log = [self.pawn_zobrist]
+        # Điểm gói trung cuộc / tàn cuộc của vật chất + vị trí (dương có lợi cho trắng) và giai đoạn ván cờ,
+        # cũng được cập nhật tăng dần trong makeMove/undoMove (xem src/Evaluation.py)
+        self.material_score = computeMaterialScore(self.board)
+        self.material_score_log = [self.material_score]
+        self.phase = computePhase(self.board)
+        self.phase_log = [self.phase]
+        self.attack_maps = {}  # màu -> (khóa Zobrist, mặt nạ ô bị tấn công), xem getAttackMap
     
     def makeMove(self, move, piecePromotion = "Q"):
         #thuc hien nuoc di duoc chon va cap nhat lai trang thai tro choi 
+        zobrist = self.zobrist ^ ZOBRIST_BLACK_TO_MOVE ^ ZOBRIST_PIECES[move.piece_moved][move.start_row * 8 + move.start_col]
+        material_score = self.material_score - PIECE_SQUARE_SCORES[move.piece_moved][move.start_row * 8 + move.start_col]
+        phase = self.phase
+        pawn_zobrist = self.pawn_zobrist
+        if move.piece_moved[1] == "p":
+            pawn_zobrist ^= ZOBRIST_PIECES[move.piece_moved][move.start_row * 8 + move.start_col]
+        if self.enpassant_possible:
+            zobrist ^= ZOBRIST_ENPASSANT[self.enpassant_possible[1]]
+        if move.piece_captured != "--" and not move.is_enpassant_move:
+            zobrist ^= ZOBRIST_PIECES[move.piece_captured][move.end_row * 8 + move.end_col]
+            material_score -= PIECE_SQUARE_SCORES[move.piece_captured][move.end_row * 8 + move.end_col]
+            phase -= PIECE_PHASE[move.piece_captured[1]]
+            if move.piece_captured[1] == "p":
+                pawn_zobrist ^= ZOBRIST_PIECES[move.piece_captured][move.end_row * 8 + move.end_col]
+        old_castle_mask = castleRightsMask(self.current_castling_rights)
         self.board[move.start_row][move.start_col] = "--"
         self.board[move.end_row][move.end_col] = move.piece_moved  #cap nhat lai o di chuyen
         self.move_log.append(move)  #them move vao nhat ky 
@@ -48,6 +176,7 @@ class GameState:  # code trang thai tro choi
         #pawn promotion / tot thang cap 
         if move.is_pawn_promotion: 
             self.board[move.end_row][move.end_col] = move.piece_moved[0] + piecePromotion  # mac dinh thang cap len hau 
+            phase += PIECE_PHASE[piecePromotion]
         
         # Xử lý bắt tốt qua đường (en passant)
         if move.is_enpassant_move:
@@ -59,21 +188,35 @@ class GameState:  # code trang thai tro choi
             if captured_pawn[1] == 'p' and captured_pawn[0] != move.piece_moved[0]:
                 self.board[captured_pawn_row][move.end_col] = "--"
                 move.piece_captured = captured_pawn  # Đảm bảo quân bị bắt được ghi nhận đúng
+                zobrist ^= ZOBRIST_PIECES[captured_pawn][captured_pawn_row * 8 + move.end_col]
+                material_score -= PIECE_SQUARE_SCORES[captured_pawn][captured_pawn_row * 8 + move.end_col]
+                pawn_zobrist ^= ZOBRIST_PIECES[captured_pawn][captured_pawn_row * 8 + move.end_col]
+        placed_piece = self.board[move.end_row][move.end_col]
+        zobrist ^= ZOBRIST_PIECES[placed_piece][move.end_row * 8 + move.end_col]
+        material_score += PIECE_SQUARE_SCORES[placed_piece][move.end_row * 8 + move.end_col]
+        if placed_piece[1] == "p":
+            pawn_zobrist ^= ZOBRIST_PIECES[placed_piece][move.end_row * 8 + move.end_col]
         
         # update enpassant_posible variable/ dieu kien de doi phuong bat tot qua duong tai vi tri da setup 
         if move.piece_moved[1] == "p" and abs(move.start_row - move.end_row) == 2:
             self.enpassant_possible = ((move.start_row + move.end_row) // 2, move.start_col)
+            zobrist ^= ZOBRIST_ENPASSANT[move.start_col]
         else:
             self.enpassant_possible = ()  # chi nhan trang thai qua duong dau tien neu tiep theo thi xoa khoi
         
         # castle move 
         if move.is_castle_move: 
             if move.end_col - move.start_col == 2:   # di chuyen nhap thanh king-side
-                self.board[move.end_row][move.end_col - 1] = self.board[move.end_row][move.end_col + 1]  #moves the rook to its new square
-                self.board[move.end_row][move.end_col + 1] = "--"
+                rook_from, rook_to = move.end_col + 1, move.end_col - 1
             else: #di chuyen nhap thanh queen-side
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 2]
-                self.board[move.end_row][move.end_col - 2] = "--" #erase old rook
+                rook_from, rook_to = move.end_col - 2, move.end_col + 1
+            rook = self.board[move.end_row][rook_from]
+            self.board[move.end_row][rook_to] = rook  #moves the rook to its new square
+            self.board[move.end_row][rook_from] = "--" #erase old rook
+            if rook != "--":
+                zobrist ^= ZOBRIST_PIECES[rook][move.end_row * 8 + rook_from] ^ ZOBRIST_PIECES[rook][move.end_row * 8 + rook_to]
+                rook_scores = PIECE_SQUARE_SCORES[rook]
+                material_score += rook_scores[move.end_row * 8 + rook_to] - rook_scores[move.end_row * 8 + rook_from]
         
         #luu nhung nuoc bat tot qua duong
         self.enpassant_possible_log.append(self.enpassant_possible)
@@ -82,6 +225,15 @@ class GameState:  # code trang thai tro choi
         self.updateCastleRights(move)
         self.castle_rights_log.append(CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
                                                    self.current_castling_rights.wqs, self.current_castling_rights.bqs))
+        zobrist ^= ZOBRIST_CASTLING[old_castle_mask ^ castleRightsMask(self.current_castling_rights)]
+        self.zobrist = zobrist
+        self.zobrist_log.append(zobrist)
+        self.material_score = material_score
+        self.material_score_log.append(material_score)
+        self.phase = phase
+        self.phase_log.append(phase)
+        self.pawn_zobrist = pawn_zobrist
+        self.pawn_zobrist_log.append(pawn_zobrist)
 
         # Cập nhật halfmove_clock cho luật 50 nước
         if move.piece_captured != "--" or move.piece_moved[1] == "p":
@@ -92,17 +244,113 @@ class GameState:  # code trang thai tro choi
         if self.halfmove_clock >= 100:
             self.fifty_move_rule = True
         
-        # Cập nhật position_counter cho threefold repetition
-        position_key = self.getBoardPositionKey()
-        self.position_counter[position_key] = self.position_counter.get(position_key, 0) + 1
-        if self.position_counter[position_key] >= 3:
+        # Cập nhật position_counter cho threefold repetition (đếm theo khóa Zobrist)
+        self.position_counter[zobrist] = self.position_counter.get(zobrist, 0) + 1
+        if self.position_counter[zobrist] >= 3:
             self.threefold_repetition = True
         
         # Kiểm tra insufficient material
         self.checkInsufficientMaterial()
     
+    def computeZobrist(self):
+        """Tính khóa Zobrist của vị trí hiện tại từ đầu (makeMove/undoMove chỉ cập nhật phần thay đổi)"""
+        zobrist = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != "--":
+                    zobrist ^= ZOBRIST_PIECES[piece][row * 8 + col]
+        if not self.white_to_move:
+            zobrist ^= ZOBRIST_BLACK_TO_MOVE
+        if self.enpassant_possible:
+            zobrist ^= ZOBRIST_ENPASSANT[self.enpassant_possible[1]]
+        return zobrist ^ ZOBRIST_CASTLING[castleRightsMask(self.current_castling_rights)]
+
+    def computePawnZobrist(self):
+        """Tính khóa Zobrist chỉ gồm các con tốt từ đầu (makeMove/undoMove chỉ cập nhật phần thay đổi)"""
+        zobrist = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece[1] == "p":
+                    zobrist ^= ZOBRIST_PIECES[piece][row * 8 + col]
+        return zobrist
+
+    def refreshZobrist(self):
+        """
+        Tính lại khóa Zobrist (cả khóa của các con tốt), điểm vật chất + vị trí và giai đoạn ván cờ
+        sau khi dựng thế cờ trực tiếp (gán board, white_to_move,...)
+        """
+        self.zobrist = self.computeZobrist()
+        self.zobrist_log[-1] = self.zobrist
+        self.pawn_zobrist = self.computePawnZobrist()
+        self.pawn_zobrist_log[-1] = self.pawn_zobrist
+        self.material_score = computeMaterialScore(self.board)
+        self.material_score_log[-1] = self.material_score
+        self.phase = computePhase(self.board)
+        self.phase_log[-1] = self.phase
+
+    def loadFen(self, fen):
+        """
+        Dựng thế cờ từ chuỗi FEN và xóa toàn bộ lịch sử nước đi.
+        Số nước đi đầy đủ (trường cuối) được bỏ qua vì GameState không lưu nó.
+        """
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"FEN không hợp lệ: {fen}")
+        board = []
+        for rank in fields[0].split("/"):
+            row = []
+            for char in rank:
+                if char.isdigit():
+                    row.extend(["--"] * int(char))
+                else:
+                    piece = char.upper() if char.lower() != "p" else "p"
+                    row.append(("w" if char.isupper() else "b") + piece)
+            if len(row) != 8:
+                raise ValueError(f"FEN không hợp lệ: {fen}")
+            board.append(row)
+        if len(board) != 8:
+            raise ValueError(f"FEN không hợp lệ: {fen}")
+        self.board = board
+        for row in range(8):
+            for col in range(8):
+                if board[row][col] == "wK":
+                    self.white_king_location = (row, col)
+                elif board[row][col] == "bK":
+                    self.black_king_location = (row, col)
+        self.white_to_move = fields[1] == "w"
+        castling = fields[2]
+        self.current_castling_rights = CastleRights("K" in castling, "k" in castling, "Q" in castling, "q" in castling)
+        self.castle_rights_log = [CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
+                                               self.current_castling_rights.wqs, self.current_castling_rights.bqs)]
+        if fields[3] == "-":
+            self.enpassant_possible = ()
+        else:
+            self.enpassant_possible = (Move.ranks_to_rows[fields[3][1]], Move.files_to_cols[fields[3][0]])
+        self.enpassant_possible_log = [self.enpassant_possible]
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.move_log = []
+        self.checkmate = self.stalemate = self.in_check = False
+        self.pins = []
+        self.checks = []
+        self.threefold_repetition = False
+        self.fifty_move_rule = self.halfmove_clock >= 100
+        self.insufficient_material = False
+        self.checkInsufficientMaterial()
+        self.zobrist = self.computeZobrist()
+        self.zobrist_log = [self.zobrist]
+        self.pawn_zobrist = self.computePawnZobrist()
+        self.pawn_zobrist_log = [self.pawn_zobrist]
+        self.material_score = computeMaterialScore(self.board)
+        self.material_score_log = [self.material_score]
+        self.phase = computePhase(self.board)
+        self.phase_log = [self.phase]
+        self.position_counter = {}
+        self.attack_maps = {}
+
     def getBoardPositionKey(self):
-        """Tạo khóa duy nhất cho vị trí hiện tại"""
+        """Tạo khóa dạng chuỗi dễ đọc cho vị trí hiện tại (chỉ dùng để gỡ lỗi, các phần khác dùng self.zobrist)"""
         position = []
         for row in self.board:
             position.append(''.join(row))
@@ -143,6 +391,21 @@ class GameState:  # code trang thai tro choi
     def undoMove(self):
         if len(self.move_log) != 0: # hoan tac lai di chuyen
             move = self.move_log.pop()
+            # bo vi tri dang hoan tac khoi bo dem lap lai roi khoi phuc khoa Zobrist truoc do
+            count = self.position_counter.get(self.zobrist, 0) - 1
+            if count > 0:
+                self.position_counter[self.zobrist] = count
+            else:
+                self.position_counter.pop(self.zobrist, None)
+            self.threefold_repetition = False
+            self.zobrist_log.pop()
+            self.zobrist = self.zobrist_log[-1]
+            self.material_score_log.pop()
+            self.material_score = self.material_score_log[-1]
+            self.phase_log.pop()
+            self.phase = self.phase_log[-1]
+            self.pawn_zobrist_log.pop()
+            self.pawn_zobrist = self.pawn_zobrist_log[-1]
             self.board[move.start_row][move.start_col] = move.piece_moved
             self.board[move.end_row][move.end_col] = move.piece_captured
             self.white_to_move = not self.white_to_move
@@ -167,7 +430,9 @@ class GameState:  # code trang thai tro choi
 
             # undo castle rights
             self.castle_rights_log.pop()  # get rid of the new castle rights from the move we are undoing
-            self.current_castling_rights = self.castle_rights_log[-1]  # set the current castle rights to the last one in the list
+            # set the current castle rights to a copy of the last one in the list (updateCastleRights mutates it in place)
+            last_rights = self.castle_rights_log[-1]
+            self.current_castling_rights = CastleRights(last_rights.wks, last_rights.bks, last_rights.wqs, last_rights.bqs)
             
             # undo the castle move
             if move.is_castle_move:
@@ -186,15 +451,17 @@ class GameState:  # code trang thai tro choi
         Update the castle rights given the move
         """
         if move.piece_captured == "wR":
-            if move.end_col == 0: 
-                self.current_castling_rights.wqs = False
-            elif move.end_col == 7:
-                self.current_castling_rights.wks = False
+            if move.end_row == 7:  # chi mat quyen khi xe bi an o o goc ban dau
+                if move.end_col == 0:
+                    self.current_castling_rights.wqs = False
+                elif move.end_col == 7:
+                    self.current_castling_rights.wks = False
         elif move.piece_captured == "bR":
-            if move.end_col == 0: 
-                self.current_castling_rights.bqs = False
-            elif move.end_col == 7:  
-                self.current_castling_rights.bks = False
+            if move.end_row == 0:
+                if move.end_col == 0:
+                    self.current_castling_rights.bqs = False
+                elif move.end_col == 7:
+                    self.current_castling_rights.bks = False
 
         if move.piece_moved == "wK":
             self.current_castling_rights.wqs = False
@@ -257,7 +524,9 @@ class GameState:  # code trang thai tro choi
                 for i in range(len(moves) - 1, -1, -1):  # iterate through the list backwards when removing elements
                     if moves[i].piece_moved[1] != "K":  # move doesn't move king so it must block or capture
                         if not (moves[i].end_row, moves[i].end_col) in valid_squares:  # move doesn't block or capture piece
-                            moves.remove(moves[i])
+                            # bat tot qua duong an quan tot dang chieu du o dich khong phai o cua quan chieu
+                            if not (moves[i].is_enpassant_move and (moves[i].start_row, moves[i].end_col) == (check_row, check_col)):
+                                moves.remove(moves[i])
             else:  # double check, king has to move
                 self.getKingMoves(king_row, king_col, moves)
         else:  # not in check - all moves are fine
@@ -267,6 +536,14 @@ class GameState:  # code trang thai tro choi
             else:
                 self.getCastleMoves(self.black_king_location[0], self.black_king_location[1], moves)
 
+        self.checkEndConditions(moves)
+        self.current_castling_rights = temp_castle_rights
+        return moves
+
+    def checkEndConditions(self, moves):
+        """
+        Cập nhật trạng thái chiếu hết / hết nước đi / các luật hòa sau khi đã sinh xong nước đi hợp lệ.
+        """
         if len(moves) == 0:
             if self.inCheck():
                 self.checkmate = True
@@ -279,13 +556,55 @@ class GameState:  # code trang thai tro choi
             # Check all possible draw conditions
             if self.halfmove_clock >= 100:
                 self.fifty_move_rule = True
-            if self.position_counter.get(self.getBoardPositionKey(), 0) >= 3:
+            if self.position_counter.get(self.zobrist, 0) >= 3:
                 self.threefold_repetition = True
             self.checkInsufficientMaterial()
-            
-        self.current_castling_rights = temp_castle_rights
+
+    def getTacticalMoves(self):
+        """Nước ăn quân và phong cấp hợp lệ, sắp theo MVV-LVA (dùng cho tìm kiếm tĩnh)"""
+        moves = [move for move in self.getValidMoves() if move.is_capture or move.is_pawn_promotion]
+        moves.sort(key=mvvLvaScore, reverse=True)
         return moves
 
+    def getStagedMoves(self, hash_move_id=0, killers=(), quiet_key=None):
+        """
+        Sinh nước đi hợp lệ theo từng giai đoạn để tìm kiếm có thể dừng sớm khi cắt tỉa:
+        1. nước đi lấy từ bảng chuyển vị (moveID hash_move_id) nếu hợp lệ
+        2. nước ăn quân và phong cấp, sắp theo MVV-LVA
+        3. các nước sát thủ (killers) nếu hợp lệ và không ăn quân
+        4. các nước đi yên lặng còn lại, sắp theo quiet_key giảm dần nếu có (ví dụ điểm lịch sử)
+        Không đặt cờ checkmate/stalemate; nếu không sinh được nước nào thì bên đi đã hết nước.
+        Bàn cờ phải được trả về đúng vị trí này (undoMove) trước khi lấy nước tiếp theo.
+        Với bàn cờ dạng danh sách, danh sách đầy đủ được sinh một lần rồi chia giai đoạn.
+        """
+        moves = self.getValidMoves()
+        yielded = set()
+        if hash_move_id:
+            for move in moves:
+                if move.moveID == hash_move_id:
+                    yielded.add(move.moveID)
+                    yield move
+                    break
+        tactical = [move for move in moves if move.is_capture or move.is_pawn_promotion]
+        tactical.sort(key=mvvLvaScore, reverse=True)
+        for move in tactical:
+            if move.moveID not in yielded:
+                yielded.add(move.moveID)
+                yield move
+        for killer in killers:
+            if killer is None or killer.moveID in yielded:
+                continue
+            for move in moves:
+                if move.moveID == killer.moveID:
+                    yielded.add(move.moveID)
+                    yield move
+                    break
+        quiet = [move for move in moves if move.moveID not in yielded]
+        if quiet_key is not None:
+            quiet.sort(key=quiet_key, reverse=True)
+        for move in quiet:
+            yield move
+
     def inCheck(self):
         if self.white_to_move:
             return self.squareUnderAttack(self.white_king_location[0], self.white_king_location[1])
@@ -293,13 +612,44 @@ class GameState:  # code trang thai tro choi
             return self.squareUnderAttack(self.black_king_location[0], self.black_king_location[1])
  
     def squareUnderAttack(self, row, col): # lay vi tri vua de tim o bi tan cong 
-        self.white_to_move = not self.white_to_move
-        opponents_moves = self.getAllPossibleMoves()  # lay tat ca nuoc di cua doi thu
-        self.white_to_move = not self.white_to_move # doi nguoc lai cua minh 
-        for move in opponents_moves:
-            if move.end_row == row and move.end_col == col:  # vua bi tan cong
-                return True
-        return False 
+        enemy_color = "b" if self.white_to_move else "w"
+        return (self.getAttackMap(enemy_color) >> (row * 8 + col)) & 1 == 1
+
+    def getAttackMap(self, color):
+        """
+        Mặt nạ các ô bị quân màu color tấn công ở vị trí hiện tại.
+        Chỉ tính lại khi khóa Zobrist thay đổi, nên các lần kiểm tra ô bị tấn công trong cùng một vị trí là O(1).
+        """
+        cached = self.attack_maps.get(color)
+        if cached is not None and cached[0] == self.zobrist:
+            return cached[1]
+        attacks = self.computeAttackMap(color)
+        self.attack_maps[color] = (self.zobrist, attacks)
+        return attacks
+
+    def computeAttackMap(self, color):
+        """Tính mặt nạ ô bị tấn công từ bàn cờ bằng các bảng tấn công và tia tính sẵn"""
+        board = self.board
+        attacks = 0
+        square = 0
+        for row in range(8):
+            for piece in board[row]:
+                if piece[0] == color:
+                    kind = piece[1]
+                    if kind == "p":
+                        attacks |= PAWN_ATTACK_MASKS[color][square]
+                    elif kind == "N":
+                        attacks |= KNIGHT_ATTACK_MASKS[square]
+                    elif kind == "K":
+                        attacks |= KING_ATTACK_MASKS[square]
+                    else:
+                        for ray in SLIDER_RAYS[kind][square]:
+                            for end_row, end_col, bit in ray:
+                                attacks |= bit
+                                if board[end_row][end_col] != "--":
+                                    break
+                square += 1
+        return attacks
 
     def getAllPossibleMoves(self):
         moves = []
@@ -399,12 +749,12 @@ class GameState:  # code trang thai tro choi
             king_row, king_col = self.black_king_location
 
         if self.board[row + move_amount][col] == "--":  # 1 square pawn advance
-            if not piece_pinned or pin_direction == (move_amount, 0):
+            if not piece_pinned or pin_direction in ((move_amount, 0), (-move_amount, 0)):
                 moves.append(Move((row, col), (row + move_amount, col), self.board))
                 if row == start_row and self.board[row + 2 * move_amount][col] == "--":  # 2 square pawn advance
                     moves.append(Move((row, col), (row + 2 * move_amount, col), self.board))
         if col - 1 >= 0:  # capture to the left
-            if not piece_pinned or pin_direction == (move_amount, -1):
+            if not piece_pinned or pin_direction in ((move_amount, -1), (-move_amount, 1)):
                 if self.board[row + move_amount][col - 1][0] == enemy_color:
                     moves.append(Move((row, col), (row + move_amount, col - 1), self.board))
                 if (row + move_amount, col - 1) == self.enpassant_possible:
@@ -414,7 +764,7 @@ class GameState:  # code trang thai tro choi
                             # inside: between king and the pawn;
                             # outside: between pawn and border;
                             inside_range = range(king_col + 1, col - 1)
-                            outside_range = range(col + 1, 7)
+                            outside_range = range(col + 1, 8)
                         else:  # king right of the pawn
                             inside_range = range(king_col - 1, col, -1)
                             outside_range = range(col - 2, -1, -1)
@@ -425,12 +775,14 @@ class GameState:  # code trang thai tro choi
                             square = self.board[row][i]
                             if square[0] == enemy_color and (square[1] == "R" or square[1] == "Q"):
                                 attacking_piece = True
+                                break
                             elif square != "--":
                                 blocking_piece = True
+                                break
                     if not attacking_piece or blocking_piece:
                         moves.append(Move((row, col), (row + move_amount, col - 1), self.board, is_enpassant_move=True))
         if col + 1 <= 7:  # capture to the right
-            if not piece_pinned or pin_direction == (move_amount, +1):
+            if not piece_pinned or pin_direction in ((move_amount, 1), (-move_amount, -1)):
                 if self.board[row + move_amount][col + 1][0] == enemy_color:
                     moves.append(Move((row, col), (row + move_amount, col + 1), self.board))
                 if (row + move_amount, col + 1) == self.enpassant_possible:
@@ -451,11 +803,13 @@ class GameState:  # code trang thai tro choi
                             square = self.board[row][i]
                             if square[0] == enemy_color and (square[1] == "R" or square[1] == "Q"):
                                 attacking_piece = True
+                                break
                             elif square != "--":
                                 blocking_piece = True
+                                break
                     if not attacking_piece or blocking_piece:
-                        moves.append(Move((row, col), (row + move_amount, col + 1), self.board, 
-                                          ))
+                        moves.append(Move((row, col), (row + move_amount, col + 1), self.board,
+                                          is_enpassant_move=True))
 
     def getRookMoves(self, row, col, moves):
         """
@@ -525,7 +879,8 @@ class GameState:  # code trang thai tro choi
             if self.pins[i][0] == row and self.pins[i][1] == col:
                 piece_pinned = True
                 pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
+                if self.board[row][col][1] != "Q":  # queen pins are removed later in getRookMoves
+                    self.pins.remove(self.pins[i])
                 break
 
         directions = ((-1, -1), (-1, 1), (1, 1), (1, -1))  # diagonals: up/left up/right down/right down/left
@@ -561,27 +916,22 @@ class GameState:  # code trang thai tro choi
         """
         row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
         col_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
-        ally_color = "w" if self.white_to_move else "b"
+        king = self.board[row][col]
+        ally_color = king[0]
+        enemy_color = "b" if ally_color == "w" else "w"
+        # lift the king off the board once so sliding attacks x-ray through its square,
+        # then every destination is a single lookup in the enemy attack map
+        self.board[row][col] = "--"
+        danger = self.computeAttackMap(enemy_color)
+        self.board[row][col] = king
         for i in range(8):
             end_row = row + row_moves[i]
             end_col = col + col_moves[i]
             if 0 <= end_row <= 7 and 0 <= end_col <= 7:
                 # King can never be pinned, so we just check if the destination is valid
                 end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color:  # not an ally piece - empty or enemy
-                    # place king on end square and check for checks
-                    if ally_color == "w":
-                        self.white_king_location = (end_row, end_col)
-                    else:
-                        self.black_king_location = (end_row, end_col)
-                    in_check, pins, checks = self.checkForPinsAndChecks()
-                    if not in_check:
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
-                    # place king back on original location
-                    if ally_color == "w":
-                        self.white_king_location = (row, col)
-                    else:
-                        self.black_king_location = (row, col)
+                if end_piece[0] != ally_color and not (danger >> (end_row * 8 + end_col)) & 1:
+                    moves.append(Move((row, col), (end_row, end_col), self.board))
 
     def getCastleMoves(self, row, col, moves):
         """
@@ -626,25 +976,34 @@ class Move:
                      "e": 4, "f": 5, "g": 6, "h": 7}
     cols_to_files = {v: k for k, v in files_to_cols.items()}
 
+    # the search creates and discards huge numbers of moves, so store fields in slots instead of a per-object __dict__
+    __slots__ = ("start_row", "start_col", "end_row", "end_col", "piece_moved", "piece_captured",
+                 "is_pawn_promotion", "promotion_choice", "is_enpassant_move", "is_castle_move",
+                 "is_check", "is_checkmate", "is_capture", "moveID")
+
     def __init__(self, start_square, end_square, board, is_enpassant_move=False, is_castle_move=False):
-        self.start_row = start_square[0]
-        self.start_col = start_square[1]
-        self.end_row = end_square[0]
-        self.end_col = end_square[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
+        # read everything into locals first, then store each slot exactly once
+        start_row, start_col = start_square
+        end_row, end_col = end_square
+        piece_moved = board[start_row][start_col]
+        if is_enpassant_move:
+            # Ensure that the captured piece is properly set for en passant
+            # For white pawn moving diagonally up, captured piece is a black pawn
+            # For black pawn moving diagonally down, captured piece is a white pawn
+            piece_captured = "bp" if piece_moved == "wp" else "wp"
+        else:
+            piece_captured = board[end_row][end_col]
+        self.start_row = start_row
+        self.start_col = start_col
+        self.end_row = end_row
+        self.end_col = end_col
+        self.piece_moved = piece_moved
+        self.piece_captured = piece_captured
         # pawn promotion
-        self.is_pawn_promotion = (self.piece_moved == "wp" and self.end_row == 0) or (
-                self.piece_moved == "bp" and self.end_row == 7)
+        self.is_pawn_promotion = (piece_moved == "wp" and end_row == 0) or (piece_moved == "bp" and end_row == 7)
         self.promotion_choice = 'Q'
-        
         # en passant
         self.is_enpassant_move = is_enpassant_move
-        if self.is_enpassant_move:
-            # Ensure that the captured piece is properly set for en passant
-            # For white pawn moving diagonally up, captured piece is a black pawn
-            # For black pawn moving diagonally down, captured piece is a white pawn
-            self.piece_captured = "bp" if self.piece_moved == "wp" else "wp"
         # castle move
         self.is_castle_move = is_castle_move
 
@@ -652,8 +1011,8 @@ class Move:
         self.is_check = False
         self.is_checkmate = False
 
-        self.is_capture = self.piece_captured != "--"
-        self.moveID = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+        self.is_capture = piece_captured != "--"
+        self.moveID = start_row * 1000 + start_col * 100 + end_row * 10 + end_col
 
     def __eq__(self, other):
         """
@@ -663,6 +1022,9 @@ class Move:
             return self.moveID == other.moveID
         return False
 
+    def __hash__(self):
+        return self.moveID
+
     def getChessNotation(self):
         if self.is_pawn_promotion:
             return self.getRankFile(self.end_row, self.end_col) + "Q"
@@ -691,6 +1053,13 @@ class Move:
     def getRankFile(self, row, col):
         return self.cols_to_files[col] + self.rows_to_ranks[row]
 
+    def getUciNotation(self, promotion="Q"):
+        """Ký hiệu dạng ô đi + ô đến (e2e4, e7e8q) dùng cho perft divide và giao tiếp với công cụ khác"""
+        notation = self.getRankFile(self.start_row, self.start_col) + self.getRankFile(self.end_row, self.end_col)
+        if self.is_pawn_promotion:
+            notation += promotion.lower()
+        return notation
+
     def __str__(self):
         if self.is_castle_move:
             return "0-0" if self.end_col == 6 else "0-0-0"
@@ -2,20 +2,24 @@ import os
 import pygame
 from src.ChessEngine import *
 from src.ChessAI import *
-from multiprocessing import Process, Queue
 import ctypes
 from src.Const import *
 from src.Config import *
 from src.GameComponents import *
 from src.PGNExporter import PGNExporter
+from src.EngineWorker import EngineWorker
+from src.OpeningBook import findBookMove
 
 class Game:
-    def __init__(self, game_mode='pvp', difficulty=1, algorithm=ALGORITHM_WITH_PRUNING):
+    def __init__(self, game_mode='pvp', difficulty=1, algorithm=ALGORITHM_WITH_PRUNING, engine=DEFAULT_ENGINE,
+                 threads=DEFAULT_THREADS):
         """
         Khởi tạo trò chơi cờ vua với chế độ cụ thể
         game_mode: 'pvp' cho chế độ Người đấu Người, 'ai' cho chế độ Người đấu Máy
-        difficulty: Độ khó của AI (1-5)
+        difficulty: Độ khó của AI (khóa của DIFFICULTY_LEVELS: 1 dễ, 2 trung bình, 3 khó)
         algorithm: Thuật toán AI sử dụng (negamax hoặc minimax)
+        engine: Kiểu biểu diễn bàn cờ (ENGINE_LIST hoặc ENGINE_BITBOARD)
+        threads: Số tiến trình tìm kiếm của AI (1 = chỉ tiến trình AI, lớn hơn 1 thì dùng Lazy SMP)
         """
         # Khởi tạo pygame
         pygame.init()
@@ -30,7 +34,8 @@ class Game:
             ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
         # Khởi tạo trạng thái trò chơi
-        self.gameState = GameState()
+        self.engine = engine
+        self.gameState = createGameState(engine)
         self.validMoves = self.gameState.getValidMoves()
         
         # Tải hình ảnh quân cờ
@@ -51,11 +56,13 @@ class Game:
         if game_mode == 'ai':
             self.player_two = False  # Bên đen là AI trong chế độ đấu với máy
             self.ai_thinking = False
-            self.move_finder_process = None
+            # tiến trình AI sống suốt ván cờ, giữ bàn cờ và bảng chuyển vị giữa các nước
+            self.engine_worker = EngineWorker(engine)
+            self.engine_worker.setOption("threads", threads)
         else:
             self.player_two = True  # Bên đen là người trong chế độ đấu người-người
             self.ai_thinking = False
-            self.move_finder_process = None
+            self.engine_worker = None
             
         self.move_undone = False
         self.game_over = False
@@ -178,18 +185,20 @@ class Game:
                         self.validMoves = self.gameState.getValidMoves()
                         self.move_undone = True
                         self.game_over = False
-                        if self.ai_thinking:
-                            self.move_finder_process.terminate()
+                        if self.engine_worker is not None:
+                            self.engine_worker.stop()
                             self.ai_thinking = False
                     if event.key == pygame.K_r:  # Phím R để khởi động lại ván cờ
-                        self.gameState = GameState()
+                        self.gameState = createGameState(self.engine)
                         self.validMoves = self.gameState.getValidMoves()
                         self.dragger.undragPiece()
                         self.game_over = False
-                        if self.ai_thinking:
-                            self.move_finder_process.terminate()
+                        if self.engine_worker is not None:
+                            self.engine_worker.newGame()
                             self.ai_thinking = False
                         self.move_undone = True
+                    if event.key == pygame.K_SPACE and self.ai_thinking:  # Phím Space để buộc AI đi ngay
+                        self.engine_worker.moveNow()
                     if event.key == pygame.K_n:  # Phím N để thay đổi giao diện
                         self.changeTheme()
                     if event.key == pygame.K_e:  # Phím E để xuất ván cờ ra file PGN
@@ -199,18 +208,28 @@ class Game:
 
             # Xử lý nước đi của AI (chỉ trong chế độ đấu với máy và khi đến lượt AI)
             if self.game_mode == 'ai' and not self.game_over and not human_turn and not self.move_undone:
+                ai_move = None
+                search_result = None
                 if not self.ai_thinking:
-                    self.ai_thinking = True
-                    return_queue = Queue()
-                    self.move_finder_process = Process(target=findBestMove,
-                                                       args=(self.gameState, self.validMoves, return_queue, self.difficulty, self.algorithm))
-                    self.move_finder_process.start()
-
-                if not self.move_finder_process.is_alive():
-                    ai_move = return_queue.get()
+                    # nước trong sách khai cuộc được đi ngay, không cần tìm kiếm hay gửi lệnh cho tiến trình AI
+                    if AI_OPENING_BOOK:
+                        ai_move = findBookMove(self.gameState, self.validMoves)
                     if ai_move is None:
-                        ai_move = findRandomMove(self.validMoves)
-                        
+                        self.ai_thinking = True
+                        # mỗi mức độ khó ứng với một thời gian suy nghĩ cố định, độ sâu chỉ là giới hạn trên
+                        movetime, max_depth = DIFFICULTY_LEVELS[self.difficulty]
+                        self.engine_worker.go(self.gameState, max_depth, self.algorithm, movetime=movetime)
+                else:
+                    search_result = self.engine_worker.pollResult()
+                    if search_result is not None:
+                        # dùng đối tượng Move của giao diện tương ứng với nước tiến trình AI chọn
+                        if search_result.best_move is not None:
+                            ai_move = next((move for move in self.validMoves
+                                            if move.moveID == search_result.best_move.moveID), None)
+                        if ai_move is None:
+                            ai_move = findRandomMove(self.validMoves)
+
+                if ai_move is not None:
                     is_castle = False
                     if ai_move.piece_moved[1] == 'K' and abs(ai_move.start_col - ai_move.end_col) == 2:
                         is_castle = True
@@ -218,6 +237,10 @@ class Game:
                         
                     promotion_piece = 'Q'
                     if ai_move.is_pawn_promotion:
+                        # quân phong cấp do sách khai cuộc hoặc bảng tàn cuộc chọn (tìm kiếm luôn phong hậu)
+                        chosen_move = ai_move if search_result is None else search_result.best_move
+                        if chosen_move is not None:
+                            promotion_piece = chosen_move.promotion_choice
                         ai_move.promotion_choice = promotion_piece
                         
                     self.gameState.makeMove(ai_move, promotion_piece)
@@ -234,6 +257,12 @@ class Game:
                     self.move_undone = False
                     self.playSound()
 
+                    # tìm trước trong lúc người chơi suy nghĩ, giả sử người chơi đi nước thứ hai của biến chính
+                    if AI_PONDER and search_result is not None and self.validMoves and len(search_result.pv) > 1 \
+                            and search_result.pv[0].moveID == ai_move.moveID:
+                        _, max_depth = DIFFICULTY_LEVELS[self.difficulty]
+                        self.engine_worker.ponder(self.gameState, search_result.pv[1], max_depth, self.algorithm)
+
 
             # Kiểm tra trạng thái kết thúc ván đấu
             if self.gameState.checkmate or self.gameState.stalemate or self.gameState.fifty_move_rule or self.gameState.threefold_repetition or self.gameState.insufficient_material:
@@ -267,6 +296,8 @@ class Game:
             pygame.display.update()
             
         # Quay về menu khi thoát vòng lặp game
+        if self.engine_worker is not None:
+            self.engine_worker.close()
         return
         
     def drawGameState(self):
@@ -346,15 +377,16 @@ def run_pvp_game():
     game = Game(game_mode='pvp')
     game.mainLoop()
 
-def run_ai_game(difficulty=1, algorithm=ALGORITHM_WITH_PRUNING):
+def run_ai_game(difficulty=1, algorithm=ALGORITHM_WITH_PRUNING, threads=DEFAULT_THREADS):
     """
     Chạy game ở chế độ người đấu máy
     
     Tham số:
-    - difficulty: Độ khó của AI (1-5)
+    - difficulty: Độ khó của AI (khóa của DIFFICULTY_LEVELS)
     - algorithm: Thuật toán AI (with_pruning hoặc without_pruning)
+    - threads: Số tiến trình tìm kiếm của AI
     """
-    game = Game(game_mode='ai', difficulty=difficulty, algorithm=algorithm)
+    game = Game(game_mode='ai', difficulty=difficulty, algorithm=algorithm, threads=threads)
     game.mainLoop()
 
 
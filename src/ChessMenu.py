@@ -5,10 +5,15 @@ from src.Const import *
 from src.Config import *
 from src.WindowManager import WindowManager
 from src.ChessMain_Module import run_pvp_game, run_ai_game
-from src.ChessAI import ALGORITHM_WITH_PRUNING, ALGORITHM_WITHOUT_PRUNING
+from src.ChessAI import ALGORITHM_WITH_PRUNING, ALGORITHM_WITHOUT_PRUNING, DEFAULT_THREADS
 
 class Menu:
-    def __init__(self):
+    def __init__(self, threads=DEFAULT_THREADS):
+        """
+        Tham số:
+        - threads: Số tiến trình tìm kiếm của AI trong chế độ người đấu máy
+        """
+        self.threads = threads
         # Khởi tạo pygame
         pygame.init()
 
@@ -49,7 +54,7 @@ class Menu:
         # Khởi tạo biến trạng thái menu
         self.show_difficulty_menu = False
         self.show_algorithm_menu = False
-        self.selected_difficulty = 2  # Mặc định là dễ
+        self.selected_difficulty = 1  # Mặc định là dễ (xem DIFFICULTY_LEVELS trong ChessAI)
         self.selected_algorithm = ALGORITHM_WITH_PRUNING  # Mặc định là có cắt tỉa alpha-beta
         
         # Tạo các nút bấm cho menu chính
@@ -350,15 +355,15 @@ class Menu:
             # Xử lý các hành động từ menu độ khó
             elif self.show_difficulty_menu and not self.show_algorithm_menu:
                 if action == 'difficulty_easy':
-                    self.selected_difficulty = 2
+                    self.selected_difficulty = 1  # 0.5 giây mỗi nước
                     self.show_difficulty_menu = False
                     self.show_algorithm_menu = True
                 elif action == 'difficulty_medium':
-                    self.selected_difficulty = 3
+                    self.selected_difficulty = 2  # 1.5 giây mỗi nước
                     self.show_difficulty_menu = False
                     self.show_algorithm_menu = True
                 elif action == 'difficulty_hard':
-                    self.selected_difficulty = 5
+                    self.selected_difficulty = 3  # 4 giây mỗi nước
                     self.show_difficulty_menu = False
                     self.show_algorithm_menu = True
                 elif action == 'back':
@@ -370,13 +375,13 @@ class Menu:
                 if action == 'algorithm_with_pruning':
                     self.selected_algorithm = ALGORITHM_WITH_PRUNING
                     WindowManager.switch_to_game(self.screen)
-                    run_ai_game(self.selected_difficulty, self.selected_algorithm)
+                    run_ai_game(self.selected_difficulty, self.selected_algorithm, self.threads)
                     running = False
                     break
                 elif action == 'algorithm_without_pruning':
                     self.selected_algorithm = ALGORITHM_WITHOUT_PRUNING
                     WindowManager.switch_to_game(self.screen)
-                    run_ai_game(self.selected_difficulty, self.selected_algorithm)
+                    run_ai_game(self.selected_difficulty, self.selected_algorithm, self.threads)
                     running = False
                     break
                 elif action == 'back_to_difficulty':
@@ -0,0 +1,287 @@
+"""
+Tiến trình AI chạy lâu dài
+--------------------------
+Thay vì tạo một Process mới và gửi cả GameState (kèm toàn bộ nhật ký nước đi) cho mỗi nước của máy,
+giao diện giữ một tiến trình AI duy nhất suốt ván cờ và trao đổi qua hai hàng đợi yêu cầu/kết quả.
+Tiến trình AI giữ bàn cờ riêng và chỉ nhận phần thay đổi (số nước hoàn tác + các nước mới), nên bảng chuyển vị,
+bảng chuyển vị chia sẻ và tiến trình phụ của Lazy SMP,
+process pool của tìm kiếm chia gốc... vẫn còn nguyên giữa các nước đi.
+
+Các lệnh gửi qua hàng đợi yêu cầu:
+- (CMD_NEW_GAME, fen): ván mới từ thế cờ fen (None là thế cờ ban đầu), xóa bảng chuyển vị
+- (CMD_POSITION, số nước hoàn tác, [(moveID, quân phong cấp), ...]): cập nhật bàn cờ
+- (CMD_GO, mã lần tìm, độ sâu, thuật toán, giới hạn thời gian): tìm kiếm, trả (mã lần tìm, SearchResult)
+- (CMD_PONDER, mã lần tìm, độ sâu, thuật toán, (moveID, quân phong cấp)): trong lúc người chơi suy nghĩ, đi thử nước
+  người chơi nhiều khả năng đi nhất và tìm kiếm trước (không giới hạn thời gian) cho tới khi bị dừng.
+  Nếu người chơi đi đúng nước đó, lệnh go tiếp theo trả ngay kết quả đã tìm đủ sâu hoặc tìm tiếp
+  trên bảng chuyển vị đã được làm nóng; nếu đoán sai, kết quả bị bỏ.
+- (CMD_SET_OPTION, tên, giá trị): đổi một tùy chọn trong WORKER_OPTIONS
+- (CMD_QUIT,): kết thúc tiến trình
+Nếu một nước của CMD_POSITION không hợp lệ trên bàn cờ của tiến trình AI (bàn cờ bị lệch với giao diện),
+tiến trình AI trả (RESPONSE_RESYNC, None), bỏ qua mọi lệnh position/go/ponder cho tới lệnh CMD_NEW_GAME tiếp theo,
+và giao diện gửi lại toàn bộ ván cờ (xem EngineWorker.resync).
+Lệnh dừng không đi qua hàng đợi (tiến trình đang bận tìm kiếm) mà qua một bộ đếm chia sẻ (multiprocessing.Value)
+giữ mã lần tìm lớn nhất đã bị dừng: lần tìm có mã nhỏ hơn hoặc bằng giá trị đó bị dừng (xem SearchStop).
+Bộ đếm không bao giờ bị xóa nên lệnh dừng gửi trước khi tiến trình AI kịp lấy lệnh go/ponder ra khỏi hàng đợi
+vẫn có hiệu lực, còn lần tìm gửi sau lệnh dừng thì không bị ảnh hưởng. Tìm kiếm kiểm tra tín hiệu dừng sau mỗi
+ChessAI.STOP_CHECK_NODES nút; khi dừng, tìm kiếm vẫn trả về nước tốt nhất của lần lặp sâu nhất đã xong.
+"""
+import atexit
+import queue
+from multiprocessing import Process, Queue, Value
+
+from src.ChessEngine import createGameState, DEFAULT_ENGINE
+import src.ChessAI as ChessAI
+
+CMD_NEW_GAME = "newgame"
+CMD_POSITION = "position"
+CMD_GO = "go"
+CMD_PONDER = "ponder"
+CMD_SET_OPTION = "setoption"
+CMD_QUIT = "quit"
+RESPONSE_RESYNC = "resync"  # trả lời thay cho mã lần tìm khi tiến trình AI cần nhận lại toàn bộ ván cờ
+
+# Tùy chọn của tiến trình AI và giá trị mặc định (truyền thẳng vào ChessAI.searchPosition)
+WORKER_OPTIONS = {
+    "tt_size_mb": ChessAI.DEFAULT_TT_SIZE_MB,
+    "threads": ChessAI.DEFAULT_THREADS,
+    "parallel": ChessAI.PARALLEL_LAZY_SMP,
+    "config": None,
+}
+QUIT_TIMEOUT = 2.0  # giây chờ tiến trình AI thoát trước khi buộc kết thúc
+# Số tiến trình tối đa khi tìm trước: việc tìm trước chạy trong lúc người chơi suy nghĩ nên không chiếm mọi nhân
+# (với threads > 1 lần go dùng bảng chuyển vị chia sẻ của Lazy SMP nên chỉ kết quả tìm trước được dùng lại)
+PONDER_THREADS = 1
+
+
+class SearchStop:
+    """
+    Tín hiệu dừng của một lần tìm (cùng giao diện is_set() với multiprocessing.Event mà ChessAI dùng):
+    bật khi bộ đếm dừng chia sẻ đạt tới mã của lần tìm
+    """
+
+    def __init__(self, stop_id, search_id):
+        self.stop_id = stop_id
+        self.search_id = search_id
+
+    def is_set(self):
+        return self.stop_id.value >= self.search_id
+
+
+class EngineWorker:
+    """
+    Phía giao diện của tiến trình AI: gửi lệnh và nhận kết quả mà không chặn vòng lặp vẽ
+    """
+
+    def __init__(self, engine=DEFAULT_ENGINE):
+        """
+        Tham số:
+        - engine: Kiểu biểu diễn bàn cờ tiến trình AI dùng (ENGINE_LIST hoặc ENGINE_BITBOARD)
+        """
+        self.engine = engine
+        self.requests = Queue()
+        self.responses = Queue()
+        self.stop_id = Value("i", 0)  # mã lần tìm lớn nhất đã bị dừng
+        self.start_fen = None   # thế cờ ban đầu của ván hiện tại (None là thế cờ ban đầu chuẩn)
+        self.synced_moves = []  # (moveID, quân phong cấp) của các nước tiến trình AI đã biết
+        self.search_id = 0
+        self.pending_id = None
+        self.ponder_id = None
+        self.pending_command = None  # lệnh go đang chờ kết quả, gửi lại khi phải đồng bộ lại ván cờ
+        # không đặt daemon vì tiến trình AI có thể tự tạo tiến trình con (Lazy SMP, tìm kiếm chia gốc)
+        self.process = Process(target=engineWorkerMain,
+                               args=(self.requests, self.responses, self.stop_id, engine))
+        self.process.start()
+        atexit.register(self.close)
+
+    def newGame(self, fen=None):
+        """Bắt đầu ván mới (dừng lần tìm đang chạy nếu có)"""
+        self.stop()
+        self.start_fen = fen
+        self.synced_moves = []
+        self.requests.put((CMD_NEW_GAME, fen))
+
+    def resync(self):
+        """
+        Gửi lại toàn bộ ván cờ (thế cờ ban đầu và mọi nước đã đồng bộ) khi tiến trình AI báo bàn cờ bị lệch,
+        rồi gửi lại lệnh go đang chờ (tiến trình AI đã bỏ qua nó)
+        """
+        self.requests.put((CMD_NEW_GAME, self.start_fen))
+        if self.synced_moves:
+            self.requests.put((CMD_POSITION, 0, self.synced_moves))
+        if self.pending_command is not None:
+            self.requests.put(self.pending_command)
+
+    def setOption(self, name, value):
+        """Đổi tùy chọn tìm kiếm của tiến trình AI (tên thuộc WORKER_OPTIONS)"""
+        if name not in WORKER_OPTIONS:
+            raise ValueError(f"Tùy chọn không hợp lệ: {name}")
+        self.requests.put((CMD_SET_OPTION, name, value))
+
+    def syncPosition(self, game_state):
+        """
+        Gửi cho tiến trình AI phần khác nhau giữa nhật ký nước đi của game_state và bàn cờ nó đang giữ:
+        số nước cần hoàn tác rồi các nước mới
+        """
+        moves = [(move.moveID, move.promotion_choice) for move in game_state.move_log]
+        common = 0
+        limit = min(len(moves), len(self.synced_moves))
+        while common < limit and moves[common] == self.synced_moves[common]:
+            common += 1
+        undo_count = len(self.synced_moves) - common
+        if undo_count or common < len(moves):
+            self.requests.put((CMD_POSITION, undo_count, moves[common:]))
+        self.synced_moves = moves
+
+    def go(self, game_state, depth, algorithm=ChessAI.ALGORITHM_WITH_PRUNING, **limits):
+        """
+        Đồng bộ bàn cờ rồi bắt đầu tìm kiếm; lấy kết quả bằng pollResult()
+
+        Tham số:
+        - game_state: Trạng thái trò chơi của giao diện
+        - depth: Độ sâu tối đa
+        - algorithm: Thuật toán tìm kiếm
+        - limits: Giới hạn thời gian của ChessAI.searchPosition (movetime, wtime, btime, inc)
+
+        Trả về mã của lần tìm kiếm
+        """
+        self.stopPondering()
+        self.syncPosition(game_state)
+        self.search_id += 1
+        self.pending_id = self.search_id
+        self.pending_command = (CMD_GO, self.search_id, depth, algorithm, limits)
+        self.requests.put(self.pending_command)
+        return self.search_id
+
+    def ponder(self, game_state, predicted_move, depth, algorithm=ChessAI.ALGORITHM_WITH_PRUNING):
+        """
+        Tìm trước trong thời gian người chơi suy nghĩ, giả sử người chơi sẽ đi predicted_move
+        (thường là nước thứ hai của biến chính). Lần go tiếp theo tự dừng việc tìm trước.
+
+        Tham số:
+        - game_state: Trạng thái trò chơi của giao diện (sau nước đi của máy)
+        - predicted_move: Nước đi dự đoán của người chơi
+        - depth: Độ sâu tối đa
+        - algorithm: Thuật toán tìm kiếm
+        """
+        self.stopPondering()
+        self.syncPosition(game_state)
+        self.search_id += 1
+        self.ponder_id = self.search_id
+        self.requests.put((CMD_PONDER, self.ponder_id, depth, algorithm,
+                           (predicted_move.moveID, predicted_move.promotion_choice)))
+
+    def stopSearch(self, search_id):
+        """Dừng lần tìm có mã search_id (cùng mọi lần tìm gửi trước nó)"""
+        with self.stop_id.get_lock():
+            if self.stop_id.value < search_id:
+                self.stop_id.value = search_id
+
+    def stopPondering(self):
+        """Dừng việc tìm trước (nếu đang chạy); kết quả vẫn được tiến trình AI giữ cho lần go tiếp theo"""
+        if self.ponder_id is not None:
+            self.stopSearch(self.ponder_id)
+            self.ponder_id = None
+
+    def pollResult(self):
+        """SearchResult của lần go gần nhất nếu đã xong, ngược lại None (kết quả của lần tìm đã bị dừng bị bỏ qua)"""
+        while True:
+            try:
+                search_id, result = self.responses.get_nowait()
+            except queue.Empty:
+                return None
+            if search_id == RESPONSE_RESYNC:
+                self.resync()
+            elif search_id == self.pending_id:
+                self.pending_id = None
+                self.pending_command = None
+                return result
+
+    def isSearching(self):
+        return self.pending_id is not None
+
+    def moveNow(self):
+        """Yêu cầu lần tìm đang chạy dừng ngay và trả về nước tốt nhất đã tìm được (lấy bằng pollResult)"""
+        if self.pending_id is not None:
+            self.stopSearch(self.pending_id)
+
+    def stop(self):
+        """Dừng lần tìm đang chạy hoặc việc tìm trước (nếu có) và bỏ kết quả của nó"""
+        self.stopPondering()
+        if self.pending_id is not None:
+            self.stopSearch(self.pending_id)
+            self.pending_id = None
+            self.pending_command = None
+
+    def close(self):
+        """Kết thúc tiến trình AI"""
+        if self.process is None:
+            return
+        self.stop()
+        self.requests.put((CMD_QUIT,))
+        self.process.join(QUIT_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        atexit.unregister(self.close)
+
+
+def engineWorkerMain(requests, responses, stop_id, engine):
+    """Vòng lặp của tiến trình AI: xử lý lần lượt từng lệnh trong hàng đợi yêu cầu"""
+    game_state = createGameState(engine)
+    options = dict(WORKER_OPTIONS)
+    ponder_result = None
+    ponder_key = None  # khóa Zobrist của thế cờ đã tìm trước
+    out_of_sync = False  # bàn cờ lệch với giao diện: chờ CMD_NEW_GAME
+    while True:
+        command = requests.get()
+        name = command[0]
+        if name == CMD_QUIT:
+            break
+        if name == CMD_NEW_GAME:
+            game_state = createGameState(engine, command[1])
+            ChessAI.clearTranspositionTable()
+            ponder_result = None
+            out_of_sync = False
+        elif name == CMD_SET_OPTION:
+            options[command[1]] = command[2]
+        elif out_of_sync:
+            continue
+        elif name == CMD_POSITION:
+            _, undo_count, new_moves = command
+            for _ in range(undo_count):
+                game_state.undoMove()
+            for move_id, promotion in new_moves:
+                move = next((move for move in game_state.getValidMoves() if move.moveID == move_id), None)
+                if move is None:
+                    out_of_sync = True
+                    responses.put((RESPONSE_RESYNC, None))
+                    break
+                move.promotion_choice = promotion
+                game_state.makeMove(move, promotion)
+        elif name == CMD_PONDER:
+            _, search_id, depth, algorithm, (move_id, promotion) = command
+            stop_event = SearchStop(stop_id, search_id)
+            move = next((move for move in game_state.getValidMoves() if move.moveID == move_id), None)
+            if move is None or stop_event.is_set():
+                continue
+            move.promotion_choice = promotion
+            game_state.makeMove(move, promotion)
+            ponder_options = dict(options, threads=min(options["threads"], PONDER_THREADS))
+            ponder_result = ChessAI.searchPosition(game_state, game_state.getValidMoves(), depth, algorithm,
+                                                   stop_event=stop_event, **ponder_options)
+            ponder_key = game_state.zobrist
+            game_state.undoMove()
+        elif name == CMD_GO:
+            _, search_id, depth, algorithm, limits = command
+            if ponder_result is not None and ponder_key == game_state.zobrist and ponder_result.depth >= depth:
+                # đoán đúng nước của người chơi và đã tìm đủ sâu: trả lời ngay
+                responses.put((search_id, ponder_result))
+                ponder_result = None
+                continue
+            ponder_result = None
+            result = ChessAI.searchPosition(game_state, game_state.getValidMoves(), depth, algorithm,
+                                            stop_event=SearchStop(stop_id, search_id), **options, **limits)
+            responses.put((search_id, result))
+    ChessAI.shutdownRootSplitPool()
+    ChessAI.shutdownLazySmpPool()
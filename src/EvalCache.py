@@ -0,0 +1,61 @@
+"""
+Bộ đệm điểm đánh giá tĩnh (eval cache)
+--------------------------------------
+Lưu điểm tĩnh của thế cờ theo khóa Zobrist để các nút lá gặp lại (qua hoán vị nước đi hoặc giữa các lần lặp
+của tìm kiếm sâu dần) không phải đánh giá lại. Tách riêng khỏi bảng chuyển vị để hàng loạt điểm của nút lá
+không đẩy các mục tìm kiếm sâu ra khỏi bảng chuyển vị.
+
+Bảng ánh xạ trực tiếp (mỗi khóa chỉ có một ô, khóa mới ghi đè khóa cũ) với số ô là lũy thừa của 2.
+"""
+
+DEFAULT_EVAL_CACHE_ENTRIES = 1 << 16
+
+
+class EvalCache:
+    """
+    Bộ đệm điểm tĩnh ánh xạ trực tiếp, riêng cho từng tiến trình
+    """
+
+    def __init__(self, entries=DEFAULT_EVAL_CACHE_ENTRIES):
+        """
+        Tham số:
+        - entries: Số ô của bộ đệm (được làm tròn xuống lũy thừa của 2)
+        """
+        size = 1
+        while size * 2 <= entries:
+            size *= 2
+        self.entries = entries
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.scores = [0] * size
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        """Xóa toàn bộ mục và bộ đếm"""
+        self.keys = [None] * len(self.keys)
+        self.scores = [0] * len(self.scores)
+        self.resetStats()
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def hitRate(self):
+        """Tỷ lệ lần tra cứu tìm thấy điểm đã lưu (0.0 - 1.0)"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, key):
+        """Điểm đã lưu của thế cờ có khóa Zobrist key, hoặc None nếu không có"""
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        return None
+
+    def store(self, key, score):
+        """Lưu điểm của thế cờ có khóa Zobrist key, ghi đè mục đang có ở cùng ô"""
+        index = key & self.mask
+        self.keys[index] = key
+        self.scores[index] = score
@@ -0,0 +1,331 @@
+"""
+Bảng đánh giá thế cờ
+--------------------
+Giá trị quân cờ và bảng điểm vị trí (piece-square table) trung cuộc / tàn cuộc dùng cho hàm đánh giá của AI.
+Điểm cuối cùng là hai điểm trộn theo giai đoạn ván cờ (tapered evaluation).
+Đặt riêng khỏi src/ChessAI.py để GameState (src/ChessEngine.py) cập nhật điểm vật chất + vị trí tăng dần
+trong makeMove/undoMove mà không phải import cả module AI.
+"""
+
+# Giá trị quân cờ tính bằng centipawn (1/100 tốt); mọi điểm đánh giá đều là số nguyên
+piece_score = {"K": 0, "Q": 900, "R": 500, "B": 300, "N": 300, "p": 100}
+#Đánh giá mức độ quan trọng của từng quân cờ (VD: 0 là không thể để mất,Q là quan trọng nhất và chỉ mang tính tương đối)
+
+# Bảng điểm vị trí (centipawn) của trung cuộc nhìn từ phía trắng: hàng 0 là hàng 8 của bàn cờ
+knight_scores = [[0, 10, 20, 20, 20, 20, 10, 0],
+                 [10, 30, 50, 50, 50, 50, 30, 10],
+                 [20, 50, 60, 65, 65, 60, 50, 20],
+                 [20, 55, 65, 70, 70, 65, 55, 20],
+                 [20, 50, 65, 70, 70, 65, 50, 20],
+                 [20, 55, 60, 65, 65, 60, 55, 20],
+                 [10, 30, 50, 55, 55, 50, 30, 10],
+                 [0, 10, 20, 20, 20, 20, 10, 0]]
+
+bishop_scores = [[0, 20, 20, 20, 20, 20, 20, 0],
+                 [20, 40, 40, 40, 40, 40, 40, 20],
+                 [20, 40, 50, 60, 60, 50, 40, 20],
+                 [20, 50, 50, 60, 60, 50, 50, 20],
+                 [20, 40, 60, 60, 60, 60, 40, 20],
+                 [20, 60, 60, 60, 60, 60, 60, 20],
+                 [20, 50, 40, 40, 40, 40, 50, 20],
+                 [0, 20, 20, 20, 20, 20, 20, 0]]
+
+rook_scores = [[25, 25, 25, 25, 25, 25, 25, 25],
+               [50, 75, 75, 75, 75, 75, 75, 50],
+               [0, 25, 25, 25, 25, 25, 25, 0],
+               [0, 25, 25, 25, 25, 25, 25, 0],
+               [0, 25, 25, 25, 25, 25, 25, 0],
+               [0, 25, 25, 25, 25, 25, 25, 0],
+               [0, 25, 25, 25, 25, 25, 25, 0],
+               [25, 25, 25, 50, 50, 25, 25, 25]]
+
+queen_scores = [[0, 20, 20, 30, 30, 20, 20, 0],
+                [20, 40, 40, 40, 40, 40, 40, 20],
+                [20, 40, 50, 50, 50, 50, 40, 20],
+                [30, 40, 50, 50, 50, 50, 40, 30],
+                [40, 40, 50, 50, 50, 50, 40, 30],
+                [20, 50, 50, 50, 50, 50, 40, 20],
+                [20, 40, 50, 40, 40, 40, 40, 20],
+                [0, 20, 20, 30, 30, 20, 20, 0]]
+
+pawn_scores = [[80, 80, 80, 80, 80, 80, 80, 80],
+               [70, 70, 70, 70, 70, 70, 70, 70],
+               [30, 30, 40, 50, 50, 40, 30, 30],
+               [25, 25, 30, 45, 45, 30, 25, 25],
+               [20, 20, 20, 40, 40, 20, 20, 20],
+               [25, 15, 10, 20, 20, 10, 15, 25],
+               [25, 30, 30, 0, 0, 30, 30, 25],
+               [20, 20, 20, 20, 20, 20, 20, 20]]
+
+king_scores = [[-60, -60, -60, -60, -60, -60, -60, -60],
+               [-50, -50, -50, -50, -50, -50, -50, -50],
+               [-40, -40, -40, -40, -40, -40, -40, -40],
+               [-40, -40, -40, -50, -50, -40, -40, -40],
+               [-30, -30, -30, -40, -40, -30, -30, -30],
+               [-20, -20, -20, -20, -20, -20, -20, -20],
+               [0, 0, -10, -10, -10, -10, 0, 0],
+               [10, 30, 20, 0, 0, 10, 30, 10]]
+
+# Bảng điểm vị trí của tàn cuộc: tốt càng gần hàng phong cấp càng có giá, vua cần ra trung tâm
+knight_endgame_scores = [[0, 10, 15, 15, 15, 15, 10, 0],
+                         [10, 20, 30, 30, 30, 30, 20, 10],
+                         [15, 30, 40, 45, 45, 40, 30, 15],
+                         [15, 30, 45, 50, 50, 45, 30, 15],
+                         [15, 30, 45, 50, 50, 45, 30, 15],
+                         [15, 30, 40, 45, 45, 40, 30, 15],
+                         [10, 20, 30, 30, 30, 30, 20, 10],
+                         [0, 10, 15, 15, 15, 15, 10, 0]]
+
+bishop_endgame_scores = [[10, 20, 20, 20, 20, 20, 20, 10],
+                         [20, 30, 30, 30, 30, 30, 30, 20],
+                         [20, 30, 40, 40, 40, 40, 30, 20],
+                         [20, 30, 40, 50, 50, 40, 30, 20],
+                         [20, 30, 40, 50, 50, 40, 30, 20],
+                         [20, 30, 40, 40, 40, 40, 30, 20],
+                         [20, 30, 30, 30, 30, 30, 30, 20],
+                         [10, 20, 20, 20, 20, 20, 20, 10]]
+
+rook_endgame_scores = [[30, 30, 30, 30, 30, 30, 30, 30],
+                       [40, 40, 40, 40, 40, 40, 40, 40],
+                       [25, 25, 25, 25, 25, 25, 25, 25],
+                       [25, 25, 25, 25, 25, 25, 25, 25],
+                       [25, 25, 25, 25, 25, 25, 25, 25],
+                       [25, 25, 25, 25, 25, 25, 25, 25],
+                       [25, 25, 25, 25, 25, 25, 25, 25],
+                       [20, 25, 25, 25, 25, 25, 25, 20]]
+
+queen_endgame_scores = [[0, 5, 5, 10, 10, 5, 5, 0],
+                        [5, 10, 10, 10, 10, 10, 10, 5],
+                        [5, 10, 15, 15, 15, 15, 10, 5],
+                        [10, 10, 15, 20, 20, 15, 10, 10],
+                        [10, 10, 15, 20, 20, 15, 10, 10],
+                        [5, 10, 15, 15, 15, 15, 10, 5],
+                        [5, 10, 10, 10, 10, 10, 10, 5],
+                        [0, 5, 5, 10, 10, 5, 5, 0]]
+
+pawn_endgame_scores = [[0, 0, 0, 0, 0, 0, 0, 0],
+                       [120, 120, 120, 120, 120, 120, 120, 120],
+                       [80, 80, 80, 80, 80, 80, 80, 80],
+                       [50, 50, 50, 50, 50, 50, 50, 50],
+                       [30, 30, 30, 30, 30, 30, 30, 30],
+                       [15, 15, 15, 15, 15, 15, 15, 15],
+                       [5, 5, 5, 5, 5, 5, 5, 5],
+                       [0, 0, 0, 0, 0, 0, 0, 0]]
+
+king_endgame_scores = [[-80, -60, -50, -40, -40, -50, -60, -80],
+                       [-60, -30, -20, -10, -10, -20, -30, -60],
+                       [-50, -20, 20, 30, 30, 20, -20, -50],
+                       [-40, -10, 30, 40, 40, 30, -10, -40],
+                       [-40, -10, 30, 40, 40, 30, -10, -40],
+                       [-50, -20, 20, 30, 30, 20, -20, -50],
+                       [-60, -30, -20, -10, -10, -20, -30, -60],
+                       [-80, -60, -50, -40, -40, -50, -60, -80]]
+
+piece_position_scores = {"N": knight_scores, "B": bishop_scores, "Q": queen_scores, "R": rook_scores,
+                         "p": pawn_scores, "K": king_scores}
+endgame_position_scores = {"N": knight_endgame_scores, "B": bishop_endgame_scores, "Q": queen_endgame_scores,
+                           "R": rook_endgame_scores, "p": pawn_endgame_scores, "K": king_endgame_scores}
+
+# Giai đoạn ván cờ tính theo quân không phải tốt còn trên bàn: PHASE_MAX ở thế cờ ban đầu (trung cuộc),
+# 0 khi chỉ còn vua và tốt (tàn cuộc)
+PIECE_PHASE = {"K": 0, "Q": 4, "R": 2, "B": 1, "N": 1, "p": 0}
+PHASE_MAX = 24
+
+# Tàn cuộc "dọn dẹp" (mop-up): khi giai đoạn không quá MOP_UP_PHASE và một bên hơn ít nhất MOP_UP_MARGIN
+MOP_UP_PHASE = 6
+MOP_UP_MARGIN = 400
+MOP_UP_CENTRE_WEIGHT = 10    # mỗi bước vua thua cách xa 4 ô trung tâm (khoảng cách Manhattan)
+MOP_UP_DISTANCE_WEIGHT = 10  # mỗi bước hai vua lại gần nhau
+
+# Cấu trúc tốt (điểm gói trung cuộc / tàn cuộc cho mỗi con tốt, xem evaluatePawns)
+DOUBLED_PAWN = (-10, -20)      # mỗi con tốt chồng thêm trên cùng một cột
+ISOLATED_PAWN = (-15, -10)     # không có tốt cùng màu ở hai cột bên cạnh
+BACKWARD_PAWN = (-10, -10)     # tụt lại sau các tốt bên cạnh và ô phía trước bị tốt đối phương kiểm soát
+PASSED_PAWN_MIDDLEGAME = (0, 5, 10, 20, 35, 60)  # tốt thông theo số hàng đã tiến khỏi hàng xuất phát
+PASSED_PAWN_ENDGAME = (0, 10, 15, 30, 50, 80)
+PAWN_SHIELD = (15, 8)          # điểm trung cuộc cho mỗi tốt che vua ở hàng ngay trước vua / hàng tiếp theo
+
+# Điểm trung cuộc và tàn cuộc được gói trong một số nguyên: mg * SCORE_PACK + eg,
+# nên cộng trừ điểm gói vẫn cộng trừ riêng từng phần và makeMove chỉ tra một bảng cho mỗi ô thay đổi
+SCORE_PACK = 1 << 16
+_EG_OFFSET = SCORE_PACK // 2
+
+
+def packScore(middlegame, endgame):
+    return middlegame * SCORE_PACK + endgame
+
+
+def unpackScore(score):
+    """Tách điểm gói thành (điểm trung cuộc, điểm tàn cuộc)"""
+    endgame = ((score + _EG_OFFSET) & (SCORE_PACK - 1)) - _EG_OFFSET
+    return (score - endgame) >> 16, endgame
+
+
+def taperedScore(score, phase):
+    """Trộn điểm trung cuộc và tàn cuộc của điểm gói theo giai đoạn ván cờ (PHASE_MAX là trung cuộc hoàn toàn)"""
+    middlegame, endgame = unpackScore(score)
+    phase = min(phase, PHASE_MAX)  # phong cấp có thể đưa tổng quân vượt thế cờ ban đầu
+    return (middlegame * phase + endgame * (PHASE_MAX - phase)) // PHASE_MAX
+
+
+def mopUpScore(winning_king, losing_king):
+    """
+    Điểm thưởng (centipawn) cho bên thắng rõ ở tàn cuộc ít quân: đẩy vua thua ra mép bàn và đưa vua thắng lại gần,
+    vì bảng điểm vị trí của vua chỉ kéo cả hai vua về trung tâm
+
+    Tham số:
+    - winning_king, losing_king: (hàng, cột) của vua bên thắng và vua bên thua
+    """
+    losing_row, losing_col = losing_king
+    centre_distance = max(3 - losing_row, losing_row - 4) + max(3 - losing_col, losing_col - 4)
+    king_distance = abs(winning_king[0] - losing_row) + abs(winning_king[1] - losing_col)
+    return MOP_UP_CENTRE_WEIGHT * centre_distance + MOP_UP_DISTANCE_WEIGHT * (14 - king_distance)
+
+
+def pawnStructureScore(own_files, enemy_files, white):
+    """
+    Điểm gói cấu trúc tốt của một bên (dương có lợi cho bên đó)
+
+    Tham số:
+    - own_files, enemy_files: Danh sách 8 cột, mỗi cột là các hàng có tốt của bên đó / của đối phương
+    - white: True nếu own_files là tốt trắng (trắng đi lên, hàng giảm dần)
+    """
+    middlegame = endgame = 0
+    forward = -1 if white else 1
+    for col, rows in enumerate(own_files):
+        if not rows:
+            continue
+        if len(rows) > 1:
+            middlegame += DOUBLED_PAWN[0] * (len(rows) - 1)
+            endgame += DOUBLED_PAWN[1] * (len(rows) - 1)
+        neighbour_cols = [neighbour for neighbour in (col - 1, col + 1) if 0 <= neighbour <= 7]
+        isolated = not any(own_files[neighbour] for neighbour in neighbour_cols)
+        front_row = min(rows) if white else max(rows)
+        for row in rows:
+            if white:
+                # trắng đi lên: phía trước là các hàng nhỏ hơn
+                passed = row == front_row and all(enemy_row >= row for enemy_col in [col] + neighbour_cols
+                                                  for enemy_row in enemy_files[enemy_col])
+                can_be_supported = any(own_row >= row for neighbour in neighbour_cols for own_row in own_files[neighbour])
+                advance = 6 - row
+            else:
+                passed = row == front_row and all(enemy_row <= row for enemy_col in [col] + neighbour_cols
+                                                  for enemy_row in enemy_files[enemy_col])
+                can_be_supported = any(own_row <= row for neighbour in neighbour_cols for own_row in own_files[neighbour])
+                advance = row - 1
+            if passed:
+                middlegame += PASSED_PAWN_MIDDLEGAME[advance]
+                endgame += PASSED_PAWN_ENDGAME[advance]
+            if isolated:
+                middlegame += ISOLATED_PAWN[0]
+                endgame += ISOLATED_PAWN[1]
+            elif not can_be_supported and any(row + 2 * forward in enemy_files[neighbour] for neighbour in neighbour_cols):
+                # không tốt bên cạnh nào ở cùng hàng hay phía sau để bảo vệ, ô phía trước bị tốt đối phương ăn được
+                middlegame += BACKWARD_PAWN[0]
+                endgame += BACKWARD_PAWN[1]
+    return packScore(middlegame, endgame)
+
+
+def evaluatePawns(board):
+    """
+    Đánh giá cấu trúc tốt của bàn cờ (tốt chồng, tốt cô lập, tốt thông, tốt lạc hậu); chỉ phụ thuộc vị trí các con tốt
+    nên kết quả được lưu trong bảng băm cấu trúc tốt (src/PawnHashTable.py)
+
+    Trả về (điểm gói, dương có lợi cho trắng; mặt nạ bit tốt trắng; mặt nạ bit tốt đen) với bit row * 8 + col
+    """
+    white_files = [[] for _ in range(8)]
+    black_files = [[] for _ in range(8)]
+    white_pawns = black_pawns = 0
+    for row in range(1, 7):
+        board_row = board[row]
+        for col in range(8):
+            piece = board_row[col]
+            if piece == "wp":
+                white_files[col].append(row)
+                white_pawns |= 1 << (row * 8 + col)
+            elif piece == "bp":
+                black_files[col].append(row)
+                black_pawns |= 1 << (row * 8 + col)
+    score = pawnStructureScore(white_files, black_files, True) - pawnStructureScore(black_files, white_files, False)
+    return score, white_pawns, black_pawns
+
+
+def buildShieldMasks(white):
+    """Theo ô của vua: (mặt nạ hàng ngay trước vua, mặt nạ hàng tiếp theo) trên ba cột quanh vua; 0 nếu vua đã rời
+    hai hàng cuối của mình (không còn được tốt che)"""
+    masks = []
+    forward = -1 if white else 1
+    for row in range(8):
+        for col in range(8):
+            if (row < 6) if white else (row > 1):
+                masks.append((0, 0))
+                continue
+            near = far = 0
+            for shield_col in range(max(0, col - 1), min(7, col + 1) + 1):
+                near |= 1 << ((row + forward) * 8 + shield_col)
+                far |= 1 << ((row + 2 * forward) * 8 + shield_col)
+            masks.append((near, far))
+    return tuple(masks)
+
+
+WHITE_SHIELD_MASKS = buildShieldMasks(True)
+BLACK_SHIELD_MASKS = buildShieldMasks(False)
+
+
+def pawnShieldScore(white_pawns, black_pawns, white_king, black_king):
+    """
+    Điểm gói (chỉ trung cuộc) của các tốt che vua, dương có lợi cho trắng. Tính lại ở mỗi lần đánh giá
+    vì phụ thuộc cả ô của vua, nhưng chỉ tốn vài phép AND trên mặt nạ tốt lấy từ bảng băm cấu trúc tốt
+
+    Tham số:
+    - white_pawns, black_pawns: Mặt nạ bit tốt trắng / đen (xem evaluatePawns)
+    - white_king, black_king: (hàng, cột) của vua trắng / vua đen
+    """
+    near, far = WHITE_SHIELD_MASKS[white_king[0] * 8 + white_king[1]]
+    score = PAWN_SHIELD[0] * bin(white_pawns & near).count("1") + PAWN_SHIELD[1] * bin(white_pawns & far).count("1")
+    near, far = BLACK_SHIELD_MASKS[black_king[0] * 8 + black_king[1]]
+    score -= PAWN_SHIELD[0] * bin(black_pawns & near).count("1") + PAWN_SHIELD[1] * bin(black_pawns & far).count("1")
+    return packScore(score, 0)
+
+
+def buildPieceSquareScores():
+    """
+    Gộp giá trị quân và hai bảng điểm vị trí (trung cuộc, tàn cuộc) thành một bảng phẳng 64 ô điểm gói
+    (chỉ số row * 8 + col) cho mỗi quân của mỗi màu.
+    Bảng của đen là bảng của trắng lật theo hàng và mang dấu âm, nên điểm dương luôn có lợi cho trắng.
+    """
+    tables = {}
+    for piece, value in piece_score.items():
+        middlegame_scores = piece_position_scores[piece]
+        endgame_scores = endgame_position_scores[piece]
+        white = tuple(packScore(value + middlegame_scores[row][col], value + endgame_scores[row][col])
+                      for row in range(8) for col in range(8))
+        tables["w" + piece] = white
+        tables["b" + piece] = tuple(-white[(7 - row) * 8 + col] for row in range(8) for col in range(8))
+    return tables
+
+
+# Quân ("wN", "bp", ...) -> 64 điểm gói vật chất + vị trí, sinh một lần khi import
+PIECE_SQUARE_SCORES = buildPieceSquareScores()
+
+# Bật để mỗi lần đánh giá đều so điểm tăng dần của GameState với điểm tính lại từ đầu (chậm, chỉ dùng khi gỡ lỗi).
+# ChessAI đọc cờ qua module lúc đánh giá nên gán src.Evaluation.EVAL_DEBUG = True có tác dụng cả khi đang chạy.
+EVAL_DEBUG = False
+
+
+def computeMaterialScore(board):
+    """
+    Tính lại từ đầu tổng điểm gói vật chất + vị trí của bàn cờ (dùng khi dựng thế cờ và để kiểm tra khi gỡ lỗi)
+    """
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece != "--":
+                score += PIECE_SQUARE_SCORES[piece][row * 8 + col]
+    return score
+
+
+def computePhase(board):
+    """Tính lại từ đầu giai đoạn ván cờ (tổng PIECE_PHASE của mọi quân trên bàn)"""
+    return sum(PIECE_PHASE[piece[1]] for row in board for piece in row if piece != "--")
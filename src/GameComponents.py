@@ -562,7 +562,7 @@ class Animation:
                     
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:
-                        game.gameState = GameState()
+                        game.gameState = createGameState(game.engine)
                         game.validMoves = game.gameState.getValidMoves()
                         game.game_over = False
                         waiting_for_key = False
@@ -586,7 +586,7 @@ class Animation:
                     for button in buttons:
                         if button["rect"].collidepoint(event.pos):
                             if button["action"] == "restart":
-                                game.gameState = GameState()
+                                game.gameState = createGameState(game.engine)
                                 game.validMoves = game.gameState.getValidMoves()
                                 game.game_over = False
                                 waiting_for_key = False
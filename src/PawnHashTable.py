@@ -0,0 +1,63 @@
+"""
+Bảng băm cấu trúc tốt (pawn hash table)
+---------------------------------------
+Lưu kết quả evaluatePawns (src/Evaluation.py) theo khóa Zobrist chỉ gồm các con tốt (GameState.pawn_zobrist).
+Cấu trúc tốt hiếm khi đổi giữa các nút của cây tìm kiếm nên gần như mọi lần đánh giá đều trúng bảng
+và các điểm tốt chồng / cô lập / thông / lạc hậu gần như không tốn thời gian.
+
+Bảng ánh xạ trực tiếp (mỗi khóa chỉ có một ô, khóa mới ghi đè khóa cũ) với số ô là lũy thừa của 2.
+"""
+from src.Evaluation import evaluatePawns
+
+DEFAULT_PAWN_TABLE_ENTRIES = 1 << 14
+
+
+class PawnHashTable:
+    """
+    Bảng băm cấu trúc tốt ánh xạ trực tiếp, riêng cho từng tiến trình
+    """
+
+    def __init__(self, entries=DEFAULT_PAWN_TABLE_ENTRIES):
+        """
+        Tham số:
+        - entries: Số ô của bảng (được làm tròn xuống lũy thừa của 2)
+        """
+        size = 1
+        while size * 2 <= entries:
+            size *= 2
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        """Xóa toàn bộ mục và bộ đếm"""
+        self.keys = [None] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+        self.resetStats()
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def hitRate(self):
+        """Tỷ lệ lần tra cứu tìm thấy cấu trúc tốt (0.0 - 1.0)"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, game_state):
+        """
+        Đánh giá cấu trúc tốt của thế cờ: lấy từ bảng nếu đã có, nếu không thì tính bằng evaluatePawns và lưu lại
+
+        Trả về (điểm gói, mặt nạ tốt trắng, mặt nạ tốt đen) như evaluatePawns
+        """
+        self.probes += 1
+        key = game_state.pawn_zobrist
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+        entry = evaluatePawns(game_state.board)
+        self.keys[index] = key
+        self.entries[index] = entry
+        return entry
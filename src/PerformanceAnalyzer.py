@@ -4,13 +4,17 @@ Module đo lường hiệu suất các thuật toán AI cờ vua.
 import time
 import psutil
 import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 from multiprocessing import Queue
 import uuid
 import datetime
+import timeit
+import tracemalloc
+import types
 
-from src.ChessEngine import GameState, Move
+from src.ChessEngine import GameState, Move, CastleRights, createGameState, DEFAULT_ENGINE
 import src.ChessAI as ChessAI
 
 class PerformanceAnalyzer:
@@ -19,21 +23,29 @@ class PerformanceAnalyzer:
     Đo lường thời gian thực thi và bộ nhớ sử dụng, sau đó xuất kết quả ra file Excel.
     """
     
-    def __init__(self, output_folder="exports"):
+    def __init__(self, output_folder="exports", search_config=None, thread_counts=None,
+                 parallel=ChessAI.PARALLEL_LAZY_SMP):
         """
         Khởi tạo PerformanceAnalyzer
         
         Tham số:
         - output_folder: Thư mục lưu các file kết quả
+        - search_config: ChessAI.SearchConfig dùng cho mọi phép đo (mặc định tìm kiếm đầy đủ, tất định
+          nên các lần lặp trên cùng vị trí duyệt cùng một cây và cho cùng số nút)
+        - thread_counts: Danh sách số tiến trình tìm kiếm cần đo cho mỗi phép đo (mặc định [1])
+        - parallel: Cách tìm kiếm song song khi số tiến trình > 1 (ChessAI.PARALLEL_LAZY_SMP hoặc PARALLEL_ROOT_SPLIT)
         """
         self.output_folder = output_folder
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
         
+        self.search_config = search_config if search_config is not None else ChessAI.SearchConfig()
+        self.thread_counts = thread_counts if thread_counts else [ChessAI.DEFAULT_THREADS]
+        self.parallel = parallel
         self.results = []
         self.process = psutil.Process(os.getpid())
     
-    def measure_specific_position(self, game_state, algorithm, position_description="Vị trí cơ bản", depth_levels=[1, 2, 3, 4], repetitions=3):
+    def measure_specific_position(self, game_state, algorithm, position_description="Vị trí cơ bản", depth_levels=[1, 2, 3, 4], repetitions=3, engine=DEFAULT_ENGINE):
         """
         Đo lường hiệu suất của một thuật toán AI với một vị trí cụ thể
         
@@ -43,6 +55,7 @@ class PerformanceAnalyzer:
         - position_description: Mô tả vị trí đang được đánh giá
         - depth_levels: Danh sách các độ sâu cần đo lường
         - repetitions: Số lần lặp lại mỗi phép đo để lấy kết quả trung bình
+        - engine: Kiểu biểu diễn bàn cờ của game_state (chỉ dùng để ghi vào kết quả)
         
         Trả về:
         - Kết quả đo lường cho vị trí cụ thể
@@ -59,7 +72,8 @@ class PerformanceAnalyzer:
         board_state = []
         for row in game_state.board:
             board_state.append(row.copy())
-        castle_rights = game_state.current_castling_rights.copy()
+        rights = game_state.current_castling_rights
+        castle_rights = CastleRights(rights.wks, rights.bks, rights.wqs, rights.bqs)
         en_passant_possible = game_state.enpassant_possible
         white_to_move = game_state.white_to_move
         
@@ -69,65 +83,90 @@ class PerformanceAnalyzer:
             for rep in range(repetitions):
                 print(f"    Lần lặp: {rep+1}/{repetitions}")
                 
-                # Khôi phục lại trạng thái ban đầu trước mỗi lần kiểm tra
-                game_state.board = []
-                for row in board_state:
-                    game_state.board.append(row.copy())
-                game_state.current_castling_rights = castle_rights.copy()
-                game_state.enpassant_possible = en_passant_possible
-                game_state.white_to_move = white_to_move
+                for threads in self.thread_counts:
+                    # Khôi phục lại trạng thái ban đầu trước mỗi lần kiểm tra
+                    game_state.board = [row.copy() for row in board_state]
+                    game_state.current_castling_rights = CastleRights(castle_rights.wks, castle_rights.bks,
+                                                                      castle_rights.wqs, castle_rights.bqs)
+                    game_state.enpassant_possible = en_passant_possible
+                    game_state.white_to_move = white_to_move
                 
-                # Đảm bảo cập nhật các trạng thái khác nếu cần
-                game_state.updateCastleRights()
+                    # Đảm bảo cập nhật các trạng thái khác nếu cần (khóa Zobrist và điểm vật chất tính theo bàn cờ vừa khôi phục)
+                    game_state.refreshZobrist()
                 
-                # Đo lường bộ nhớ sử dụng trước khi thực thi
-                memory_before = self.process.memory_info().rss / 1024 / 1024  # Chuyển đổi sang MB
+                    # Đo lường bộ nhớ sử dụng trước khi thực thi
+                    memory_before = self.process.memory_info().rss / 1024 / 1024  # Chuyển đổi sang MB
                 
-                # Tạo queue để nhận kết quả
-                return_queue = Queue()
+                    # Tạo queue để nhận kết quả
+                    return_queue = Queue()
                 
-                # Đo lường thời gian thực thi
-                start_time = time.time()
+                    # Xóa bảng chuyển vị để mỗi lần lặp đều tìm kiếm từ đầu
+                    ChessAI.clearTranspositionTable()
                 
-                # Thực thi thuật toán
-                ChessAI.findBestMove(game_state, valid_moves, return_queue, depth=depth, algorithm=algorithm)
+                    # Đo lường thời gian thực thi
+                    start_time = time.time()
                 
-                # Lấy nước đi tốt nhất từ queue
-                best_move = return_queue.get()
+                    # Thực thi thuật toán
+                    result = ChessAI.findBestMove(game_state, valid_moves, return_queue, depth=depth, algorithm=algorithm,
+                                                  config=self.search_config, threads=threads,
+                                                  parallel=self.parallel)
                 
-                # Tính thời gian thực thi
-                execution_time = time.time() - start_time
+                    # Lấy nước đi tốt nhất từ queue
+                    best_move = return_queue.get()
                 
-                # Đo lường bộ nhớ sử dụng sau khi thực thi
-                memory_after = self.process.memory_info().rss / 1024 / 1024  # Chuyển đổi sang MB
-                memory_used = memory_after - memory_before
+                    # Tính thời gian thực thi
+                    execution_time = time.time() - start_time
                 
-                # Lưu kết quả
-                self.results.append({
-                    'Vị trí': position_description,
-                    'Thuật toán': algorithm,
-                    'Độ sâu': depth,
-                    'Lần lặp': rep + 1,
-                    'Thời gian (giây)': execution_time,
-                    'Bộ nhớ (MB)': memory_used,
-                    'Nước đi tốt nhất': best_move.getChessNotation() if best_move else "None"
-                })
+                    # Đo lường bộ nhớ sử dụng sau khi thực thi
+                    memory_after = self.process.memory_info().rss / 1024 / 1024  # Chuyển đổi sang MB
+                    memory_used = memory_after - memory_before
+                
+                    # Lưu kết quả
+                    self.results.append({
+                        'Vị trí': position_description,
+                        'Bộ máy': engine,
+                        'Thuật toán': algorithm,
+                        'Chế độ tìm kiếm': str(self.search_config),
+                        'Độ sâu': depth,
+                        'Số luồng': threads,
+                        'Song song': self.parallel if threads > 1 else "",
+                        'Lần lặp': rep + 1,
+                        'Thời gian (giây)': execution_time,
+                        'Bộ nhớ (MB)': memory_used,
+                        'Tỷ lệ trúng TT (%)': result.tt_hit_rate * 100,
+                        'Số lần tra TT': result.tt_probes,
+                        'Số lần trúng TT': result.tt_hits,
+                        'Tỷ lệ trúng bảng tốt (%)': result.pawn_hit_rate * 100,
+                        'Số nút': result.nodes,
+                        'Số nút tìm kiếm tĩnh': result.quiescence_nodes,
+                        'Seldepth': result.seldepth,
+                        'Số lần cắt beta': result.cutoffs,
+                        'Tỷ lệ cắt ở nước đầu (%)': result.first_move_cutoff_rate * 100,
+                        'Hệ số phân nhánh': result.branching_factor,
+                        'Nút/giây': result.nodesPerSecond(),
+                        'Thời gian sinh nước đi (giây)': result.movegen_time,
+                        'Thời gian đánh giá (giây)': result.eval_time,
+                        'Nước đi tốt nhất': best_move.getChessNotation() if best_move else "None"
+                    })
     
-    def create_test_positions(self):
+    def create_test_positions(self, engine=DEFAULT_ENGINE):
         """
         Tạo các vị trí kiểm tra tiêu chuẩn để đánh giá thuật toán
         
+        Tham số:
+        - engine: Kiểu biểu diễn bàn cờ dùng cho các vị trí (ENGINE_LIST hoặc ENGINE_BITBOARD)
+        
         Trả về:
         - Danh sách các cặp (trạng thái, mô tả) để kiểm tra
         """
         test_positions = []
         
         # Vị trí 1: Vị trí bắt đầu cơ bản
-        start_position = GameState()
+        start_position = createGameState(engine)
         test_positions.append((start_position, "Vị trí ban đầu"))
         
         # Vị trí 2: Sau khi đã đi vài nước mở đầu (ví dụ: e4, e5, Nf3)
-        mid_opening = GameState()
+        mid_opening = createGameState(engine)
         # Thực hiện các nước đi mở đầu
         mid_opening.makeMove(Move((6, 4), (4, 4), mid_opening.board))  # e4
         mid_opening.makeMove(Move((1, 4), (3, 4), mid_opening.board))  # e5
@@ -136,7 +175,7 @@ class PerformanceAnalyzer:
         
         # Vị trí 3: Tình huống trung cuộc phức tạp
         # Ví dụ tạo một vị trí trung cuộc với nhiều quân (có thể tùy chỉnh)
-        mid_game = GameState()
+        mid_game = createGameState(engine)
         # Đặt bàn cờ vào một vị trí trung cuộc đặc biệt
         mid_game.board = [
             ["bR", "bN", "bB", "--", "bK", "bB", "--", "bR"],
@@ -149,11 +188,11 @@ class PerformanceAnalyzer:
             ["wR", "--", "wB", "wQ", "wK", "--", "--", "wR"]
         ]
         mid_game.white_to_move = True
-        mid_game.updateCastleRights()
+        mid_game.refreshZobrist()
         test_positions.append((mid_game, "Tình huống trung cuộc phức tạp"))
         
         # Vị trí 4: Tình huống cuối game với ít quân
-        end_game = GameState()
+        end_game = createGameState(engine)
         # Đặt bàn cờ vào một vị trí cuối game với ít quân
         end_game.board = [
             ["--", "--", "--", "--", "bK", "--", "--", "--"],
@@ -166,12 +205,12 @@ class PerformanceAnalyzer:
             ["--", "--", "--", "--", "wK", "--", "--", "--"]
         ]
         end_game.white_to_move = True
-        end_game.updateCastleRights()
+        end_game.refreshZobrist()
         test_positions.append((end_game, "Tình huống cuối game"))
         
         return test_positions
     
-    def compare_algorithms_specific_position(self, position, position_description, algorithms=None, depth_levels=None, repetitions=3):
+    def compare_algorithms_specific_position(self, position, position_description, algorithms=None, depth_levels=None, repetitions=3, engine=DEFAULT_ENGINE):
         """
         So sánh hiệu suất của nhiều thuật toán AI trên một vị trí cụ thể
         
@@ -181,9 +220,10 @@ class PerformanceAnalyzer:
         - algorithms: Danh sách các thuật toán cần so sánh
         - depth_levels: Danh sách các độ sâu cần đo lường
         - repetitions: Số lần lặp lại mỗi phép đo để lấy kết quả trung bình
+        - engine: Kiểu biểu diễn bàn cờ của position
         """
         if algorithms is None:
-            algorithms = [ChessAI.ALGORITHM_WITH_PRUNING, ChessAI.ALGORITHM_WITHOUT_PRUNING]
+            algorithms = [ChessAI.ALGORITHM_WITH_PRUNING, ChessAI.ALGORITHM_WITHOUT_PRUNING, ChessAI.ALGORITHM_STAGED]
         
         if depth_levels is None:
             depth_levels = [1, 2, 3]
@@ -195,10 +235,11 @@ class PerformanceAnalyzer:
                 algorithm, 
                 position_description, 
                 depth_levels, 
-                repetitions
+                repetitions,
+                engine
             )
     
-    def compare_algorithms_all_positions(self, algorithms=None, depth_levels=None, repetitions=3):
+    def compare_algorithms_all_positions(self, algorithms=None, depth_levels=None, repetitions=3, engines=None):
         """
         So sánh hiệu suất của nhiều thuật toán AI trên nhiều vị trí chuẩn
         
@@ -206,19 +247,25 @@ class PerformanceAnalyzer:
         - algorithms: Danh sách các thuật toán cần so sánh
         - depth_levels: Danh sách các độ sâu cần đo lường
         - repetitions: Số lần lặp lại mỗi phép đo để lấy kết quả trung bình
+        - engines: Danh sách các kiểu biểu diễn bàn cờ cần so sánh
         """
-        # Tạo các vị trí kiểm tra
-        test_positions = self.create_test_positions()
+        if engines is None:
+            engines = [DEFAULT_ENGINE]
         
-        # So sánh thuật toán trên từng vị trí
-        for position, description in test_positions:
-            self.compare_algorithms_specific_position(
-                position, 
-                description, 
-                algorithms, 
-                depth_levels, 
-                repetitions
-            )
+        for engine in engines:
+            # Tạo các vị trí kiểm tra
+            test_positions = self.create_test_positions(engine)
+            
+            # So sánh thuật toán trên từng vị trí
+            for position, description in test_positions:
+                self.compare_algorithms_specific_position(
+                    position, 
+                    description, 
+                    algorithms, 
+                    depth_levels, 
+                    repetitions,
+                    engine
+                )
     
     def export_to_excel(self, filename=None):
         """
@@ -253,7 +300,7 @@ class PerformanceAnalyzer:
             # Tạo pivot table cho thời gian thực thi trung bình theo thuật toán, vị trí và độ sâu
             pivot_time = df.pivot_table(
                 values='Thời gian (giây)', 
-                index=['Vị trí', 'Thuật toán'],
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
                 columns='Độ sâu', 
                 aggfunc='mean'
             )
@@ -262,16 +309,79 @@ class PerformanceAnalyzer:
             # Tạo pivot table cho bộ nhớ sử dụng trung bình
             pivot_memory = df.pivot_table(
                 values='Bộ nhớ (MB)', 
-                index=['Vị trí', 'Thuật toán'],
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
                 columns='Độ sâu', 
                 aggfunc='mean'
             )
             pivot_memory.to_excel(writer, sheet_name='Bộ nhớ TB (MB)')
             
+            # Tạo pivot table cho tỷ lệ trúng bảng chuyển vị trung bình
+            pivot_tt = df.pivot_table(
+                values='Tỷ lệ trúng TT (%)', 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_tt.to_excel(writer, sheet_name='Tỷ lệ trúng TT (%)')
+            
+            # Tạo pivot table cho tỷ lệ trúng bảng băm cấu trúc tốt trung bình
+            pivot_pawn = df.pivot_table(
+                values='Tỷ lệ trúng bảng tốt (%)', 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_pawn.to_excel(writer, sheet_name='Tỷ lệ trúng bảng tốt (%)')
+            
+            # Tạo pivot table cho số nút của tìm kiếm chính và tìm kiếm tĩnh (đếm riêng)
+            pivot_nodes = df.pivot_table(
+                values=['Số nút', 'Số nút tìm kiếm tĩnh'], 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_nodes.to_excel(writer, sheet_name='Số nút TB')
+            
+            # Tạo pivot table cho tỷ lệ cắt tỉa beta ngay ở nước đầu tiên (chất lượng sắp xếp nước đi)
+            pivot_cutoff = df.pivot_table(
+                values='Tỷ lệ cắt ở nước đầu (%)', 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_cutoff.to_excel(writer, sheet_name='Tỷ lệ cắt ở nước đầu (%)')
+            
+            # Tạo pivot table cho tốc độ (nút/giây) theo số luồng để thấy mức mở rộng khi thêm tiến trình
+            pivot_nps = df.pivot_table(
+                values='Nút/giây', 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán', 'Số luồng'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_nps.to_excel(writer, sheet_name='Nút mỗi giây theo số luồng')
+            
+            # Tạo pivot table cho hệ số phân nhánh hiệu dụng và độ sâu lớn nhất (kể cả tìm kiếm tĩnh)
+            pivot_branching = df.pivot_table(
+                values=['Hệ số phân nhánh', 'Seldepth'], 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_branching.to_excel(writer, sheet_name='Hệ số phân nhánh')
+            
+            # Tạo pivot table cho thời gian sinh nước đi so với thời gian đánh giá
+            pivot_profile = df.pivot_table(
+                values=['Thời gian sinh nước đi (giây)', 'Thời gian đánh giá (giây)', 'Thời gian (giây)'], 
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
+                columns='Độ sâu', 
+                aggfunc='mean'
+            )
+            pivot_profile.to_excel(writer, sheet_name='Sinh nước đi và đánh giá')
+            
             # Xuất kết quả nước đi theo vị trí và thuật toán
             pivot_moves = df.pivot_table(
                 values='Nước đi tốt nhất',
-                index=['Vị trí', 'Thuật toán'],
+                index=['Vị trí', 'Bộ máy', 'Thuật toán'],
                 columns='Độ sâu',
                 aggfunc=lambda x: pd.Series.mode(x).iloc[0] if len(pd.Series.mode(x)) > 0 else None
             )
@@ -361,74 +471,89 @@ class PerformanceAnalyzer:
         print(f"Đã xuất kết quả ra file: {file_path}")
         return file_path
     
-    def generate_report(self, specific_position=None, position_description=None, algorithms=None, depth_levels=None, repetitions=3, filename=None):
+    def generate_report(self, specific_position=None, position_description=None, algorithms=None, depth_levels=None, repetitions=3, filename=None, engines=None):
         """
         Tạo báo cáo đầy đủ, bao gồm đo lường hiệu suất và xuất kết quả ra file Excel
         
         Tham số:
-        - specific_position: Trạng thái của trò chơi cụ thể. Nếu None, sẽ sử dụng các vị trí mặc định.
+        - specific_position: Trạng thái của trò chơi cụ thể, hoặc danh sách các cặp (trạng thái, bộ máy)
+          cùng một thế cờ trên các kiểu bàn cờ khác nhau. Nếu None, sẽ sử dụng các vị trí mặc định.
         - position_description: Mô tả vị trí, chỉ dùng khi specific_position được chỉ định.
         - algorithms: Danh sách các thuật toán cần so sánh
         - depth_levels: Danh sách các độ sâu cần đo lường
         - repetitions: Số lần lặp lại mỗi phép đo để lấy kết quả trung bình
         - filename: Tên file Excel. Nếu không chỉ định, một tên file ngẫu nhiên sẽ được tạo.
+        - engines: Danh sách các kiểu biểu diễn bàn cờ cần so sánh trên các vị trí mặc định
         
         Trả về:
         - Đường dẫn đến file Excel đã tạo
         """
         if specific_position is not None and position_description is not None:
             # Nếu vị trí cụ thể được chỉ định, chỉ đánh giá vị trí đó
-            self.compare_algorithms_specific_position(
-                specific_position, 
-                position_description, 
-                algorithms, 
-                depth_levels, 
-                repetitions
-            )
+            if not isinstance(specific_position, list):
+                specific_position = [(specific_position, DEFAULT_ENGINE)]
+            for position, engine in specific_position:
+                self.compare_algorithms_specific_position(
+                    position, 
+                    position_description, 
+                    algorithms, 
+                    depth_levels, 
+                    repetitions,
+                    engine
+                )
         else:
             # Nếu không, đánh giá tất cả các vị trí chuẩn
-            self.compare_algorithms_all_positions(algorithms, depth_levels, repetitions)
+            self.compare_algorithms_all_positions(algorithms, depth_levels, repetitions, engines)
         
         # Xuất kết quả ra file Excel
         return self.export_to_excel(filename)
 
 
-def run_performance_test(specific_position=False):
+def run_performance_test(specific_position=False, engines=None, thread_counts=None, parallel=ChessAI.PARALLEL_LAZY_SMP):
     """
     Hàm chạy kiểm tra hiệu suất các thuật toán AI cờ vua
     
     Tham số:
     - specific_position: True nếu muốn kiểm tra trên một vị trí cụ thể, False nếu muốn kiểm tra trên các vị trí mặc định
+    - engines: Danh sách các kiểu biểu diễn bàn cờ cần so sánh (mặc định chỉ dùng DEFAULT_ENGINE)
+    - thread_counts: Danh sách số tiến trình tìm kiếm cần so sánh (mặc định chỉ 1 tiến trình)
+    - parallel: Cách tìm kiếm song song (ChessAI.PARALLEL_LAZY_SMP hoặc ChessAI.PARALLEL_ROOT_SPLIT)
     """
+    if engines is None:
+        engines = [DEFAULT_ENGINE]
+
     # Tạo đối tượng PerformanceAnalyzer
-    analyzer = PerformanceAnalyzer()
+    analyzer = PerformanceAnalyzer(thread_counts=thread_counts, parallel=parallel)
     
     # Cấu hình kiểm tra
-    algorithms = [ChessAI.ALGORITHM_WITH_PRUNING, ChessAI.ALGORITHM_WITHOUT_PRUNING]
+    algorithms = [ChessAI.ALGORITHM_WITH_PRUNING, ChessAI.ALGORITHM_WITHOUT_PRUNING, ChessAI.ALGORITHM_STAGED]
     depth_levels = [1, 2, 3, 4]  # Cẩn thận với độ sâu > 4, có thể mất nhiều thời gian
     repetitions = 3
     
     if specific_position:
-        # Tạo một vị trí cụ thể để kiểm tra
+        # Tạo một vị trí cụ thể để kiểm tra (cùng một thế cờ cho mỗi kiểu bàn cờ)
         # Ví dụ: Tình huống cuối game đơn giản
-        game_state = GameState()
-        # Đặt bàn cờ vào một vị trí cụ thể
-        game_state.board = [
-            ["--", "--", "--", "--", "bK", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "wK", "wQ", "--", "--"]
-        ]
-        game_state.white_to_move = True
-        game_state.updateCastleRights()
+        positions = []
+        for engine in engines:
+            game_state = createGameState(engine)
+            # Đặt bàn cờ vào một vị trí cụ thể
+            game_state.board = [
+                ["--", "--", "--", "--", "bK", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "wK", "wQ", "--", "--"]
+            ]
+            game_state.white_to_move = True
+            game_state.refreshZobrist()
+            positions.append((game_state, engine))
         
         # Chạy kiểm tra và tạo báo cáo cho vị trí cụ thể
         file_path = analyzer.generate_report(
-            specific_position=game_state,
+            specific_position=positions,
             position_description="Vị trí cuối game chiếu hậu",
             algorithms=algorithms,
             depth_levels=depth_levels,
@@ -439,12 +564,68 @@ def run_performance_test(specific_position=False):
         file_path = analyzer.generate_report(
             algorithms=algorithms,
             depth_levels=depth_levels,
-            repetitions=repetitions
+            repetitions=repetitions,
+            engines=engines
         )
     
     print(f"Đã tạo báo cáo hiệu suất tại: {file_path}")
     return file_path
 
 
+def run_move_footprint_test(count=100000, repetitions=5):
+    """
+    Đo bộ nhớ và thời gian khởi tạo của mỗi đối tượng Move (dùng __slots__) so với
+    phiên bản lưu thuộc tính trong __dict__ như trước đây.
+    
+    Tham số:
+    - count: Số đối tượng Move được tạo cho mỗi phép đo
+    - repetitions: Số lần lặp lại phép đo thời gian (lấy lần nhanh nhất)
+    
+    Trả về:
+    - Dictionary chứa kết quả đo cho từng kiểu Move
+    """
+    # Lớp đối chứng: cùng __init__ và phương thức với Move nhưng không có __slots__.
+    # Mỗi hàm được sao một code object riêng để bộ đặc tả hóa của CPython không dùng chung giữa hai lớp.
+    legacy_attributes = {}
+    for name, value in Move.__dict__.items():
+        if name in Move.__slots__ or name == "__slots__":
+            continue
+        if isinstance(value, types.FunctionType):
+            value = types.FunctionType(value.__code__.replace(), value.__globals__, value.__name__,
+                                       value.__defaults__, value.__closure__)
+        legacy_attributes[name] = value
+    LegacyMove = type("LegacyMove", (), legacy_attributes)
+    
+    board = GameState().board
+    start, end = (6, 4), (4, 4)
+    results = {}
+    for label, move_class in (("__dict__", LegacyMove), ("__slots__", Move)):
+        # Bộ nhớ: tổng số byte được cấp phát cho count đối tượng chia cho count
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        moves = [move_class(start, end, board) for _ in range(count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        # trừ phần của chính danh sách chứa các đối tượng
+        bytes_per_move = (allocated - sys.getsizeof(moves)) / count
+        del moves
+        
+        # Thời gian khởi tạo: lần nhanh nhất trong các lần lặp
+        best_time = min(timeit.repeat(lambda: move_class(start, end, board), number=count, repeat=repetitions))
+        results[label] = {
+            'Bộ nhớ mỗi nước đi (byte)': bytes_per_move,
+            'Thời gian khởi tạo (µs)': best_time / count * 1e6,
+        }
+    
+    for label, result in results.items():
+        print(f"Move {label}: {result['Bộ nhớ mỗi nước đi (byte)']:.1f} byte, "
+              f"{result['Thời gian khởi tạo (µs)']:.3f} µs mỗi đối tượng")
+    saved_memory = 1 - results['__slots__']['Bộ nhớ mỗi nước đi (byte)'] / results['__dict__']['Bộ nhớ mỗi nước đi (byte)']
+    saved_time = 1 - results['__slots__']['Thời gian khởi tạo (µs)'] / results['__dict__']['Thời gian khởi tạo (µs)']
+    print(f"Tiết kiệm: {saved_memory:.0%} bộ nhớ, {saved_time:.0%} thời gian khởi tạo")
+    return results
+
+
 if __name__ == "__main__":
     run_performance_test(specific_position=True) 
\ No newline at end of file
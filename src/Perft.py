@@ -0,0 +1,135 @@
+"""
+Perft (performance test) cho bộ sinh nước đi
+--------------------------------------------
+Đếm số nút lá của cây nước đi hợp lệ tới một độ sâu cố định và so với số liệu chuẩn đã biết.
+Vừa là bài kiểm tra tính đúng đắn của getValidMoves/makeMove/undoMove, vừa là thước đo tốc độ sinh nước đi
+(số nút mỗi giây) mỗi khi tối ưu src/ChessEngine.py hoặc src/BitboardEngine.py.
+
+Nước phong cấp được tính đủ 4 lựa chọn (hậu, xe, tượng, mã) như quy ước perft chuẩn.
+"""
+import time
+
+from src.ChessEngine import createGameState, DEFAULT_ENGINE, START_FEN
+
+PROMOTION_PIECES = ("Q", "R", "B", "N")
+
+# Các thế cờ perft chuẩn: (tên, FEN, số nút ở độ sâu 1, 2, 3, ...)
+PERFT_SUITE = [
+    ("Thế cờ ban đầu", START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("Kiwipete (nhập thành, ghim, bắt tốt qua đường)",
+     "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("Tàn cuộc bắt tốt qua đường bị ghim ngang",
+     "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("Phong cấp và nhập thành (trắng đi)",
+     "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("Phong cấp và nhập thành (đen đi, đối xứng)",
+     "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+     [6, 264, 9467, 422333]),
+    ("Phong cấp bằng nước ăn quân",
+     "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("Trung cuộc đối xứng",
+     "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(game_state, depth):
+    """
+    Đếm số nút lá ở độ sâu depth tính từ thế cờ hiện tại
+
+    Tham số:
+    - game_state: Trạng thái ván cờ (được trả về nguyên vẹn sau khi đếm)
+    - depth: Độ sâu cần đếm (0 trả về 1)
+    """
+    if depth == 0:
+        return 1
+    moves = game_state.getValidMoves()
+    if depth == 1:
+        # nút lá không cần đi thử, mỗi nước phong cấp ứng với 4 nút
+        return sum(len(PROMOTION_PIECES) if move.is_pawn_promotion else 1 for move in moves)
+    nodes = 0
+    for move in moves:
+        for promotion in (PROMOTION_PIECES if move.is_pawn_promotion else ("Q",)):
+            game_state.makeMove(move, promotion)
+            nodes += perft(game_state, depth - 1)
+            game_state.undoMove()
+    return nodes
+
+
+def perftDivide(game_state, depth):
+    """
+    Số nút lá dưới từng nước đi ở gốc, dùng để khoanh vùng nước đi bị sinh sai khi so với công cụ khác
+
+    Tham số:
+    - game_state: Trạng thái ván cờ
+    - depth: Độ sâu tính cả nước đi ở gốc (>= 1)
+
+    Trả về danh sách (ký hiệu nước đi dạng e2e4/e7e8q, số nút) theo thứ tự sinh nước đi
+    """
+    results = []
+    for move in game_state.getValidMoves():
+        for promotion in (PROMOTION_PIECES if move.is_pawn_promotion else ("Q",)):
+            game_state.makeMove(move, promotion)
+            results.append((move.getUciNotation(promotion), perft(game_state, depth - 1)))
+            game_state.undoMove()
+    return results
+
+
+def runPerft(depth, fen=START_FEN, engine=DEFAULT_ENGINE):
+    """
+    Chạy perft divide trên một thế cờ và in số nút của từng nước đi, tổng số nút và tốc độ
+
+    Tham số:
+    - depth: Độ sâu perft
+    - fen: Thế cờ cần đếm (mặc định là thế cờ ban đầu)
+    - engine: Kiểu biểu diễn bàn cờ
+    """
+    game_state = createGameState(engine, fen)
+    start_time = time.perf_counter()
+    results = perftDivide(game_state, depth)
+    elapsed = time.perf_counter() - start_time
+    total = sum(nodes for _, nodes in results)
+    for notation, nodes in sorted(results):
+        print(f"{notation}: {nodes}")
+    print()
+    print(f"Bộ máy: {engine} | Độ sâu: {depth} | Số nước ở gốc: {len(results)}")
+    print(f"Tổng số nút: {total} | Thời gian: {elapsed:.3f}s | {total / max(elapsed, 1e-9):,.0f} nút/giây")
+    return total
+
+
+def runPerftSuite(max_depth=3, engine=DEFAULT_ENGINE):
+    """
+    Chạy perft trên các thế cờ chuẩn và so với số nút đã biết
+
+    Tham số:
+    - max_depth: Độ sâu lớn nhất cần chạy cho mỗi thế cờ (bị giới hạn bởi số liệu chuẩn có sẵn)
+    - engine: Kiểu biểu diễn bàn cờ
+
+    Trả về True nếu mọi số nút đều khớp
+    """
+    all_passed = True
+    total_nodes = 0
+    total_time = 0.0
+    print(f"Perft suite - bộ máy: {engine}, độ sâu tối đa: {max_depth}")
+    for name, fen, expected_counts in PERFT_SUITE:
+        print(f"\n{name}\n  {fen}")
+        for depth, expected in enumerate(expected_counts[:max_depth], 1):
+            game_state = createGameState(engine, fen)
+            start_time = time.perf_counter()
+            nodes = perft(game_state, depth)
+            elapsed = time.perf_counter() - start_time
+            total_nodes += nodes
+            total_time += elapsed
+            passed = nodes == expected
+            all_passed = all_passed and passed
+            status = "OK" if passed else f"SAI (mong đợi {expected})"
+            print(f"  độ sâu {depth}: {nodes:>10} nút  {elapsed:8.3f}s  "
+                  f"{nodes / max(elapsed, 1e-9):>10,.0f} nút/giây  {status}")
+    print(f"\nTổng: {total_nodes} nút trong {total_time:.3f}s "
+          f"({total_nodes / max(total_time, 1e-9):,.0f} nút/giây) - {'ĐẠT' if all_passed else 'KHÔNG ĐẠT'}")
+    return all_passed
@@ -0,0 +1,378 @@
+"""
+Bảng tàn cuộc (endgame tablebase) KQK, KRK, KPK
+-----------------------------------------------
+Tìm kiếm giới hạn độ sâu không thấy được chiếu hết nằm ngoài tầm tìm kiếm, nên với các tàn cuộc ít quân AI có thể
+đi loanh quanh mãi. Các bảng ở đây lưu khoảng cách tới chiếu hết (DTM, tính theo nước đơn) của mọi thế cờ vua + một quân
+(hậu, xe hoặc tốt) đấu vua trần, được sinh một lần bằng phân tích ngược (retrograde analysis) dựa trên bộ sinh nước đi
+của GameState, rồi ghi vào một file nhị phân và được ánh xạ vào bộ nhớ (mmap) khi chạy.
+
+Thế cờ được đưa về dạng chuẩn trước khi tra: bên có quân là trắng (lật bàn cờ nếu bên có quân là đen), vua trắng nằm
+trong tam giác a8-d8-d5 (đối xứng lật cột, lật hàng, lấy đối xứng qua đường chéo) với bảng không có tốt, hoặc tốt nằm ở
+các cột a-d với bảng KPK. Mỗi thế cờ chiếm 1 byte: 0 là hòa (hoặc thế cờ không hợp lệ), n > 0 là còn n - 1 nước đơn
+tới chiếu hết; số nước đơn chẵn là bên đi bị chiếu hết, lẻ là bên đi chiếu hết đối phương.
+
+Bố cục file (big-endian): phần đầu (TABLEBASE_MAGIC, phiên bản, số bảng), danh mục (tên bảng, vị trí, độ dài)
+rồi tới dữ liệu của từng bảng. Sinh file bằng: python main.py --build-tablebases
+"""
+import mmap
+import os
+import struct
+import time
+
+from src.ChessEngine import createGameState, DEFAULT_ENGINE
+
+TABLEBASE_PATH = "./assets/tablebases/endgames.bin"
+TABLEBASE_MAGIC = b"CHTB"
+TABLEBASE_VERSION = 1
+HEADER_FORMAT = ">4sHH"     # magic, phiên bản, số bảng
+DIRECTORY_FORMAT = ">4sII"  # tên bảng, vị trí dữ liệu, độ dài dữ liệu
+
+# Bảng theo thứ tự sinh (KPK cần KQK và KRK cho các nước phong cấp) -> quân của bên mạnh
+TABLE_PIECES = {"KQK": "Q", "KRK": "R", "KPK": "p"}
+MAX_DTM = 254  # khoảng cách lớn nhất lưu được trong 1 byte
+
+TB_WIN = 1
+TB_DRAW = 0
+TB_LOSS = -1
+
+# Tam giác chuẩn của vua trắng (row <= col <= 3) -> số thứ tự 0..9, dùng cho bảng không có tốt
+TRIANGLE_SQUARES = [row * 8 + col for col in range(4) for row in range(col + 1)]
+TRIANGLE_INDEX = {square: index for index, square in enumerate(TRIANGLE_SQUARES)}
+PAWN_SQUARES = 24  # tốt ở hàng 2-7, cột a-d
+
+
+def tableSize(piece):
+    """Số thế cờ (số byte) của bảng có quân piece: bên đi x vị trí chuẩn x 64 x 64"""
+    return 2 * (PAWN_SQUARES if piece == "p" else len(TRIANGLE_SQUARES)) * 64 * 64
+
+
+def transformSquare(square, flip_col, flip_row, transpose):
+    """Ảnh của ô square qua phép lật cột, lật hàng và lấy đối xứng qua đường chéo (theo thứ tự đó)"""
+    row, col = divmod(square, 8)
+    if flip_col:
+        col = 7 - col
+    if flip_row:
+        row = 7 - row
+    if transpose:
+        row, col = col, row
+    return row * 8 + col
+
+
+def tableIndex(piece, strong_to_move, white_king, black_king, square):
+    """
+    Chỉ số trong bảng của thế cờ (bên mạnh là trắng), sau khi đưa về dạng chuẩn
+
+    Tham số:
+    - piece: Quân của bên mạnh ("Q", "R" hoặc "p")
+    - strong_to_move: True nếu tới lượt bên mạnh
+    - white_king, black_king, square: Ô (row * 8 + col) của vua trắng, vua đen và quân của bên mạnh
+
+    Trả về None nếu thế cờ không thuộc bảng (tốt ở hàng 1 hoặc hàng 8)
+    """
+    side = 0 if strong_to_move else 1
+    if piece == "p":
+        if square % 8 > 3:
+            white_king, black_king, square = (transformSquare(sq, True, False, False)
+                                              for sq in (white_king, black_king, square))
+        row, col = divmod(square, 8)
+        if not 1 <= row <= 6:
+            return None
+        return ((side * PAWN_SQUARES + (row - 1) * 4 + col) * 64 + white_king) * 64 + black_king
+    row, col = divmod(white_king, 8)
+    flip_col, flip_row = col > 3, row > 3
+    if flip_col:
+        col = 7 - col
+    if flip_row:
+        row = 7 - row
+    transpose = row > col
+    white_king, black_king, square = (transformSquare(sq, flip_col, flip_row, transpose)
+                                      for sq in (white_king, black_king, square))
+    return ((side * len(TRIANGLE_SQUARES) + TRIANGLE_INDEX[white_king]) * 64 + black_king) * 64 + square
+
+
+def decodeIndex(piece, index):
+    """Ngược lại của tableIndex: (tới lượt bên mạnh, vua trắng, vua đen, ô của quân)"""
+    if piece == "p":
+        black_king = index % 64
+        white_king = index // 64 % 64
+        side, pawn = divmod(index // 4096, PAWN_SQUARES)
+        return side == 0, white_king, black_king, (pawn // 4 + 1) * 8 + pawn % 4
+    square = index % 64
+    black_king = index // 64 % 64
+    side, king = divmod(index // 4096, len(TRIANGLE_SQUARES))
+    return side == 0, TRIANGLE_SQUARES[king], black_king, square
+
+
+def positionFen(piece, strong_to_move, white_king, black_king, square):
+    """Chuỗi FEN của thế cờ (không có quyền nhập thành, không có bắt tốt qua đường)"""
+    board = ["."] * 64
+    board[white_king] = "K"
+    board[black_king] = "k"
+    board[square] = piece.upper()
+    rows = []
+    for row in range(8):
+        text = ""
+        empty = 0
+        for cell in board[row * 8:row * 8 + 8]:
+            if cell == ".":
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            text += cell
+        rows.append(text + (str(empty) if empty else ""))
+    return "/".join(rows) + (" w" if strong_to_move else " b") + " - - 0 1"
+
+
+def kingsAdjacent(first, second):
+    return abs(first // 8 - second // 8) <= 1 and abs(first % 8 - second % 8) <= 1
+
+
+def decodeValue(value):
+    """(TB_WIN/TB_DRAW/TB_LOSS, số nước đơn tới chiếu hết) theo góc nhìn bên đi từ một byte của bảng"""
+    if value == 0:
+        return TB_DRAW, 0
+    dtm = value - 1
+    return (TB_WIN if dtm % 2 else TB_LOSS), dtm
+
+
+def generateTable(piece, solved_tables, engine=DEFAULT_ENGINE):
+    """
+    Sinh bảng DTM của vua + piece đấu vua trần bằng phân tích ngược
+
+    Mỗi thế cờ hợp lệ được sinh nước đi một lần bằng GameState để lấy các thế cờ con; thế cờ con ngoài bảng
+    (ăn mất quân, phong cấp) được tra trong solved_tables. Sau đó lan truyền từ các thế cờ chiếu hết theo
+    số nước đơn tăng dần: thế cờ có nước đi tới thế cờ thua của đối phương là thắng (lần đầu gặp là ngắn nhất),
+    thế cờ mà mọi nước đi đều tới thế cờ thắng của đối phương là thua (khi nước cuối cùng được chứng minh).
+
+    Tham số:
+    - piece: "Q", "R" hoặc "p"
+    - solved_tables: {quân: bytearray} các bảng đã sinh (cần "Q" và "R" khi sinh bảng tốt)
+    - engine: Kiểu biểu diễn bàn cờ dùng để sinh nước đi
+
+    Trả về bytearray của bảng
+    """
+    size = tableSize(piece)
+    half = size // 2
+    values = bytearray(size)
+    predecessors = {}
+    remaining = {}      # số nước đi chưa được chứng minh là tới thế cờ thắng của đối phương
+    longest_child = {}  # số nước đơn lớn nhất của các thế cờ con thắng nằm ngoài bảng
+    buckets = [[] for _ in range(MAX_DTM + 1)]
+    game_state = createGameState(engine)
+
+    def addPosition(index, fen):
+        game_state.loadFen(fen)
+        moves = game_state.getValidMoves()
+        if not moves:
+            if game_state.checkmate:
+                values[index] = 1
+                buckets[0].append(index)
+            return
+        strong_to_move, white_king, black_king, square = decodeIndex(piece, index)
+        count = 0
+        for move in moves:
+            start = move.start_row * 8 + move.start_col
+            end = move.end_row * 8 + move.end_col
+            if end == square and not strong_to_move:
+                count += 1  # vua đen ăn quân: hòa, không bao giờ là nước thua của bên đi
+                continue
+            if not strong_to_move:
+                children = [(piece, tableIndex(piece, True, white_king, end, square))]
+            elif start == white_king:
+                children = [(piece, tableIndex(piece, False, end, black_king, square))]
+            elif move.is_pawn_promotion:
+                # phong mã / tượng là hòa nên chỉ cần xét hậu và xe
+                children = [(promotion, tableIndex(promotion, False, white_king, black_king, end))
+                            for promotion in ("Q", "R")]
+            else:
+                children = [(piece, tableIndex(piece, False, white_king, black_king, end))]
+            for child_piece, child in children:
+                if child_piece == piece:
+                    predecessors.setdefault(child, []).append(index)
+                    count += 1
+                    continue
+                result, dtm = decodeValue(solved_tables[child_piece][child])
+                if result == TB_WIN:
+                    longest_child[index] = max(longest_child.get(index, 0), dtm)
+                    continue
+                count += 1
+                if result == TB_LOSS and (not values[index] or values[index] > dtm + 2):
+                    values[index] = dtm + 2
+                    buckets[dtm + 1].append(index)
+        remaining[index] = count
+        if count == 0:
+            dtm = longest_child[index] + 1
+            values[index] = dtm + 1
+            buckets[dtm].append(index)
+
+    for index in range(half):
+        _, white_king, black_king, square = decodeIndex(piece, index)
+        if len({white_king, black_king, square}) < 3 or kingsAdjacent(white_king, black_king):
+            continue
+        if piece == "p" and not 1 <= square // 8 <= 6:
+            continue
+        addPosition(index + half, positionFen(piece, False, white_king, black_king, square))
+        if not game_state.inCheck():  # tới lượt trắng mà vua đen đang bị chiếu là không hợp lệ
+            addPosition(index, positionFen(piece, True, white_king, black_king, square))
+
+    for dtm, bucket in enumerate(buckets):
+        for index in bucket:
+            if values[index] != dtm + 1:
+                continue  # đã có đường chiếu hết ngắn hơn
+            for parent in predecessors.get(index, ()):
+                if dtm % 2 == 0:
+                    # bên đi ở thế cờ con bị chiếu hết: thế cờ cha thắng
+                    if not values[parent] or values[parent] > dtm + 2:
+                        values[parent] = dtm + 2
+                        buckets[dtm + 1].append(parent)
+                else:
+                    remaining[parent] -= 1
+                    if remaining[parent] == 0 and not values[parent]:
+                        parent_dtm = max(dtm, longest_child.get(parent, 0)) + 1
+                        values[parent] = parent_dtm + 1
+                        buckets[parent_dtm].append(parent)
+    return values
+
+
+def buildTablebases(path=TABLEBASE_PATH, engine=DEFAULT_ENGINE, names=tuple(TABLE_PIECES)):
+    """
+    Sinh các bảng trong TABLE_PIECES và ghi vào file path, in thống kê của từng bảng
+
+    Tham số:
+    - path: File đầu ra
+    - engine: Kiểu biểu diễn bàn cờ dùng để sinh nước đi
+    - names: Tên các bảng cần sinh (mặc định tất cả; KPK cần cả KQK và KRK)
+    """
+    tables = {name: piece for name, piece in TABLE_PIECES.items() if name in names}
+    solved_tables = {}
+    for name, piece in tables.items():
+        start_time = time.perf_counter()
+        values = generateTable(piece, solved_tables, engine)
+        solved_tables[piece] = values
+        half = len(values) // 2
+        wins = sum(1 for value in values[:half] if value)
+        longest = max(values) - 1
+        print(f"{name}: {len(values)} thế cờ, trắng đi thắng {wins}, chiếu hết dài nhất {longest} nước đơn, "
+              f"{time.perf_counter() - start_time:.1f}s")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    offset = struct.calcsize(HEADER_FORMAT) + struct.calcsize(DIRECTORY_FORMAT) * len(tables)
+    with open(path, "wb") as table_file:
+        table_file.write(struct.pack(HEADER_FORMAT, TABLEBASE_MAGIC, TABLEBASE_VERSION, len(tables)))
+        for name, piece in tables.items():
+            table_file.write(struct.pack(DIRECTORY_FORMAT, name.encode(), offset, len(solved_tables[piece])))
+            offset += len(solved_tables[piece])
+        for piece in tables.values():
+            table_file.write(solved_tables[piece])
+    print(f"Đã ghi bảng tàn cuộc vào: {path}")
+    return path
+
+
+class Tablebase:
+    """
+    Các bảng tàn cuộc đọc từ file đã sinh, ánh xạ vào bộ nhớ
+    """
+
+    def __init__(self, path=TABLEBASE_PATH):
+        with open(path, "rb") as table_file:
+            self.data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = struct.unpack_from(HEADER_FORMAT, self.data)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            self.data.close()
+            raise ValueError(f"File bảng tàn cuộc không hợp lệ: {path}")
+        self.offsets = {}  # quân của bên mạnh -> vị trí bảng trong file
+        for position in range(count):
+            name, offset, _ = struct.unpack_from(DIRECTORY_FORMAT, self.data, struct.calcsize(HEADER_FORMAT)
+                                                 + position * struct.calcsize(DIRECTORY_FORMAT))
+            piece = TABLE_PIECES.get(name.rstrip(b"\0").decode())
+            if piece is not None:
+                self.offsets[piece] = offset
+
+    def close(self):
+        self.data.close()
+
+    def probe(self, game_state):
+        """
+        Tra thế cờ hiện tại
+
+        Trả về (TB_WIN/TB_DRAW/TB_LOSS, số nước đơn tới chiếu hết) theo góc nhìn bên đi,
+        hoặc None nếu thế cờ không thuộc các bảng (nhiều quân hơn, hoặc còn quyền nhập thành)
+        """
+        kings = {}
+        other = None
+        for row, board_row in enumerate(game_state.board):
+            for col, cell in enumerate(board_row):
+                if cell == "--":
+                    continue
+                if cell[1] == "K":
+                    kings[cell[0]] = row * 8 + col
+                elif other is not None:
+                    return None
+                else:
+                    other = (cell, row * 8 + col)
+        if len(kings) < 2:
+            return None
+        if other is None or other[0][1] in "NB":
+            return TB_DRAW, 0  # vua trần hoặc chỉ còn một mã / tượng: không đủ quân chiếu hết
+        (color, piece), square = other
+        if piece == "R":
+            rights = game_state.current_castling_rights
+            if rights.wks or rights.wqs or rights.bks or rights.bqs:
+                return None
+        if piece not in self.offsets:
+            return None
+        white_king, black_king = kings["w"], kings["b"]
+        strong_to_move = game_state.white_to_move == (color == "w")
+        if color == "b":
+            # lật bàn cờ theo hàng và đổi màu để bên có quân luôn là trắng
+            white_king, black_king, square = (transformSquare(sq, False, True, False)
+                                              for sq in (black_king, white_king, square))
+        index = tableIndex(piece, strong_to_move, white_king, black_king, square)
+        if index is None:
+            return None
+        return decodeValue(self.data[self.offsets[piece] + index])
+
+    def findMove(self, game_state, valid_moves):
+        """
+        Nước đi tốt nhất theo bảng: thắng thì chiếu hết nhanh nhất, thua thì kéo dài lâu nhất, hòa thì giữ hòa
+
+        Trả về (nước đi, (kết quả, số nước đơn tới chiếu hết)) hoặc None nếu thế cờ không thuộc các bảng
+        """
+        root = self.probe(game_state)
+        if root is None or not valid_moves:
+            return None
+        best = None
+        for move in valid_moves:
+            for promotion in (("Q", "R", "N", "B") if move.is_pawn_promotion else ("Q",)):
+                game_state.makeMove(move, promotion)
+                child = self.probe(game_state)
+                game_state.undoMove()
+                if child is None:
+                    return None
+                result, dtm = child
+                # kết quả của đối phương càng tệ càng tốt; cùng kết quả thì ưu tiên thắng nhanh / thua chậm
+                key = (-result, -dtm if result == TB_LOSS else dtm)
+                if best is None or key > best[0]:
+                    best = (key, move, promotion)
+        _, move, promotion = best
+        move.promotion_choice = promotion
+        return move, root
+
+
+# Bảng dùng chung trong một tiến trình: mở một lần khi cần lần đầu (False nghĩa là đã thử mở nhưng không có file)
+tablebase = None
+
+
+def getTablebase(path=TABLEBASE_PATH):
+    """Trả về Tablebase dùng chung, hoặc None nếu chưa sinh file bảng tàn cuộc"""
+    global tablebase
+    if tablebase is None:
+        tablebase = Tablebase(path) if os.path.exists(path) else False
+    return tablebase or None
+
+
+def findTablebaseMove(game_state, valid_moves):
+    """Như Tablebase.findMove với bảng dùng chung; None nếu không có file bảng hoặc thế cờ không thuộc bảng"""
+    table = getTablebase()
+    return table.findMove(game_state, valid_moves) if table is not None else None
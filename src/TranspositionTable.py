@@ -0,0 +1,138 @@
+"""
+Bảng chuyển vị (transposition table) cho tìm kiếm của AI
+--------------------------------------------------------
+Lưu kết quả tìm kiếm của từng thế cờ theo khóa Zobrist để không phải tìm lại khi gặp lại cùng thế cờ
+qua một thứ tự nước đi khác. Bảng có kích thước cố định (tính theo MB) và nằm trong một bộ đệm byte liền mạch
+thay vì dict tăng dần, nên bộ nhớ bị giới hạn và bộ đệm có thể được thay bằng vùng nhớ khác (ví dụ bộ nhớ chia sẻ).
+
+Mỗi ô (bucket) gồm 2 mục, mỗi mục 2 từ 64 bit (khóa XOR dữ liệu, dữ liệu):
+- mục 0 ưu tiên độ sâu: chỉ bị thay khi kết quả mới sâu hơn, cùng thế cờ, hoặc mục đã cũ (lần tìm kiếm trước)
+- mục 1 luôn bị thay: nhận mọi kết quả không vào được mục 0
+Lưu khóa dạng XOR với dữ liệu nên một mục bị ghi dở (đọc/ghi đồng thời) sẽ không khớp khóa và bị bỏ qua.
+
+Bố cục từ dữ liệu (bit thấp đến bit cao):
+- 16 bit: moveID của nước đi tốt nhất (0 nếu không có)
+- 2 bit: loại giới hạn (TT_EXACT, TT_LOWER, TT_UPPER)
+- 8 bit: độ sâu còn lại khi lưu
+- 24 bit: điểm (số nguyên có dấu, cộng thêm độ lệch)
+- 8 bit: thế hệ (lần tìm kiếm) khi lưu
+"""
+
+TT_EXACT = 1  # điểm chính xác
+TT_LOWER = 2  # điểm là cận dưới (cắt tỉa beta, điểm thật >= điểm lưu)
+TT_UPPER = 3  # điểm là cận trên (không nước nào vượt alpha, điểm thật <= điểm lưu)
+
+ENTRY_BYTES = 16
+BUCKET_BYTES = 2 * ENTRY_BYTES
+
+_MOVE_MASK = 0xFFFF
+_BOUND_SHIFT = 16
+_DEPTH_SHIFT = 18
+_SCORE_SHIFT = 26
+_GENERATION_SHIFT = 50
+_SCORE_OFFSET = 1 << 23
+_SCORE_LIMIT = _SCORE_OFFSET - 1
+
+
+def tableBytes(size_mb):
+    """Số byte bộ đệm cần cho bảng size_mb MB (số ô là lũy thừa của 2 lớn nhất không vượt quá size_mb)"""
+    bucket_count = 1
+    while bucket_count * 2 * BUCKET_BYTES <= size_mb * 1024 * 1024:
+        bucket_count *= 2
+    return bucket_count * BUCKET_BYTES
+
+
+class TranspositionTable:
+    """
+    Bảng chuyển vị kích thước cố định với chính sách thay thế ưu tiên độ sâu + luôn thay thế
+    """
+
+    def __init__(self, size_mb=16, buffer=None):
+        """
+        Tham số:
+        - size_mb: Dung lượng bảng tính theo MB (số ô được làm tròn xuống lũy thừa của 2)
+        - buffer: Bộ đệm có sẵn để dùng làm bảng, ít nhất tableBytes(size_mb) byte
+          (mặc định cấp phát bytearray mới; truyền SharedMemory.buf để nhiều tiến trình dùng chung một bảng)
+        """
+        table_bytes = tableBytes(size_mb)
+        self.size_mb = size_mb
+        self.bucket_mask = table_bytes // BUCKET_BYTES - 1
+        if buffer is None:
+            buffer = bytearray(table_bytes)
+        self.buffer = buffer
+        self.words = memoryview(buffer)[:table_bytes].cast("Q")
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def release(self):
+        """Giải phóng view trên bộ đệm (bắt buộc trước khi đóng SharedMemory dùng làm bộ đệm)"""
+        self.words.release()
+        self.buffer = None
+
+    def clear(self):
+        """Xóa toàn bộ mục và bộ đếm"""
+        byte_view = self.words.cast("B")
+        byte_view[:] = bytes(len(byte_view))
+        self.generation = 0
+        self.resetStats()
+
+    def newSearch(self):
+        """Bắt đầu lần tìm kiếm mới: các mục của lần trước trở thành mục cũ, dễ bị thay thế"""
+        self.generation = (self.generation + 1) & 0xFF
+        self.resetStats()
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def hitRate(self):
+        """Tỷ lệ lần tra cứu tìm thấy thế cờ (0.0 - 1.0)"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, key):
+        """
+        Tra cứu thế cờ có khóa Zobrist key
+
+        Trả về (độ sâu, điểm, loại giới hạn, moveID của nước tốt nhất) hoặc None nếu không có
+        """
+        self.probes += 1
+        words = self.words
+        index = (key & self.bucket_mask) * 4
+        for slot in (index, index + 2):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.hits += 1
+                return ((data >> _DEPTH_SHIFT) & 0xFF,
+                        ((data >> _SCORE_SHIFT) & 0xFFFFFF) - _SCORE_OFFSET,
+                        (data >> _BOUND_SHIFT) & 0x3,
+                        data & _MOVE_MASK)
+        return None
+
+    def store(self, key, depth, score, bound, move_id=0):
+        """
+        Lưu kết quả tìm kiếm của thế cờ có khóa Zobrist key
+
+        Tham số:
+        - key: Khóa Zobrist 64 bit
+        - depth: Độ sâu còn lại đã tìm
+        - score: Điểm nguyên (bị chặn trong khoảng 24 bit có dấu)
+        - bound: TT_EXACT, TT_LOWER hoặc TT_UPPER
+        - move_id: moveID của nước đi tốt nhất (0 nếu không có)
+        """
+        words = self.words
+        index = (key & self.bucket_mask) * 4
+        score = max(-_SCORE_LIMIT, min(_SCORE_LIMIT, score))
+        slot = index
+        old_data = words[index + 1]
+        if old_data and words[index] ^ old_data != key \
+                and (old_data >> _GENERATION_SHIFT) == self.generation \
+                and ((old_data >> _DEPTH_SHIFT) & 0xFF) > depth:
+            slot = index + 2  # mục ưu tiên độ sâu đang giữ kết quả sâu hơn của thế cờ khác
+            old_data = words[slot + 1]
+        if not move_id and old_data and words[slot] ^ old_data == key:
+            move_id = old_data & _MOVE_MASK  # giữ nước tốt nhất cũ của cùng thế cờ
+        data = (move_id & _MOVE_MASK) | (bound << _BOUND_SHIFT) | (min(depth, 0xFF) << _DEPTH_SHIFT) | \
+               ((score + _SCORE_OFFSET) << _SCORE_SHIFT) | (self.generation << _GENERATION_SHIFT)
+        words[slot] = key ^ data
+        words[slot + 1] = data
@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from src.ChessEngine import createGameState, ENGINE_LIST, ENGINE_BITBOARD
+from src.Evaluation import computeMaterialScore, computePhase
+from src.Perft import PERFT_SUITE
+
+GAMES_PER_POSITION = 3
+MAX_PLIES = 60
+# các thế cờ chuẩn của perft cộng một thế cờ có thể bắt tốt qua đường ngay (hiếm gặp trong ván ngẫu nhiên)
+START_POSITIONS = [(name, fen) for name, fen, _ in PERFT_SUITE] + [
+    ("Bắt tốt qua đường", "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")]
+
+
+class IncrementalStateTest(unittest.TestCase):
+    """Khóa Zobrist, khóa tốt, điểm vật chất + vị trí và giai đoạn cập nhật tăng dần phải khớp với giá trị tính lại"""
+
+    def assertIncrementalState(self, game_state):
+        incremental = (game_state.zobrist, game_state.pawn_zobrist, game_state.material_score, game_state.phase)
+        game_state.refreshZobrist()
+        self.assertEqual(incremental, (game_state.zobrist, game_state.pawn_zobrist,
+                                       computeMaterialScore(game_state.board), computePhase(game_state.board)))
+
+    def test_random_games(self):
+        for engine in (ENGINE_LIST, ENGINE_BITBOARD):
+            for name, fen in START_POSITIONS:
+                for seed in range(GAMES_PER_POSITION):
+                    with self.subTest(engine=engine, position=name, seed=seed):
+                        rng = random.Random(seed)
+                        game_state = createGameState(engine, fen)
+                        start = (game_state.zobrist, game_state.material_score, [row[:] for row in game_state.board])
+                        for _ in range(MAX_PLIES):
+                            moves = game_state.getValidMoves()
+                            if not moves:
+                                break
+                            # ưu tiên nước đặc biệt (bắt tốt qua đường, nhập thành, phong cấp) để ván ngẫu nhiên gặp chúng
+                            special = [move for move in moves
+                                       if move.is_enpassant_move or move.is_castle_move or move.is_pawn_promotion]
+                            move = rng.choice(special if special and rng.random() < 0.5 else moves)
+                            game_state.makeMove(move, rng.choice("QRBN"))
+                            self.assertIncrementalState(game_state)
+                        while game_state.move_log:
+                            game_state.undoMove()
+                            self.assertIncrementalState(game_state)
+                        self.assertEqual(game_state.position_counter, {})
+                        self.assertEqual((game_state.zobrist, game_state.material_score, game_state.board), start)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from src.ChessEngine import createGameState, ENGINE_LIST, ENGINE_BITBOARD
+from src.OpeningBook import polyglotKey, POLYGLOT_RANDOM64, RANDOM_COUNT, START_POSITION_KEY
+
+# Khóa mẫu trong tài liệu định dạng Polyglot: (các nước đi từ thế cờ ban đầu, khóa)
+POLYGLOT_SAMPLE_KEYS = [
+    ([], 0x463B96181691FC9C),
+    (["e2e4"], 0x823C9B50FD114196),
+    (["e2e4", "d7d5"], 0x0756B94461C50FB0),
+    (["e2e4", "d7d5", "e4e5"], 0x662FAFB965DB29D4),
+    (["e2e4", "d7d5", "e4e5", "f7f5"], 0x22A48B5A8E47FF78),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2"], 0x652A607CA3F242C1),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7"], 0x00FDD303C946BDD9),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4"], 0x3C8123EA7B067637),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4", "b4c3", "a1a3"], 0x5C3F9B829B279560),
+]
+
+
+def playMoves(engine, uci_moves):
+    game_state = createGameState(engine)
+    for uci in uci_moves:
+        move = next(move for move in game_state.getValidMoves() if move.getUciNotation() == uci)
+        game_state.makeMove(move)
+    return game_state
+
+
+class PolyglotKeyTest(unittest.TestCase):
+    def test_random64_table_size(self):
+        self.assertEqual(len(POLYGLOT_RANDOM64), RANDOM_COUNT)
+
+    def test_start_position_key(self):
+        self.assertEqual(polyglotKey(createGameState()), START_POSITION_KEY)
+        self.assertEqual(START_POSITION_KEY, 0x463B96181691FC9C)
+
+    def test_sample_keys(self):
+        for engine in (ENGINE_LIST, ENGINE_BITBOARD):
+            for uci_moves, key in POLYGLOT_SAMPLE_KEYS:
+                with self.subTest(engine=engine, moves=uci_moves):
+                    self.assertEqual(polyglotKey(playMoves(engine, uci_moves)), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
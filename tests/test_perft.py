@@ -0,0 +1,22 @@
+import unittest
+
+from src.ChessEngine import createGameState, ENGINE_LIST, ENGINE_BITBOARD
+from src.Perft import perft, PERFT_SUITE
+
+MAX_DEPTH = 3  # độ sâu 4 trở lên quá chậm cho bộ kiểm tra thường xuyên (dùng main.py --perft-suite)
+
+
+class PerftSuiteTest(unittest.TestCase):
+    def test_standard_positions(self):
+        for engine in (ENGINE_LIST, ENGINE_BITBOARD):
+            for name, fen, expected_counts in PERFT_SUITE:
+                game_state = createGameState(engine, fen)
+                zobrist = game_state.zobrist
+                for depth, expected in enumerate(expected_counts[:MAX_DEPTH], start=1):
+                    with self.subTest(engine=engine, position=name, depth=depth):
+                        self.assertEqual(perft(game_state, depth), expected)
+                        self.assertEqual(game_state.zobrist, zobrist)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import src.ChessAI as ChessAI
+import src.Tablebase as Tablebase
+from src.ChessEngine import createGameState, ENGINE_BITBOARD
+from src.Tablebase import buildTablebases, TB_WIN, TB_DRAW, TB_LOSS
+
+KQK_FEN = "8/8/8/4k3/8/8/8/4K2Q w - - 0 1"
+KQK_DTM = 13
+MATED_FEN = "k7/1Q6/1K6/8/8/8/8/8 b - - 0 1"      # đen bị chiếu hết
+STALEMATE_FEN = "k7/8/1QK5/8/8/8/8/8 b - - 0 1"   # đen hết nước đi nhưng không bị chiếu
+
+
+class KqkTablebaseTest(unittest.TestCase):
+    """Sinh riêng bảng KQK (khoảng 10 giây) vào thư mục tạm rồi kiểm tra kết quả tra bảng"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = buildTablebases(os.path.join(cls.directory.name, "kqk.bin"), ENGINE_BITBOARD, names=("KQK",))
+        cls.table = Tablebase.Tablebase(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table.close()
+        cls.directory.cleanup()
+
+    def test_known_win(self):
+        game_state = createGameState(ENGINE_BITBOARD, KQK_FEN)
+        self.assertEqual(self.table.probe(game_state), (TB_WIN, KQK_DTM))
+
+    def test_positions_without_legal_moves(self):
+        mated = createGameState(ENGINE_BITBOARD, MATED_FEN)
+        self.assertEqual(mated.getValidMoves(), [])
+        self.assertEqual(self.table.probe(mated), (TB_LOSS, 0))
+        stalemate = createGameState(ENGINE_BITBOARD, STALEMATE_FEN)
+        self.assertEqual(stalemate.getValidMoves(), [])
+        self.assertEqual(self.table.probe(stalemate), (TB_DRAW, 0))
+        self.assertIsNone(self.table.findMove(stalemate, []))
+
+    def test_find_move_mates_in_probed_plies(self):
+        game_state = createGameState(ENGINE_BITBOARD, KQK_FEN)
+        _, dtm = self.table.probe(game_state)
+        plies = 0
+        valid_moves = game_state.getValidMoves()
+        while valid_moves:
+            move, (_, move_dtm) = self.table.findMove(game_state, valid_moves)
+            self.assertEqual(move_dtm, dtm - plies)  # mỗi nước đơn đưa thế cờ gần chiếu hết thêm đúng một nước
+            game_state.makeMove(move, move.promotion_choice)
+            plies += 1
+            valid_moves = game_state.getValidMoves()
+        self.assertTrue(game_state.checkmate)
+        self.assertEqual(plies, dtm)
+
+    def test_search_answers_from_table(self):
+        saved = Tablebase.tablebase
+        Tablebase.tablebase = self.table
+        try:
+            game_state = createGameState(ENGINE_BITBOARD, KQK_FEN)
+            result = ChessAI.searchPosition(game_state, game_state.getValidMoves(), 2)
+        finally:
+            Tablebase.tablebase = saved
+        self.assertEqual(result.score, ChessAI.CHECKMATE - KQK_DTM)
+        self.assertEqual(result.nodes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()